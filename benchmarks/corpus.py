@@ -0,0 +1,103 @@
+"""
+Synthetic content trees for benchmarking the Pelican Citation Processor plugin.
+"""
+
+import os
+import random
+import shutil
+from types import SimpleNamespace
+
+
+EXAMPLE_CONTENT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "content")
+STYLE_NAME = "cambridge-university-press-author-date-cambridge-a.csl"
+STYLE_PATH = os.path.join("_bib_styles", STYLE_NAME)
+BIBLIOGRAPHY_PATH = "_bibliography.bib"
+SURNAMES = ("Smith", "Garcia", "Chen", "Okafor", "Novak", "Tanaka", "Silva", "Haddad", "Larsen", "Kumar")
+WORDS = (
+    "model", "network", "evidence", "dataset", "method", "analysis", "result", "theory",
+    "training", "inference", "signal", "survey", "baseline", "benchmark", "corpus", "error",
+)
+
+
+def make_entry(index, rng):
+    """Build one BibTeX entry with a reproducible author, title and year."""
+    surname = rng.choice(SURNAMES)
+    title = " ".join(rng.choice(WORDS) for _ in range(5)).capitalize()
+    return (
+        f"@article{{ref{index:05d},\n"
+        f"  title={{{title}}},\n"
+        f"  author={{{surname}, A. and {rng.choice(SURNAMES)}, B.}},\n"
+        f"  journal={{Journal of Synthetic Results}},\n"
+        f"  volume={{{rng.randint(1, 40)}}},\n"
+        f"  pages={{{rng.randint(1, 200)}--{rng.randint(201, 400)}}},\n"
+        f"  year={{{rng.randint(1990, 2024)}}}\n"
+        f"}}\n"
+    )
+
+
+def make_citation(keys, rng):
+    """Build one citation cluster in Pandoc Markdown syntax."""
+    form = rng.random()
+    if form < 0.15:
+        return f"@{rng.choice(keys)}"
+    cited = rng.sample(keys, min(len(keys), rng.randint(1, 3)))
+    items = [f"@{key}" for key in cited]
+    if form < 0.4:
+        items[0] += f", p. {rng.randint(1, 300)}"
+    return "[" + "; ".join(items) + "]"
+
+
+def make_article(index, keys, citations, rng):
+    """Build the Markdown source and paragraphs of one article."""
+    paragraphs = []
+    remaining = citations
+    while remaining > 0 or not paragraphs:
+        sentence_count = rng.randint(2, 4)
+        sentences = []
+        for _ in range(sentence_count):
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14)))
+            if remaining > 0:
+                words += " " + make_citation(keys, rng)
+                remaining -= 1
+            sentences.append(words.capitalize() + ".")
+        paragraphs.append(" ".join(sentences))
+    header = f"Title: Synthetic article {index}\nDate: 2024-01-01\nCategory: Benchmark\n\n"
+    return header + "\n\n".join(paragraphs) + "\n", paragraphs
+
+
+def generate_corpus(path, articles=100, citations=10, entries=500, seed=0):
+    """Write a synthetic content tree and return the paths it contains.
+
+    The tree holds a BibTeX bibliography with ``entries`` entries, the example
+    CSL style and ``articles`` Markdown articles with ``citations`` citation
+    clusters each, drawn from the bibliography with a fixed random seed.
+    """
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(path, "_bib_styles"), exist_ok=True)
+    shutil.copyfile(os.path.join(EXAMPLE_CONTENT, "_bib_styles", STYLE_NAME), os.path.join(path, STYLE_PATH))
+
+    with open(os.path.join(path, BIBLIOGRAPHY_PATH), "w", encoding="utf-8") as f:
+        for index in range(entries):
+            f.write(make_entry(index, rng))
+            f.write("\n")
+
+    keys = [f"ref{index:05d}" for index in range(entries)]
+    sources = []
+    for index in range(articles):
+        source, paragraphs = make_article(index, keys, citations, rng)
+        source_path = os.path.join(path, f"article-{index:05d}.md")
+        with open(source_path, "w", encoding="utf-8") as f:
+            f.write(source)
+        sources.append((source_path, "".join(f"<p>{paragraph}</p>\n" for paragraph in paragraphs)))
+    return sources
+
+
+def make_generator(settings, sources):
+    """Build a minimal article generator over a synthetic corpus."""
+    return SimpleNamespace(
+        settings=settings,
+        articles=[
+            SimpleNamespace(source_path=source_path, _content=content, citation_style=None, bibliography_file=None)
+            for source_path, content in sources
+        ]
+    )
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the pandoc executable used by the benchmark suite.
+
+Formats citations without reading the bibliography or style, sleeping a
+configurable time per process and per document and failing a configurable,
+deterministic share of documents. Configured through the environment:
+
+- FAKE_PANDOC_STARTUP: seconds slept once per process (default 0)
+- FAKE_PANDOC_LATENCY: seconds slept per rendered document (default 0)
+- FAKE_PANDOC_FAILURE_RATE: share of documents that fail, 0 to 1 (default 0)
+- FAKE_PANDOC_SEED: seed mixed into the failure decision (default "0")
+"""
+
+import hashlib
+import html
+import os
+import re
+import sys
+import time
+
+
+VERSION = "pandoc 3.1.11 (fake)"
+CITATION_PATTERN = re.compile(r"(?<![\w\\])(?P<suppress>-?)@(?P<key>\w+(?:[:.#$%&\-+?~/]+\w+)*)")
+CLUSTER_PATTERN = re.compile(r"^::: \{#(?P<id>citation-cluster-\d+)\}\n(?P<text>.*?)\n:::$", re.MULTILINE | re.DOTALL)
+NOCITE_PATTERN = re.compile(r"^---\nnocite: \|\n(?P<keys>.*?)\n---\n", re.DOTALL)
+METADATA_PATTERN = re.compile(r"^---\n(?s:.*?)\n---\n|^(?:[A-Za-z]+:[^\n]*\n)+\n")
+
+
+class FakePandocError(Exception):
+    """Raised for documents selected to fail."""
+
+
+def get_float(name):
+    """Read a float setting from the environment."""
+    return float(os.environ.get(name) or 0)
+
+
+def should_fail(text):
+    """Decide deterministically whether a document fails."""
+    rate = get_float("FAKE_PANDOC_FAILURE_RATE")
+    if rate <= 0:
+        return False
+    seed = os.environ.get("FAKE_PANDOC_SEED", "0")
+    digest = hashlib.sha256(f"{seed}\0{text}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 < rate
+
+
+def format_citation(text, keys):
+    """Replace the citations in a piece of Markdown with citation spans."""
+    def replace(match):
+        key = match.group("key")
+        keys.setdefault(key, None)
+        label = "" if match.group("suppress") else f"{key} "
+        return f'<span class="citation" data-cites="{html.escape(key)}">({label}2020)</span>'
+    return CITATION_PATTERN.sub(replace, text)
+
+
+def format_references(keys):
+    """Build a Pandoc-style reference list for the cited keys."""
+    if not keys:
+        return ""
+    entries = "".join(
+        f'<div id="ref-{html.escape(key)}" class="csl-entry" role="listitem">\n{html.escape(key)}. 2020.\n</div>\n'
+        for key in sorted(keys)
+    )
+    return f'<div id="refs" class="references csl-bib-body hanging-indent" role="list">\n{entries}</div>\n'
+
+
+def render_document(text):
+    """Render one Markdown document, either a whole article or a cluster document."""
+    time.sleep(get_float("FAKE_PANDOC_LATENCY"))
+    if should_fail(text):
+        raise FakePandocError("Simulated citeproc failure")
+    keys = {}
+    nocite = NOCITE_PATTERN.match(text)
+    if nocite:
+        for match in CITATION_PATTERN.finditer(nocite.group("keys")):
+            keys.setdefault(match.group("key"), None)
+    clusters = CLUSTER_PATTERN.findall(text)
+    if clusters:
+        body = "".join(
+            f'<div id="{cluster_id}">\n<p>{format_citation(cluster, keys)}</p>\n</div>\n'
+            for cluster_id, cluster in clusters
+        )
+    else:
+        paragraphs = [part.strip() for part in METADATA_PATTERN.sub("", text, count=1).split("\n\n")]
+        body = "".join(f"<p>{format_citation(part, keys)}</p>\n" for part in paragraphs if part)
+    return body + format_references(keys)
+
+
+def get_option(args, name):
+    """Return the values given for a command-line option."""
+    return [args[i + 1] for i, arg in enumerate(args[:-1]) if arg == name]
+
+
+def main(args):
+    """Run the fake pandoc command."""
+    if "--version" in args:
+        print(VERSION)
+        return 0
+    if args and args[0] == "server":
+        print("pandoc server is not supported by the fake pandoc", file=sys.stderr)
+        return 1
+    time.sleep(get_float("FAKE_PANDOC_STARTUP"))
+    try:
+        if "--lua-filter" in args:
+            metadata = dict(value.split("=", 1) for value in get_option(args, "--metadata"))
+            with open(metadata["citation-batch-input"], "r", encoding="utf-8") as f:
+                sources = f.read().split(metadata["citation-batch-boundary"])
+            sys.stdout.write(metadata["citation-batch-boundary"].join(render_document(source) for source in sources))
+        else:
+            sys.stdout.write(render_document(sys.stdin.read()))
+    except FakePandocError as e:
+        print(f"Error running filter: {e}", file=sys.stderr)
+        return 83
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
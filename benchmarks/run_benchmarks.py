@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner for the Pelican Citation Processor plugin.
+
+Generates a synthetic corpus and times citation processing end to end under
+each execution mode, using the fake pandoc executable by default:
+
+    python -m benchmarks.run_benchmarks --articles 200 --latency 0.02
+"""
+
+import argparse
+import json
+import os
+import stat
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from pelican.plugins.citation_processor import citation_processor
+
+from .corpus import BIBLIOGRAPHY_PATH, STYLE_PATH, generate_corpus, make_generator
+
+
+MODES = ("serial", "parallel", "batch")
+FAKE_PANDOC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_pandoc.py")
+
+
+def install_fake_pandoc(directory, startup=0.0, latency=0.0, failure_rate=0.0, seed=0):
+    """Put the fake pandoc executable first on PATH and configure it."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "pandoc")
+    with open(path, "w") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_PANDOC_PATH}" "$@"\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    os.environ["PATH"] = directory + os.pathsep + os.environ.get("PATH", "")
+    os.environ["FAKE_PANDOC_STARTUP"] = str(startup)
+    os.environ["FAKE_PANDOC_LATENCY"] = str(latency)
+    os.environ["FAKE_PANDOC_FAILURE_RATE"] = str(failure_rate)
+    os.environ["FAKE_PANDOC_SEED"] = str(seed)
+    return path
+
+
+def make_settings(content_path, mode, args, cache_path=None):
+    """Build the plugin settings for one benchmark run."""
+    return {
+        "PATH": content_path,
+        "CITATION_STYLE": STYLE_PATH,
+        "BIBLIOGRAPHY_FILE": BIBLIOGRAPHY_PATH,
+        "CITATION_EXECUTION_MODE": mode,
+        "CITATION_WORKERS": args.workers,
+        "CITATION_RENDERER": args.renderer,
+        "CITATION_RENDER_SCOPE": args.scope,
+        "CITATION_CACHE_PATH": cache_path,
+        "CITATION_TIMEOUT": args.timeout,
+        "CITATION_WARM_STATE": args.warm,
+        "DEBUG": False,
+    }
+
+
+def run_build(settings, sources):
+    """Process a fresh copy of the corpus once and return its timings and counts."""
+    generator = make_generator(settings, sources)
+    start = time.perf_counter()
+    citation_processor.process_generator_citations(generator)
+    elapsed = time.perf_counter() - start
+    totals = citation_processor._citation_metrics.summary()["totals"]
+    citation_processor.report_citation_stats(SimpleNamespace(settings=settings))
+    return {
+        "seconds": round(elapsed, 6),
+        "articles_per_second": round(len(sources) / elapsed, 2) if elapsed else None,
+        "rendered": totals["rendered"],
+        "cached": totals["cached"],
+        "warm": totals["warm"],
+        "skipped": totals["skipped"],
+        "failed": totals["failed"],
+        "render_seconds": totals["timings"]["render"],
+    }
+
+
+def run_benchmarks(args, work_dir):
+    """Run every requested mode over one generated corpus."""
+    content_path = os.path.join(work_dir, "content")
+    sources = generate_corpus(content_path, args.articles, args.citations, args.entries, args.seed)
+    results = []
+    for mode in args.modes:
+        citation_processor.clear_warm_state()
+        cache_path = os.path.join(work_dir, "cache", mode) if args.cache else None
+        settings = make_settings(content_path, mode, args, cache_path)
+        for run in range(args.repeat):
+            result = dict(run_build(settings, sources), mode=mode, run=run)
+            results.append(result)
+            print(
+                f"{mode:<9} run {run}: {result['seconds']:8.3f}s "
+                f"{result['articles_per_second'] or 0:9.1f} articles/s  "
+                f"rendered {result['rendered']:>5}  cached {result['cached']:>5}  warm {result['warm']:>5}  "
+                f"failed {result['failed']:>5}"
+            )
+    return results
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Benchmark citation processing for Pelican Citation Processor")
+    parser.add_argument("--articles", type=int, default=100, help="Number of articles to generate")
+    parser.add_argument("--citations", type=int, default=10, help="Citation clusters per article")
+    parser.add_argument("--entries", type=int, default=500, help="Bibliography entries")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the corpus and for fake pandoc failures")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES), help="Execution modes to time")
+    parser.add_argument("--repeat", type=int, default=1, help="Builds per mode")
+    parser.add_argument("--workers", type=int, default=None, help="Worker pool size (CITATION_WORKERS)")
+    parser.add_argument("--renderer", default="pandoc", help="Citation renderer (CITATION_RENDERER)")
+    parser.add_argument("--scope", choices=("document", "citations"), default="document", help="CITATION_RENDER_SCOPE")
+    parser.add_argument("--timeout", type=float, default=None, help="Pandoc timeout (CITATION_TIMEOUT)")
+    parser.add_argument("--cache", action="store_true", help="Use a persistent cache; later repeats hit it")
+    parser.add_argument("--warm", action="store_true", help="Keep in-process state between repeats")
+    parser.add_argument("--real-pandoc", action="store_true", help="Use the pandoc on PATH instead of the fake")
+    parser.add_argument("--startup", type=float, default=0.0, help="Fake pandoc seconds per process")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake pandoc seconds per document")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of documents fake pandoc fails")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="citation-benchmark-") as work_dir:
+        if not args.real_pandoc:
+            install_fake_pandoc(os.path.join(work_dir, "bin"), args.startup, args.latency, args.failure_rate, args.seed)
+        results = run_benchmarks(args, work_dir)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"arguments": vars(args), "results": results}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,12 @@ def test(ctx):
     ctx.run("pytest")
 
 
+@task
+def benchmark(ctx):
+    """Run the citation processing benchmarks."""
+    ctx.run("python -m benchmarks.run_benchmarks")
+
+
 @task
 def typecheck(ctx):
     """Run type checking."""
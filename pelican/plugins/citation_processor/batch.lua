@@ -0,0 +1,45 @@
+-- Renders several articles that share a citation style and bibliography in a
+-- single Pandoc process. The article sources are read from the file named by
+-- the citation-batch-input metadata field and separated by the
+-- citation-batch-boundary token. Each article is read and run through citeproc
+-- on its own, so it keeps its own reference list and citation numbering.
+-- The optional citation-batch-from field names the input format (markdown by
+-- default, or json for cached ASTs); citation-batch-to set to json parses the
+-- articles into ASTs without running citeproc.
+
+local function option(meta, name, default)
+  if meta[name] == nil then
+    return default
+  end
+  return pandoc.utils.stringify(meta[name])
+end
+
+function Pandoc(doc)
+  local input = pandoc.utils.stringify(doc.meta['citation-batch-input'])
+  local boundary = pandoc.utils.stringify(doc.meta['citation-batch-boundary'])
+  local from = option(doc.meta, 'citation-batch-from', 'markdown')
+  local to = option(doc.meta, 'citation-batch-to', 'html5')
+  local f = assert(io.open(input, 'r'))
+  local text = f:read('a')
+  f:close()
+
+  local outputs = {}
+  local start = 1
+  while true do
+    local first, last = string.find(text, boundary, start, true)
+    local source = first and text:sub(start, first - 1) or text:sub(start)
+    local article = pandoc.read(source, from)
+    if to ~= 'json' then
+      article.meta.bibliography = doc.meta.bibliography
+      article.meta.csl = doc.meta.csl
+      article = pandoc.utils.citeproc(article)
+    end
+    table.insert(outputs, pandoc.write(article, to))
+    if not first then
+      break
+    end
+    start = last + 1
+  end
+
+  return pandoc.Pandoc({pandoc.RawBlock('html', table.concat(outputs, boundary))})
+end
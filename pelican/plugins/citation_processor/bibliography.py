@@ -0,0 +1,437 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import subprocess
+import tempfile
+import threading
+
+from .cache import file_digest
+
+
+ENTRY_START_PATTERN = re.compile(r'@\s*(?P<type>\w+)\s*(?P<open>[{(])')
+ENTRY_KEY_PATTERN = re.compile(r'\s*(?P<key>[^\s,{}()"#%\'=]+)\s*,')
+PARENT_FIELD_PATTERN = re.compile(
+    r'\b(?:crossref|xref|xdata)\s*=\s*(?:\{(?P<braced>[^{}]*)\}|"(?P<quoted>[^"]*)"|(?P<bare>[^\s,{}]+))',
+    re.IGNORECASE
+)
+NAME_FIELD_PATTERN = re.compile(r'\b(?:author|editor)\s*=\s*[{"]', re.IGNORECASE)
+NAME_SEPARATOR_PATTERN = re.compile(r'\s+and\s+', re.IGNORECASE)
+DELIMITER_PATTERN = re.compile(r'[{}()]')
+CLOSE_CHARS = {'{': '}', '(': ')', b'{': b'}', b'(': b')'}
+BIBTEX_FORMATS = {'.bib': 'biblatex', '.bibtex': 'bibtex'}
+KEY_INDEX_NAME = 'bibliography-keys.json'
+KEY_INDEX_VERSION = 1
+
+
+def bytes_pattern(pattern):
+    return re.compile(pattern.pattern.encode('ascii'), pattern.flags & re.IGNORECASE)
+
+
+BYTES_PATTERNS = {
+    pattern: bytes_pattern(pattern)
+    for pattern in (ENTRY_START_PATTERN, ENTRY_KEY_PATTERN, PARENT_FIELD_PATTERN, DELIMITER_PATTERN)
+}
+
+_bibliography_indexes = {}
+_key_indexes = {}
+_bibliography_lock = threading.Lock()
+_compiled_bibliographies = {}
+_compile_locks = {}
+
+
+def get_pattern(pattern, text):
+    return pattern if isinstance(text, str) else BYTES_PATTERNS[pattern]
+
+
+def decode(value):
+    return value if isinstance(value, str) else value.decode('utf-8', 'replace')
+
+
+def find_entry_end(text, start, open_char):
+    close_char = CLOSE_CHARS[open_char]
+    depth = 0
+    for match in get_pattern(DELIMITER_PATTERN, text).finditer(text, start):
+        char = match.group()
+        if char in ('{', b'{', open_char):
+            depth += 1
+        elif char in ('}', b'}', close_char):
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return len(text)
+
+
+def scan_bibtex(text):
+    position = 0
+    while True:
+        match = get_pattern(ENTRY_START_PATTERN, text).search(text, position)
+        if match is None:
+            return
+        start = match.start()
+        end = find_entry_end(text, match.start('open'), match.group('open'))
+        position = end
+        entry_type = decode(match.group('type')).lower()
+        if entry_type == 'comment':
+            continue
+        if entry_type in ('string', 'preamble'):
+            yield None, start, end, []
+            continue
+        key_match = get_pattern(ENTRY_KEY_PATTERN, text).match(text, match.end())
+        if key_match is None:
+            continue
+        parents = []
+        for parent_match in get_pattern(PARENT_FIELD_PATTERN, text).finditer(text, key_match.end(), end):
+            value = decode(next(group for group in parent_match.groups() if group is not None))
+            parents.extend(part.strip() for part in value.split(',') if part.strip())
+        yield decode(key_match.group('key')), start, end, parents
+
+
+def entry_family_name(text, start, end):
+    match = NAME_FIELD_PATTERN.search(text, start, end)
+    if match is None:
+        return None
+    if text[match.end() - 1] == '"':
+        value_end = text.find('"', match.end(), end)
+    else:
+        value_end = find_entry_end(text, match.end() - 1, '{') - 1
+    value = text[match.end():value_end]
+    name = NAME_SEPARATOR_PATTERN.split(value.strip(' {}"'), 1)[0]
+    name = name.split(',')[0] if ',' in name else name.split()[-1] if name.split() else ''
+    return name.strip(' {}').lower() or None
+
+
+class BibliographyIndex:
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'r', encoding='utf-8') as f:
+            self.text = f.read()
+        self.digest = hashlib.sha256(self.text.encode('utf-8')).hexdigest()
+        self.entries = {}
+        self.parents = {}
+        self.definitions = []
+        self._parse()
+
+    def _parse(self):
+        for key, start, end, parents in scan_bibtex(self.text):
+            if key is None:
+                self.definitions.append((start, end))
+                continue
+            self.entries.setdefault(key, (start, end))
+            if parents:
+                self.parents[key] = parents
+
+    def entry(self, key):
+        start, end = self.entries[key]
+        return self.text[start:end]
+
+    def resolve_keys(self, keys):
+        resolved = set()
+        pending = list(keys)
+        while pending:
+            key = pending.pop()
+            if key in resolved or key not in self.entries:
+                continue
+            resolved.add(key)
+            pending.extend(self.parents.get(key, []))
+        return resolved
+
+    def definitions_text(self):
+        return ''.join(self.text[start:end] for start, end in self.definitions)
+
+    def entry_hashes(self, keys):
+        hashes = {key: '' for key in keys}
+        for key in self.resolve_keys(keys):
+            hashes[key] = hashlib.sha256(self.entry(key).encode('utf-8')).hexdigest()
+        if self.definitions:
+            hashes['@string'] = hashlib.sha256(self.definitions_text().encode('utf-8')).hexdigest()
+        return hashes
+
+    def family_name(self, key):
+        if key not in self.entries:
+            return None
+        start, end = self.entries[key]
+        return entry_family_name(self.text, start, end)
+
+    def prune(self, keys):
+        resolved = self.resolve_keys(keys)
+        spans = self.definitions + [self.entries[key] for key in resolved]
+        return '\n\n'.join(self.text[start:end] for start, end in sorted(spans)) + '\n'
+
+
+def scan_bibtex_file(path):
+    record = {'signature': list(file_signature(path)), 'entries': {}, 'parents': {}, 'definitions': [], 'duplicates': []}
+    with open(path, 'rb') as f:
+        if not record['signature'][1]:
+            return record
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for key, start, end, parents in scan_bibtex(data):
+                span = [start, end - start]
+                if key is None:
+                    record['definitions'].append(span)
+                elif key in record['entries']:
+                    record['duplicates'].append(key)
+                else:
+                    record['entries'][key] = span
+                    if parents:
+                        record['parents'][key] = parents
+    return record
+
+
+class BibliographyKeyIndex:
+
+    def __init__(self, path=None):
+        self.path = path
+        self.dirty = False
+        self._lock = threading.Lock()
+        data = {}
+        if path is not None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+        self.files = data.get('files', {}) if data.get('version') == KEY_INDEX_VERSION else {}
+
+    def scan(self, path):
+        signature = list(file_signature(path))
+        with self._lock:
+            record = self.files.get(path)
+            if record is not None and record['signature'] == signature:
+                return record
+        record = scan_bibtex_file(path)
+        with self._lock:
+            self.files[path] = record
+            self.dirty = True
+        return record
+
+    def save(self):
+        with self._lock:
+            if self.path is None or not self.dirty:
+                return
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': KEY_INDEX_VERSION, 'files': self.files}, f, sort_keys=True)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+
+
+class BibliographySetIndex(BibliographyIndex):
+
+    def __init__(self, paths, key_index):
+        self.paths = paths
+        self.entries = {}
+        self.parents = {}
+        self.definitions = []
+        self.duplicates = {}
+        self._texts = {}
+        for path in paths:
+            record = key_index.scan(path)
+            self.definitions.extend((path, offset, length) for offset, length in record['definitions'])
+            for key in record['duplicates']:
+                self.duplicates.setdefault(key, [path]).append(path)
+            for key, (offset, length) in record['entries'].items():
+                if key in self.entries:
+                    self.duplicates.setdefault(key, [self.entries[key][0]]).append(path)
+                    continue
+                self.entries[key] = (path, offset, length)
+                if key in record['parents']:
+                    self.parents[key] = record['parents'][key]
+
+    def read(self, path, offset, length):
+        text = self._texts.get((path, offset))
+        if text is None:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                text = f.read(length).decode('utf-8')
+            self._texts[(path, offset)] = text
+        return text
+
+    def entry(self, key):
+        return self.read(*self.entries[key])
+
+    def definitions_text(self):
+        return ''.join(self.read(*definition) for definition in self.definitions)
+
+    def family_name(self, key):
+        if key not in self.entries:
+            return None
+        text = self.entry(key)
+        return entry_family_name(text, 0, len(text))
+
+    def prune(self, keys):
+        resolved = sorted(
+            (self.paths.index(self.entries[key][0]), self.entries[key][1], key)
+            for key in self.resolve_keys(keys)
+        )
+        texts = [self.read(*definition) for definition in self.definitions]
+        texts.extend(self.entry(key) for _, _, key in resolved)
+        return '\n\n'.join(texts) + '\n'
+
+
+class CslJsonIndex:
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'r', encoding='utf-8') as f:
+            self.text = f.read()
+        self.digest = hashlib.sha256(self.text.encode('utf-8')).hexdigest()
+        self.items = json.loads(self.text)
+        self.entries = {item['id']: item for item in self.items if 'id' in item}
+
+    def entry(self, key):
+        return json.dumps(self.entries[key], ensure_ascii=False, sort_keys=True)
+
+    def resolve_keys(self, keys):
+        return {key for key in keys if key in self.entries}
+
+    def entry_hashes(self, keys):
+        hashes = {key: '' for key in keys}
+        for key in self.resolve_keys(keys):
+            hashes[key] = hashlib.sha256(self.entry(key).encode('utf-8')).hexdigest()
+        return hashes
+
+    def family_name(self, key):
+        names = self.entries.get(key, {}).get('author') or self.entries.get(key, {}).get('editor') or []
+        if not names:
+            return None
+        name = names[0].get('family') or names[0].get('literal') or ''
+        return name.lower() or None
+
+    def prune(self, keys):
+        resolved = self.resolve_keys(keys)
+        items = [item for item in self.items if item.get('id') in resolved]
+        return json.dumps(items, ensure_ascii=False, indent=2) + '\n'
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def split_bibliography_files(value):
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = value.split(',')
+    return tuple(path.strip() for path in value if path and path.strip())
+
+
+def is_indexed(bibliography_path):
+    if isinstance(bibliography_path, tuple):
+        return True
+    extension = os.path.splitext(bibliography_path)[1].lower()
+    return extension in BIBTEX_FORMATS or extension == '.json'
+
+
+def get_key_index(cache_path=None):
+    if cache_path not in _key_indexes:
+        path = os.path.join(cache_path, KEY_INDEX_NAME) if cache_path else None
+        _key_indexes[cache_path] = BibliographyKeyIndex(path)
+    return _key_indexes[cache_path]
+
+
+def get_bibliography_index(path, cache_path=None):
+    if isinstance(path, tuple):
+        signature = tuple(file_signature(file_path) for file_path in path)
+    else:
+        signature = file_signature(path)
+    with _bibliography_lock:
+        cached = _bibliography_indexes.get(path)
+        if cached is None or cached[0] != signature:
+            if isinstance(path, tuple):
+                key_index = get_key_index(cache_path)
+                cached = (signature, BibliographySetIndex(path, key_index))
+                key_index.save()
+            elif os.path.splitext(path)[1].lower() == '.json':
+                cached = (signature, CslJsonIndex(path))
+            else:
+                cached = (signature, BibliographyIndex(path))
+            _bibliography_indexes[path] = cached
+        return cached[1]
+
+
+def get_entry_hashes(bibliography_path, keys, cache_path=None):
+    if not is_indexed(bibliography_path):
+        return {'*': file_digest(bibliography_path)}
+    return get_bibliography_index(bibliography_path, cache_path).entry_hashes(keys)
+
+
+def get_family_names(bibliography_path, keys, cache_path=None):
+    if not is_indexed(bibliography_path):
+        return {}
+    index = get_bibliography_index(bibliography_path, cache_path)
+    return {key: index.family_name(key) for key in keys}
+
+
+def get_artifact_dir(cache_path, name):
+    if cache_path:
+        directory = os.path.join(cache_path, name)
+    else:
+        directory = os.path.join(tempfile.gettempdir(), 'pelican-citation-processor', name)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def write_artifact(directory, text, extension):
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    path = os.path.join(directory, digest + extension)
+    if not os.path.exists(path):
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    return path
+
+
+def prune_bibliography(bibliography_path, keys, cache_path=None):
+    if not is_indexed(bibliography_path):
+        return bibliography_path
+    if isinstance(bibliography_path, tuple):
+        extension = '.bib'
+    else:
+        extension = os.path.splitext(bibliography_path)[1].lower()
+    index = get_bibliography_index(bibliography_path, cache_path)
+    directory = get_artifact_dir(cache_path, 'bibliographies')
+    return write_artifact(directory, index.prune(keys), extension)
+
+
+def compile_bibliography(bibliography_path, pandoc_version, cache_path=None, timeout=None):
+    extension = os.path.splitext(bibliography_path)[1].lower()
+    if extension not in BIBTEX_FORMATS:
+        return bibliography_path
+    with _bibliography_lock:
+        lock = _compile_locks.setdefault(bibliography_path, threading.Lock())
+    with lock:
+        signature = file_signature(bibliography_path)
+        cached = _compiled_bibliographies.get(bibliography_path)
+        if cached is not None and cached[0] == signature and os.path.exists(cached[1]):
+            return cached[1]
+        with open(bibliography_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        input_format = BIBTEX_FORMATS[extension]
+        name = hashlib.sha256(f'{digest}:{input_format}:{pandoc_version}'.encode('utf-8')).hexdigest()
+        compiled_path = os.path.join(get_artifact_dir(cache_path, 'csljson'), name + '.json')
+        if not os.path.exists(compiled_path):
+            result = subprocess.run(
+                [
+                    'pandoc',
+                    '--from', input_format,
+                    '--to', 'csljson',
+                    bibliography_path
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+                timeout=timeout
+            )
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(compiled_path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(result.stdout)
+            os.replace(temp_path, compiled_path)
+        _compiled_bibliographies[bibliography_path] = (signature, compiled_path)
+        return compiled_path
@@ -0,0 +1,253 @@
+import hashlib
+import io
+import json
+import os
+import re
+import tarfile
+import tempfile
+import time
+
+
+BUNDLE_FORMAT = 1
+BUNDLE_SUFFIX = '.tar.gz'
+MANIFEST_NAME = 'manifest.json'
+ENTRY_PATTERN = re.compile(r'^entries/(?P<key>[0-9a-f]{64})\.html$')
+BUNDLE_NAME_PATTERN = re.compile(r'^[A-Za-z0-9._-]+$')
+PATH_FIELDS = ('style', 'bibliography')
+
+
+class BundleError(Exception):
+    pass
+
+
+def entry_name(key):
+    return f'entries/{key}.html'
+
+
+def relative_path(path, base_path):
+    if not path or not base_path:
+        return path
+    relative = os.path.relpath(path, base_path)
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        return path
+    return relative.replace(os.sep, '/')
+
+
+def absolute_path(path, base_path):
+    if not path or not base_path or os.path.isabs(path):
+        return path
+    return os.path.join(base_path, *path.split('/'))
+
+
+def map_paths(article, convert, base_path):
+    article = dict(article)
+    for field in PATH_FIELDS:
+        value = article.get(field)
+        if isinstance(value, list):
+            article[field] = [convert(path, base_path) for path in value]
+        else:
+            article[field] = convert(value, base_path)
+    return article
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def newest_renderer(articles):
+    recorded = [article for article in articles.values() if article.get('renderer')]
+    if not recorded:
+        return None
+    return max(recorded, key=lambda article: article.get('recorded', 0))['renderer']
+
+
+def read_manifest(bundle_path):
+    try:
+        with tarfile.open(bundle_path, 'r:gz') as archive:
+            member = archive.next()
+            if member is None or member.name != MANIFEST_NAME:
+                raise BundleError(f'{bundle_path} does not start with {MANIFEST_NAME}')
+            manifest = json.load(archive.extractfile(member))
+    except (OSError, tarfile.TarError, ValueError) as e:
+        raise BundleError(f'Could not read citation bundle {bundle_path}: {e}')
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise BundleError(f"Unsupported citation bundle format {manifest.get('format')!r} in {bundle_path}")
+    return manifest
+
+
+def iter_entries(bundle_path):
+    try:
+        with tarfile.open(bundle_path, 'r:gz') as archive:
+            for member in archive:
+                match = ENTRY_PATTERN.match(member.name)
+                if match is None or not member.isfile():
+                    continue
+                yield match.group('key'), archive.extractfile(member).read()
+    except (OSError, EOFError, tarfile.TarError) as e:
+        raise BundleError(f'Could not read citation bundle {bundle_path}: {e}')
+
+
+def write_bundle(bundle_path, manifest, payloads):
+    directory = os.path.dirname(os.path.abspath(bundle_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f, tarfile.open(fileobj=f, mode='w:gz') as archive:
+            data = json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+            add_member(archive, MANIFEST_NAME, data)
+            for key, data in payloads:
+                add_member(archive, entry_name(key), data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, bundle_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def add_member(archive, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mode = 0o644
+    archive.addfile(info, io.BytesIO(data))
+
+
+def export_bundle(bundle_path, citation_cache, dependency_index, base_path=None):
+    articles = {}
+    entries = {}
+    for source_path, article in sorted(dependency_index.articles.items()):
+        key = article.get('key')
+        if not key or not os.path.exists(source_path):
+            continue
+        if key not in entries:
+            try:
+                sha256, size = hash_file(citation_cache.entry_path(key))
+            except OSError:
+                continue
+            entries[key] = {'sha256': sha256, 'size': size, 'renderer': article.get('renderer')}
+        articles[relative_path(source_path, base_path)] = map_paths(article, relative_path, base_path)
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'created': time.time(),
+        'pandoc_version': newest_renderer(articles),
+        'entries': entries,
+        'articles': articles
+    }
+
+    def payloads():
+        for key in sorted(entries):
+            with open(citation_cache.entry_path(key), 'rb') as f:
+                yield key, f.read()
+
+    write_bundle(bundle_path, manifest, payloads())
+    return manifest
+
+
+def import_bundle(bundle_path, citation_cache, dependency_index, base_path=None, renderer=None):
+    manifest = read_manifest(bundle_path)
+    stats = {'imported': 0, 'existing': 0, 'stale': 0, 'invalid': 0}
+    accepted = set()
+    for key, data in iter_entries(bundle_path):
+        entry = manifest['entries'].get(key)
+        if entry is None or hashlib.sha256(data).hexdigest() != entry['sha256']:
+            stats['invalid'] += 1
+            continue
+        if renderer is not None and entry.get('renderer') != renderer:
+            stats['stale'] += 1
+            continue
+        accepted.add(key)
+        if os.path.exists(citation_cache.entry_path(key)):
+            stats['existing'] += 1
+            continue
+        citation_cache.put(key, data.decode('utf-8'))
+        stats['imported'] += 1
+    for source, article in manifest['articles'].items():
+        if article.get('key') not in accepted:
+            continue
+        source_path = absolute_path(source, base_path)
+        current = dependency_index.articles.get(source_path)
+        if current is None or current.get('recorded', 0) < article.get('recorded', 0):
+            dependency_index.articles[source_path] = map_paths(article, absolute_path, base_path)
+    dependency_index.save()
+    return stats
+
+
+def merge_bundles(bundle_path, bundle_paths, pandoc_version=None):
+    manifests = sorted(
+        ((read_manifest(path), path) for path in bundle_paths),
+        key=lambda item: item[0].get('created', 0)
+    )
+    if not manifests:
+        raise BundleError('No citation bundles to merge')
+    if pandoc_version is None:
+        pandoc_version = manifests[-1][0].get('pandoc_version')
+    stats = {'bundles': len(manifests), 'entries': 0, 'duplicates': 0, 'stale': 0}
+
+    articles = {}
+    for manifest, _ in manifests:
+        for source, article in manifest['articles'].items():
+            if pandoc_version is not None and article.get('renderer') != pandoc_version:
+                continue
+            current = articles.get(source)
+            if current is None or current.get('recorded', 0) <= article.get('recorded', 0):
+                articles[source] = article
+    live = {article['key'] for article in articles.values()}
+
+    entries = {}
+    for manifest, _ in manifests:
+        for key, entry in manifest['entries'].items():
+            if key not in live:
+                stats['stale'] += 1
+            elif key in entries:
+                stats['duplicates'] += 1
+            else:
+                entries[key] = entry
+    stats['entries'] = len(entries)
+    merged = {
+        'format': BUNDLE_FORMAT,
+        'created': time.time(),
+        'pandoc_version': pandoc_version,
+        'entries': entries,
+        'articles': articles
+    }
+
+    def payloads():
+        written = set()
+        for _, path in reversed(manifests):
+            for key, data in iter_entries(path):
+                if key in entries and key not in written and hashlib.sha256(data).hexdigest() == entries[key]['sha256']:
+                    written.add(key)
+                    yield key, data
+        missing = set(entries) - written
+        if missing:
+            raise BundleError(f'{len(missing)} citation bundle entries are listed but missing from the archives')
+
+    write_bundle(bundle_path, merged, payloads())
+    return stats
+
+
+class BundleStore:
+
+    def __init__(self, path):
+        self.path = path
+
+    def bundle_path(self, name):
+        if not BUNDLE_NAME_PATTERN.match(name):
+            raise BundleError(f'Invalid citation bundle name {name!r}')
+        return os.path.join(self.path, name + BUNDLE_SUFFIX)
+
+    def get(self, name):
+        path = self.bundle_path(name)
+        return path if os.path.exists(path) else None
+
+    def names(self):
+        try:
+            filenames = os.listdir(self.path)
+        except OSError:
+            return []
+        return sorted(filename[:-len(BUNDLE_SUFFIX)] for filename in filenames if filename.endswith(BUNDLE_SUFFIX))
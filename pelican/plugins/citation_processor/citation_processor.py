@@ -1,14 +1,145 @@
+import atexit
+import concurrent.futures
+import json
 import os
 import subprocess
 import tempfile
+import threading
+import uuid
 from pelican import signals
+from pelican.generators import Generator
+
+from .bibliography import compile_bibliography, get_entry_hashes, prune_bibliography, split_bibliography_files
+from .cache import CitationCache, cache_key, file_digest
+from .config import get_setting
+from .context import BuildContext, resolve_file_path
+from .dependencies import DependencyIndex
+from .failures import CitationFailures, NegativeCache, classify_failure, is_deterministic
+from .metrics import DEFAULT_SLOWEST, CitationMetrics, timed
+from .references import (
+    DEFAULT_STUB_WORDS,
+    SharedReferences,
+    build_reference_pages,
+    get_reference_page,
+    share_reference_list,
+    split_reference_list,
+    shares_references,
+)
+from .renderers import PARSE_PANDOC_ARGS, RENDERERS, get_pandoc_version, uses_pandoc_ast
+from .scan import build_cluster_document, find_citation_keys, strip_metadata_header
+from .spill import SpilledHTML, SpillStore, assign_spilled, release_loaded_contents
+from .trace import CitationTrace
+
+
+SHARED_MEMORY_DIR = '/dev/shm'
+BATCH_FILTER_PATH = os.path.join(os.path.dirname(__file__), 'batch.lua')
+
+_citation_caches = {}
+_ast_caches = {}
+_dependency_indexes = {}
+_negative_caches = {}
+_rendered_citations = {}
+_spill_stores = {}
+CONTENT_COLLECTIONS = (
+    'articles', 'translations', 'drafts', 'drafts_translations',
+    'pages', 'hidden_pages', 'hidden_translations', 'draft_pages', 'draft_translations'
+)
+_scan_stats = {'scanned': 0, 'skipped': 0}
+_citation_metrics = CitationMetrics()
+_citation_trace = CitationTrace()
+_citation_failures = CitationFailures()
+_shared_references = SharedReferences()
+_renderers = {}
+_renderers_lock = threading.Lock()
+_build_context = None
+_build_generation = 0
+
+
+def get_citation_cache(settings):
+    cache_path = get_setting(settings, 'CITATION_CACHE_PATH', None)
+    if not cache_path:
+        return None
+    cache_path = os.path.abspath(cache_path)
+    if cache_path not in _citation_caches:
+        max_size = get_setting(settings, 'CITATION_CACHE_MAX_SIZE', None)
+        _citation_caches[cache_path] = CitationCache(cache_path, max_size)
+    return _citation_caches[cache_path]
+
+
+def get_ast_cache(settings):
+    citation_cache = get_citation_cache(settings)
+    if citation_cache is None:
+        return None
+    if citation_cache.path not in _ast_caches:
+        ast_path = os.path.join(citation_cache.path, 'ast')
+        _ast_caches[citation_cache.path] = CitationCache(ast_path, citation_cache.max_size, suffix='.json')
+    return _ast_caches[citation_cache.path]
+
+
+def get_renderer(settings):
+    name = get_setting(settings, 'CITATION_RENDERER', 'pandoc')
+    if name not in RENDERERS:
+        if get_setting(settings, 'DEBUG', False):
+            print(f"Unknown citation renderer {name}, falling back to pandoc")
+        name = 'pandoc'
+    elif not RENDERERS[name].available():
+        if get_setting(settings, 'DEBUG', False):
+            print(f"Citation renderer {name} is not installed, falling back to pandoc")
+        name = 'pandoc'
+    with _renderers_lock:
+        if name not in _renderers:
+            _renderers[name] = RENDERERS[name]()
+        return _renderers[name]
+
+
+def close_renderers():
+    with _renderers_lock:
+        for renderer in _renderers.values():
+            renderer.close()
+        _renderers.clear()
+
+
+def get_dependency_index(settings):
+    citation_cache = get_citation_cache(settings)
+    if citation_cache is None:
+        return None
+    if citation_cache.path not in _dependency_indexes:
+        index_path = os.path.join(citation_cache.path, 'dependencies.json')
+        _dependency_indexes[citation_cache.path] = DependencyIndex(index_path)
+    return _dependency_indexes[citation_cache.path]
+
+
+def get_negative_cache(settings):
+    citation_cache = get_citation_cache(settings)
+    if citation_cache is None or not get_setting(settings, 'CITATION_NEGATIVE_CACHE', True):
+        return None
+    if citation_cache.path not in _negative_caches:
+        _negative_caches[citation_cache.path] = NegativeCache(os.path.join(citation_cache.path, 'failures.json'))
+    return _negative_caches[citation_cache.path]
+
+
+def get_spill_store(settings):
+    if get_setting(settings, 'CITATION_STORAGE', 'memory') != 'disk':
+        return None
+    spill_path = get_setting(settings, 'CITATION_SPILL_PATH', None)
+    spill_path = os.path.abspath(spill_path) if spill_path else None
+    if spill_path not in _spill_stores:
+        compress = get_setting(settings, 'CITATION_SPILL_COMPRESS', False)
+        _spill_stores[spill_path] = SpillStore(spill_path, compress)
+    return _spill_stores[spill_path]
+
+
+def close_spill_stores():
+    for spill_store in _spill_stores.values():
+        spill_store.close()
+    _spill_stores.clear()
 
 
 def resolve_citation_config(article_generator, content):
     settings = article_generator.settings
     
-    global_citation_style = getattr(settings, 'CITATION_STYLE', None)
-    global_bibliography_file = getattr(settings, 'BIBLIOGRAPHY_FILE', '_bibliography.bib')
+    global_citation_style = get_setting(settings, 'CITATION_STYLE', None)
+    global_bibliography_file = get_setting(settings, 'BIBLIOGRAPHY_FILE', '_bibliography.bib')
     
     local_citation_style = getattr(content, 'citation_style', None)
     local_bibliography_file = getattr(content, 'bibliography_file', None)
@@ -22,113 +153,767 @@ def resolve_citation_config(article_generator, content):
     }
 
 
-def resolve_file_path(base_path, file_path, settings):
-    if os.path.isabs(file_path):
-        return file_path
-    
-    content_path = os.path.join(base_path, file_path)
-    if os.path.exists(content_path):
-        return content_path
-    
-    settings_path = os.path.join(settings.get('PATH', ''), file_path)
-    if os.path.exists(settings_path):
-        return settings_path
-    
-    return content_path
+def get_build_context(settings):
+    global _build_context
+    if _build_context is None or _build_context.settings is not settings:
+        _build_context = BuildContext(settings)
+    return _build_context
 
 
-def process_citations(article_generator, content):
-    if not hasattr(content, '_content') or content._content is None:
-        return
-    
+def initialize_build_context(pelican_obj):
+    settings = pelican_obj.settings
+    if _build_context is not None and _build_context.settings is not settings:
+        clear_warm_state()
+    context = get_build_context(settings)
+    context.probe()
+    citation_style = get_setting(settings, 'CITATION_STYLE', None)
+    bibliography_file = get_setting(settings, 'BIBLIOGRAPHY_FILE', '_bibliography.bib')
+    if citation_style and bibliography_file:
+        context.check(citation_style, bibliography_file)
+    context.report()
+
+
+def build_citation_job(article_generator, content, timings=None):
     settings = article_generator.settings
-    citation_config = resolve_citation_config(article_generator, content)
+    if timings is None:
+        timings = {}
+    source_path = getattr(content, 'source_path', None)
     
-    citation_style = citation_config['citation_style']
-    bibliography_file = citation_config['bibliography_file']
+    with timed(timings, 'resolve'):
+        with _citation_trace.span('config', source_path):
+            citation_config = resolve_citation_config(article_generator, content)
+        
+        citation_style = citation_config['citation_style']
+        bibliography_file = citation_config['bibliography_file']
+        
+        if not citation_style or not bibliography_file:
+            return None
+        
+        with _citation_trace.span('paths', source_path):
+            citation_style_path, bibliography_path, error = get_build_context(settings).check(
+                citation_style, bibliography_file, source_path
+            )
+            if error is not None:
+                if get_setting(settings, 'DEBUG', False):
+                    print(error)
+                return None
+            
+            if not source_path or not os.path.exists(source_path):
+                if get_setting(settings, 'DEBUG', False):
+                    print(f"Source file not found: {source_path}")
+                return None
     
-    if not citation_style or not bibliography_file:
-        return
+    with timed(timings, 'io'), _citation_trace.span('read', source_path):
+        try:
+            with open(source_path, 'r') as f:
+                source = f.read()
+        except OSError as e:
+            if get_setting(settings, 'DEBUG', False):
+                print(f"Source file could not be read: {e}")
+            return None
     
-    base_path = settings.get('PATH', '')
-    bibliography_path = resolve_file_path(base_path, bibliography_file, settings)
-    citation_style_path = resolve_file_path(base_path, citation_style, settings)
+    _scan_stats['scanned'] += 1
+    with timed(timings, 'scan'), _citation_trace.span('scan', source_path):
+        citation_keys = find_citation_keys(source)
+    if not citation_keys:
+        _scan_stats['skipped'] += 1
+        if get_setting(settings, 'DEBUG', False):
+            print(f"No citations found in {source_path}, skipping")
+        return None
     
-    if not os.path.exists(bibliography_path):
-        if getattr(settings, 'DEBUG', False):
-            print(f"Bibliography file not found: {bibliography_path}")
+    return {
+        'source_path': source_path,
+        'source': source,
+        'html': content._content,
+        'citation_keys': citation_keys,
+        'bibliography_path': bibliography_path,
+        'citation_style_path': citation_style_path,
+        'timings': timings
+    }
+
+
+def lookup_cached_citations(settings, job):
+    citation_cache = get_citation_cache(settings)
+    if citation_cache is None:
+        return None
+    entry_hashes = get_entry_hashes(job['bibliography_path'], job['citation_keys'], citation_cache.path)
+    style_hash = file_digest(job['citation_style_path'])
+    renderer = get_renderer(settings)
+    job['cache_key'] = cache_key(
+        job['source'],
+        json.dumps(entry_hashes, sort_keys=True),
+        style_hash,
+        *renderer.cache_parts(settings, job)
+    )
+    get_dependency_index(settings).record(
+        job['source_path'],
+        cache_key(job['source']),
+        job['citation_style_path'],
+        style_hash,
+        job['bibliography_path'],
+        entry_hashes,
+        cache_key=job['cache_key'],
+        renderer=renderer.version()
+    )
+    return citation_cache.get(job['cache_key'])
+
+
+def store_cached_citations(settings, job, processed_content):
+    citation_cache = get_citation_cache(settings)
+    if citation_cache is not None:
+        citation_cache.put(job['cache_key'], processed_content)
+    negative_cache = get_negative_cache(settings)
+    if negative_cache is not None:
+        negative_cache.discard(job['source_path'])
+
+
+def get_pandoc_bibliography(settings, bibliography_path, citation_keys):
+    cache_path = get_setting(settings, 'CITATION_CACHE_PATH', None)
+    if isinstance(bibliography_path, tuple):
+        return prune_bibliography(bibliography_path, citation_keys, cache_path)
+    if get_setting(settings, 'CITATION_COMPILE_BIBLIOGRAPHY', False):
+        bibliography_path = compile_bibliography(
+            bibliography_path,
+            get_pandoc_version(),
+            cache_path,
+            get_setting(settings, 'CITATION_TIMEOUT', None)
+        )
+    if get_setting(settings, 'CITATION_PRUNE_BIBLIOGRAPHY', False):
+        bibliography_path = prune_bibliography(bibliography_path, citation_keys, cache_path)
+    return bibliography_path
+
+
+def load_pandoc_asts(settings, jobs):
+    ast_cache = get_ast_cache(settings)
+    renderer = get_renderer(settings)
+    missing = []
+    for job in jobs:
+        if 'ast' in job:
+            continue
+        job['ast_key'] = cache_key(job['source'], renderer.version(), *PARSE_PANDOC_ARGS)
+        ast = ast_cache.get(job['ast_key'])
+        if ast is None:
+            missing.append(job)
+        else:
+            job['ast'] = ast
+    if not missing:
         return
+    texts = [strip_metadata_header(job['source']) for job in missing]
+    if len(missing) > 1:
+        asts = run_batch_filter(settings, texts, ['--metadata', 'citation-batch-to=json'])
+    else:
+        asts = [renderer.parse(settings, texts[0])]
+    for job, ast in zip(missing, asts):
+        job['ast'] = ast.strip()
+        ast_cache.put(job['ast_key'], job['ast'])
+
+
+def render_citations(settings, job):
+    with timed(job.setdefault('timings', {}), 'render'), _citation_trace.span('render', job.get('source_path')):
+        bibliography_path = get_pandoc_bibliography(
+            settings, job['bibliography_path'], job['citation_keys']
+        )
+        renderer = get_renderer(settings)
+        if renderer.parses_ast and uses_pandoc_ast(settings):
+            load_pandoc_asts(settings, [job])
+        return renderer.render(settings, job, bibliography_path)
+
+
+def render_uncached_citation_job(settings, job):
+    processed_content = render_citations(settings, job)
+    with timed(job.setdefault('timings', {}), 'cache'), _citation_trace.span('cache', job.get('source_path')):
+        store_cached_citations(settings, job, processed_content)
     
-    if not os.path.exists(citation_style_path):
-        if getattr(settings, 'DEBUG', False):
-            print(f"Citation style file not found: {citation_style_path}")
-        return
+    if get_setting(settings, 'DEBUG', False):
+        print(f"Successfully processed citations for {job['source_path']}")
     
-    source_path = getattr(content, 'source_path', None)
-    if not source_path or not os.path.exists(source_path):
-        if getattr(settings, 'DEBUG', False):
-            print(f"Source file not found: {source_path}")
+    return processed_content
+
+
+def get_job_config(job):
+    return (job.get('citation_style_path'), job.get('bibliography_path'))
+
+
+def check_citation_job(settings, job):
+    message = _citation_failures.check(get_job_config(job), job['source_path'])
+    if message is not None:
+        if get_setting(settings, 'DEBUG', False):
+            print(f"Not rendering citations for {job['source_path']}: {message}")
+        return False
+    negative_cache = get_negative_cache(settings)
+    failure = negative_cache.get(job['cache_key']) if negative_cache is not None and job.get('cache_key') else None
+    if failure is not None:
+        _citation_failures.record(job['source_path'], failure['error'], known=True)
+        if get_setting(settings, 'DEBUG', False):
+            print(f"Not retrying citations for unchanged {job['source_path']}: {failure['error']}")
+        return False
+    return True
+
+
+def record_citation_failure(settings, jobs, error):
+    scope, message = classify_failure(error)
+    if scope != 'document':
+        _citation_failures.trip(None if scope == 'global' else get_job_config(jobs[0]), message)
+    elif len(jobs) > 1:
         return
+    for job in jobs:
+        _citation_failures.record(job['source_path'], message)
+    negative_cache = get_negative_cache(settings)
+    if negative_cache is not None and scope == 'document' and is_deterministic(error) and jobs[0].get('cache_key'):
+        negative_cache.put(jobs[0]['cache_key'], jobs[0]['source_path'], message)
+
+
+def render_citation_job(settings, job):
+    with timed(job.setdefault('timings', {}), 'cache'), _citation_trace.span('cache', job.get('source_path')):
+        cached_content = lookup_cached_citations(settings, job)
+    if cached_content is not None:
+        job['status'] = 'cached'
+        if get_setting(settings, 'DEBUG', False):
+            print(f"Using cached citations for {job['source_path']}")
+        return cached_content
+    
+    if not check_citation_job(settings, job):
+        return None
     
+    return render_uncached_citation_job(settings, job)
+
+
+def render_safely(settings, render, jobs):
     try:
-        with open(source_path, 'r') as f:
-            original_content = f.read()
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as temp_input:
-            temp_input.write(original_content)
+        return render(settings, jobs)
+    except subprocess.CalledProcessError as e:
+        error = e
+        if get_setting(settings, 'DEBUG', False):
+            print(f"Pandoc citation processing failed: {e}")
+            print(f"Pandoc stderr: {e.stderr}")
+    except subprocess.TimeoutExpired as e:
+        error = e
+        if get_setting(settings, 'DEBUG', False):
+            print(f"Pandoc citation processing timed out: {e}")
+    except Exception as e:
+        error = e
+        if get_setting(settings, 'DEBUG', False):
+            print(f"Citation processing error: {e}")
+    record_citation_failure(settings, jobs if isinstance(jobs, list) else [jobs], error)
+    return None
+
+
+def group_citation_jobs(jobs):
+    groups = {}
+    for job in jobs:
+        config = (job['citation_style_path'], job['bibliography_path'])
+        groups.setdefault(config, []).append(job)
+    return list(groups.values())
+
+
+def get_scratch_dir():
+    if os.path.isdir(SHARED_MEMORY_DIR) and os.access(SHARED_MEMORY_DIR, os.W_OK):
+        return SHARED_MEMORY_DIR
+    return None
+
+
+def run_batch_filter(settings, texts, options):
+    boundary = f'citation-batch-{uuid.uuid4().hex}'
+    try:
+        with tempfile.NamedTemporaryFile(
+            mode='w', encoding='utf-8', suffix='.md', dir=get_scratch_dir(), delete=False
+        ) as temp_input:
+            temp_input.write(boundary.join(texts))
             temp_input_path = temp_input.name
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as temp_output:
-            temp_output_path = temp_output.name
-        
         pandoc_cmd = [
             'pandoc',
             '--from', 'markdown',
             '--to', 'html5',
-            '--citeproc',
-            '--csl', citation_style_path,
-            '--bibliography', bibliography_path,
-            '--output', temp_output_path,
-            temp_input_path
+            '--lua-filter', BATCH_FILTER_PATH,
+            '--metadata', f'citation-batch-input={temp_input_path}',
+            '--metadata', f'citation-batch-boundary={boundary}',
+            *options
         ]
         
-        if getattr(settings, 'DEBUG', False):
-            print(f"Processing citations with command: {' '.join(pandoc_cmd)}")
+        if get_setting(settings, 'DEBUG', False):
+            print(f"Processing {len(texts)} articles with command: {' '.join(pandoc_cmd)}")
         
+        timeout = get_setting(settings, 'CITATION_TIMEOUT', None)
         result = subprocess.run(
             pandoc_cmd,
+            input='',
             capture_output=True,
-            text=True,
-            check=True
+            encoding='utf-8',
+            check=True,
+            timeout=timeout * len(texts) if timeout else None
         )
         
-        with open(temp_output_path, 'r') as f:
-            processed_content = f.read()
-        
-        content._content = processed_content
-        
-        if getattr(settings, 'DEBUG', False):
-            print(f"Successfully processed citations for {source_path}")
-        
-    except subprocess.CalledProcessError as e:
-        if getattr(settings, 'DEBUG', False):
-            print(f"Pandoc citation processing failed: {e}")
-            print(f"Pandoc stderr: {e.stderr}")
-    except Exception as e:
-        if getattr(settings, 'DEBUG', False):
-            print(f"Citation processing error: {e}")
     finally:
         if 'temp_input_path' in locals():
             try:
                 os.unlink(temp_input_path)
             except OSError:
                 pass
-        if 'temp_output_path' in locals():
-            try:
-                os.unlink(temp_output_path)
-            except OSError:
-                pass
+    
+    parts = result.stdout.split(boundary)
+    if len(parts) != len(texts):
+        raise ValueError(f"Expected {len(texts)} articles in batch output, got {len(parts)}")
+    return parts
+
+
+def run_pandoc_batch(settings, jobs):
+    renderer = get_renderer(settings)
+    options = []
+    if renderer.parses_ast and uses_pandoc_ast(settings):
+        load_pandoc_asts(settings, jobs)
+        options = ['--metadata', 'citation-batch-from=json']
+    inputs = [renderer.prepare(settings, job) for job in jobs]
+    for job, text in zip(jobs, inputs):
+        job['bytes_in'] = len(text.encode('utf-8'))
+    parts = run_batch_filter(settings, inputs, options + [
+        '--csl', jobs[0]['citation_style_path'],
+        '--bibliography', get_pandoc_bibliography(
+            settings,
+            jobs[0]['bibliography_path'],
+            [key for job in jobs for key in job['citation_keys']]
+        )
+    ])
+    return [renderer.finish(job, part.rstrip('\n') + '\n') for job, part in zip(jobs, parts)]
+
+
+def render_citation_batch(settings, jobs):
+    rendered = {}
+    pending = []
+    for job in jobs:
+        with timed(job.setdefault('timings', {}), 'cache'), _citation_trace.span('cache', job.get('source_path')):
+            cached_content = lookup_cached_citations(settings, job)
+        if cached_content is not None:
+            job['status'] = 'cached'
+            if get_setting(settings, 'DEBUG', False):
+                print(f"Using cached citations for {job['source_path']}")
+            rendered[job['source_path']] = cached_content
+        elif check_citation_job(settings, job):
+            pending.append(job)
+        else:
+            rendered[job['source_path']] = None
+    
+    if len(pending) > 1 and get_renderer(settings).name == 'pandoc':
+        batch_timings = {}
+        sources = [job['source_path'] for job in pending]
+        with timed(batch_timings, 'render'), _citation_trace.span('render', None, batch=sources):
+            outputs = render_safely(settings, run_pandoc_batch, pending)
+        for job in pending:
+            timings = job.setdefault('timings', {})
+            timings['render'] = timings.get('render', 0.0) + batch_timings['render'] / len(pending)
+        if outputs is not None:
+            for job, processed_content in zip(pending, outputs):
+                with timed(job.setdefault('timings', {}), 'cache'), _citation_trace.span('cache', job.get('source_path')):
+                    store_cached_citations(settings, job, processed_content)
+                rendered[job['source_path']] = processed_content
+            pending = []
+        elif get_setting(settings, 'DEBUG', False):
+            print(f"Batch rendering failed, rendering {len(pending)} articles one at a time")
+    
+    for job in pending:
+        if check_citation_job(settings, job):
+            rendered[job['source_path']] = render_safely(settings, render_uncached_citation_job, job)
+        else:
+            rendered[job['source_path']] = None
+    
+    return rendered
+
+
+def get_file_digest(path):
+    try:
+        return file_digest(path)
+    except (OSError, TypeError):
+        return None
+
+
+def get_rendered_signature(generator, content):
+    source_digest = get_file_digest(getattr(content, 'source_path', None))
+    if source_digest is None:
+        return None
+    citation_config = resolve_citation_config(generator, content)
+    context = get_build_context(generator.settings)
+    file_paths = [citation_config['citation_style']] if citation_config['citation_style'] else []
+    file_paths.extend(split_bibliography_files(citation_config['bibliography_file']))
+    dependencies = tuple(
+        (path, get_file_digest(path))
+        for path in (context.resolve_path(file_path) for file_path in file_paths)
+    )
+    return (source_digest,) + dependencies
+
+
+def get_rendered_citations(generator, content):
+    source_path = getattr(content, 'source_path', None)
+    cached = _rendered_citations.get(source_path)
+    if cached is None or cached[0] != get_rendered_signature(generator, content):
+        return False, None
+    signature, processed_content, generation, failed = cached
+    if generation != _build_generation:
+        if failed:
+            return False, None
+        _rendered_citations[source_path] = (signature, processed_content, _build_generation, failed)
+        _shared_references.use(source_path)
+        _citation_metrics.record(source_path, 'warm', {})
+    return True, processed_content
+
+
+def share_references(settings, source_path, config, processed_content):
+    if processed_content is None or config is None or not shares_references(settings, config[0]):
+        return processed_content
+    save_as, url = get_reference_page(settings, config)
+    words = get_setting(settings, 'CITATION_REFERENCE_STUB_WORDS', DEFAULT_STUB_WORDS)
+    processed_content, head, entries = share_reference_list(processed_content, save_as, words)
+    if entries:
+        _shared_references.add(source_path, (save_as, url), config, head, entries)
+    else:
+        _shared_references.discard(source_path)
+    return processed_content
+
+
+def store_rendered_citations(generator, content, processed_content, failed=False, config=None):
+    processed_content = share_references(generator.settings, content.source_path, config, processed_content)
+    signature = get_rendered_signature(generator, content)
+    if signature is None:
+        return processed_content
+    spill_store = get_spill_store(generator.settings)
+    if spill_store is not None and processed_content is not None:
+        processed_content = spill_store.put(content.source_path, processed_content)
+    _rendered_citations[content.source_path] = (signature, processed_content, _build_generation, failed)
+    return processed_content
+
+
+def assign_citations(content, processed_content):
+    if isinstance(processed_content, SpilledHTML):
+        assign_spilled(content, processed_content)
+    else:
+        content._content = processed_content
+
+
+def release_spilled_citations(path, context=None, **kwargs):
+    context = context or {}
+    release_loaded_contents({context.get('localsiteurl'), context.get('SITEURL')} - {None})
+
+
+def clear_warm_state():
+    _rendered_citations.clear()
+    _citation_failures.clear()
+    _shared_references.clear()
+    close_spill_stores()
+    release_loaded_contents()
+    for renderer in _renderers.values():
+        renderer.memo.clear()
+    close_renderers()
+
+
+def record_citation_metrics(job, processed_content):
+    if processed_content is None:
+        status = 'failed'
+    else:
+        status = job.get('status', 'rendered')
+    _citation_metrics.record(
+        job['source_path'],
+        status,
+        job.get('timings', {}),
+        job.get('bytes_in', 0) if status != 'cached' else 0,
+        len(processed_content.encode('utf-8')) if processed_content is not None else 0
+    )
+
+
+def render_queued_citation_batch(settings, jobs, submitted):
+    if _citation_trace.enabled:
+        sources = [job['source_path'] for job in jobs]
+        _citation_trace.complete('queue', None, submitted, _citation_trace.now(), batch=sources)
+    return render_citation_batch(settings, jobs)
+
+
+def process_citations(generator, content):
+    if not hasattr(content, '_content') or content._content is None:
+        return
+    
+    settings = generator.settings
+    source_path = getattr(content, 'source_path', None)
+    
+    rendered, processed_content = get_rendered_citations(generator, content)
+    if not rendered:
+        timings = {}
+        job = build_citation_job(generator, content, timings)
+        if job is None:
+            _citation_metrics.record(source_path, 'skipped', timings)
+        else:
+            processed_content = render_safely(settings, render_citation_job, job)
+            record_citation_metrics(job, processed_content)
+        processed_content = store_rendered_citations(
+            generator, content, processed_content, job is not None and processed_content is None,
+            get_job_config(job) if job is not None else None
+        )
+    
+    if processed_content is not None:
+        with _citation_trace.span('assign', source_path):
+            assign_citations(content, processed_content)
+
+
+def iter_generator_contents(generator):
+    seen = set()
+    for name in CONTENT_COLLECTIONS:
+        contents = getattr(generator, name, None)
+        if not isinstance(contents, list):
+            continue
+        for content in contents:
+            if id(content) not in seen and getattr(content, '_content', None) is not None:
+                seen.add(id(content))
+                yield content
+
+
+def get_citation_workers(settings):
+    workers = get_setting(settings, 'CITATION_WORKERS', None)
+    return workers or os.cpu_count() or 1
+
+
+def preflight_citations(generator):
+    context = get_build_context(generator.settings)
+    context.probe()
+    for content in iter_generator_contents(generator):
+        citation_config = resolve_citation_config(generator, content)
+        if citation_config['citation_style'] and citation_config['bibliography_file']:
+            context.check(
+                citation_config['citation_style'],
+                citation_config['bibliography_file'],
+                getattr(content, 'source_path', None)
+            )
+    context.report()
+
+
+def prerender_citations(generator):
+    settings = generator.settings
+    mode = get_setting(settings, 'CITATION_EXECUTION_MODE', 'serial')
+    if mode not in ('parallel', 'batch'):
+        return
+    
+    context = get_build_context(settings)
+    if mode == 'batch' and not context.supports_batch():
+        context.add_error(
+            f"Batch mode needs Pandoc 2.19.1 or later, found {'.'.join(map(str, context.pandoc_version))}; "
+            f"rendering in parallel instead"
+        )
+        context.report()
+        mode = 'parallel'
+    
+    jobs = {}
+    contents = {}
+    for content in iter_generator_contents(generator):
+        if get_rendered_citations(generator, content)[0]:
+            continue
+        timings = {}
+        job = build_citation_job(generator, content, timings)
+        if job is not None:
+            jobs[job['source_path']] = job
+            contents[job['source_path']] = content
+        else:
+            _citation_metrics.record(content.source_path, 'skipped', timings)
+            store_rendered_citations(generator, content, None)
+    
+    if not jobs:
+        return
+    
+    if mode == 'batch':
+        groups = group_citation_jobs(jobs.values())
+    else:
+        groups = [[job] for job in jobs.values()]
+    
+    workers = min(get_citation_workers(settings), len(groups))
+    if get_setting(settings, 'DEBUG', False):
+        print(
+            f"Rendering citations for {len(jobs)} articles in {len(groups)} "
+            f"{mode} jobs with {workers} workers"
+        )
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(render_queued_citation_batch, settings, group, _citation_trace.now())
+            for group in groups
+        }
+        del groups
+        for future in concurrent.futures.as_completed(futures):
+            futures.discard(future)
+            for source_path, processed_content in future.result().items():
+                job = jobs.pop(source_path)
+                record_citation_metrics(job, processed_content)
+                store_rendered_citations(
+                    generator, contents.pop(source_path), processed_content, processed_content is None,
+                    get_job_config(job)
+                )
+
+
+def process_generator_citations(generator):
+    _citation_trace.configure(get_setting(generator.settings, 'CITATION_TRACE_FILE', None))
+    preflight_citations(generator)
+    prerender_citations(generator)
+    for content in iter_generator_contents(generator):
+        process_citations(generator, content)
+
+
+def report_citation_dependencies(dependency_index):
+    invalidated = dependency_index.invalidated
+    print(f"Citation dependencies: {len(invalidated)} of {len(dependency_index.articles)} articles invalidated")
+    for key, source_paths in sorted(dependency_index.changed_entries.items()):
+        print(f"  Bibliography entry {key} changed: {len(source_paths)} articles invalidated")
+    for style_path, source_paths in sorted(dependency_index.changed_styles.items()):
+        print(f"  Citation style {style_path} changed: {len(source_paths)} articles invalidated")
+    for source_path, reasons in sorted(invalidated.items()):
+        print(f"  {source_path}: {'; '.join(reasons)}")
+
+
+def report_citation_stats(pelican_obj):
+    global _build_generation
+    if get_setting(pelican_obj.settings, 'DEBUG', False):
+        print(
+            f"Citation scan: {_scan_stats['scanned']} articles scanned, "
+            f"{_scan_stats['skipped']} without citations skipped"
+        )
+        for cache_path, citation_cache in _citation_caches.items():
+            stats = citation_cache.stats()
+            print(
+                f"Citation cache {cache_path}: {stats['hits']} hits, "
+                f"{stats['misses']} misses, {stats['evictions']} evictions, "
+                f"{stats['size']} bytes"
+            )
+        for cache_path, ast_cache in _ast_caches.items():
+            stats = ast_cache.stats()
+            print(
+                f"Citation AST cache {ast_cache.path}: {stats['hits']} hits, "
+                f"{stats['misses']} misses, {stats['evictions']} evictions, "
+                f"{stats['size']} bytes"
+            )
+        for dependency_index in _dependency_indexes.values():
+            report_citation_dependencies(dependency_index)
+        for spill_store in _spill_stores.values():
+            stats = spill_store.stats()
+            print(
+                f"Citation spill store {spill_store.path}: {stats['entries']} documents, "
+                f"{stats['size']} bytes, {stats['loads']} loads"
+            )
+        for name, renderer in _renderers.items():
+            stats = renderer.memo.stats()
+            print(
+                f"Citation memo ({name}): {stats['cluster_hits']} of "
+                f"{stats['cluster_hits'] + stats['cluster_misses']} clusters reused "
+                f"({stats['cluster_hit_rate']:.0%}), {stats['entry_hits']} of "
+                f"{stats['entry_hits'] + stats['entry_misses']} bibliography entries reused "
+                f"({stats['entry_hit_rate']:.0%})"
+            )
+    if _build_context is not None:
+        _build_context.report()
+        _build_context.clear()
+    _citation_failures.report()
+    _citation_failures.clear()
+    for dependency_index in _dependency_indexes.values():
+        dependency_index.save()
+    for negative_cache in _negative_caches.values():
+        negative_cache.save()
+    warm = get_setting(pelican_obj.settings, 'CITATION_WARM_STATE', False)
+    if warm:
+        _build_generation += 1
+        for source_path in [source_path for source_path in _rendered_citations if not os.path.exists(source_path)]:
+            del _rendered_citations[source_path]
+            _shared_references.discard(source_path)
+            for spill_store in _spill_stores.values():
+                spill_store.discard(source_path)
+        for renderer in _renderers.values():
+            renderer.memo.reset_counts()
+        _shared_references.reset()
+    else:
+        for renderer in _renderers.values():
+            renderer.memo.clear()
+        _rendered_citations.clear()
+        _shared_references.clear()
+        close_spill_stores()
+    _citation_metrics.report(
+        get_setting(pelican_obj.settings, 'CITATION_METRICS_FILE', None),
+        get_setting(pelican_obj.settings, 'CITATION_METRICS_SLOWEST', DEFAULT_SLOWEST),
+        pelican_obj.settings.get('PATH')
+    )
+    _citation_metrics.clear()
+    trace_path = _citation_trace.write()
+    if trace_path and get_setting(pelican_obj.settings, 'DEBUG', False):
+        print(f"Citation trace written to {trace_path}")
+    _citation_trace.configure(None)
+    _scan_stats.update(scanned=0, skipped=0)
+    if get_setting(pelican_obj.settings, 'CITATION_PANDOC_SERVER_PERSIST', False):
+        return
+    if warm:
+        for renderer in list(_renderers.values()):
+            renderer.close()
+    else:
+        close_renderers()
+
+
+def render_shared_references(settings, config, citation_keys):
+    citation_style_path, bibliography_path = config
+    renderer = get_renderer(settings)
+    renderer = getattr(renderer, 'fallback', renderer)
+    citation_cache = get_citation_cache(settings)
+    key = None
+    if citation_cache is not None:
+        entry_hashes = get_entry_hashes(bibliography_path, citation_keys, citation_cache.path)
+        key = cache_key(
+            'references',
+            json.dumps(entry_hashes, sort_keys=True),
+            file_digest(citation_style_path),
+            renderer.version()
+        )
+        output = citation_cache.get(key)
+        if output is not None:
+            return split_reference_list(output)[1]
+    try:
+        output = renderer.convert(
+            settings,
+            {'citation_style_path': citation_style_path},
+            build_cluster_document({}, sorted(citation_keys)),
+            get_pandoc_bibliography(settings, bibliography_path, citation_keys)
+        )
+    except (OSError, ValueError, subprocess.SubprocessError) as e:
+        if get_setting(settings, 'DEBUG', False):
+            print(f"Shared references could not be rendered, using the articles' entries: {e}")
+        return None
+    references = split_reference_list(output)
+    if references is None:
+        return None
+    if key is not None:
+        citation_cache.put(key, output)
+    return references[1]
+
+
+class CitationReferencesGenerator(Generator):
+
+    def generate_context(self):
+        self.reference_pages = build_reference_pages(
+            _shared_references, self.settings, self.context, render_shared_references
+        )
+
+    def generate_output(self, writer):
+        for page in self.reference_pages:
+            writer.write_file(
+                page.save_as,
+                self.get_template(page.template),
+                self.context,
+                page=page,
+                relative_urls=self.settings['RELATIVE_URLS'],
+                url=page.url
+            )
+
+
+def get_references_generator(pelican_obj):
+    if get_setting(pelican_obj.settings, 'CITATION_SHARED_REFERENCES', False):
+        return CitationReferencesGenerator
+    return None
 
 
 def register():
-    signals.article_generator_write_article.connect(process_citations) 
\ No newline at end of file
+    atexit.register(close_renderers)
+    atexit.register(close_spill_stores)
+    signals.initialized.connect(initialize_build_context)
+    signals.get_generators.connect(get_references_generator)
+    signals.article_generator_finalized.connect(process_generator_citations)
+    signals.page_generator_finalized.connect(process_generator_citations)
+    signals.content_written.connect(release_spilled_citations)
+    signals.feed_written.connect(release_spilled_citations)
+    signals.finalized.connect(report_citation_stats) 
\ No newline at end of file
@@ -0,0 +1,209 @@
+import argparse
+import fnmatch
+import os
+import subprocess
+import sys
+import time
+import zlib
+from types import SimpleNamespace
+
+from pelican.contents import Page
+from pelican.readers import MarkdownReader, Readers
+from pelican.settings import read_settings
+
+from . import citation_processor
+from .bundle import BundleError, BundleStore, export_bundle, import_bundle, merge_bundles
+from .config import get_setting
+from .metrics import format_bytes
+from .scan import find_citation_keys
+
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/n, got {value!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {value!r} must satisfy 1 <= i <= n")
+    return index, count
+
+
+def in_shard(relative_path, shard):
+    if shard is None:
+        return True
+    index, count = shard
+    return zlib.crc32(relative_path.replace(os.sep, '/').encode('utf-8')) % count == index - 1
+
+
+def is_ignored(name, patterns):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def find_sources(settings, shard=None):
+    content_path = settings['PATH']
+    extensions = tuple('.' + extension for extension in MarkdownReader.file_extensions)
+    patterns = get_setting(settings, 'IGNORE_FILES', [])
+    sources = []
+    for directory, dirnames, filenames in os.walk(content_path, followlinks=True):
+        relative_directory = os.path.relpath(directory, content_path)
+        dirnames[:] = sorted(dirname for dirname in dirnames if not is_ignored(dirname, patterns))
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(extensions) or is_ignored(filename, patterns):
+                continue
+            relative_path = os.path.normpath(os.path.join(relative_directory, filename))
+            if in_shard(relative_path, shard):
+                sources.append(relative_path)
+    return sources
+
+
+def has_citations(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return bool(find_citation_keys(f.read()))
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def read_contents(settings, sources):
+    readers = Readers(settings)
+    contents = []
+    for relative_path in sources:
+        if not has_citations(os.path.join(settings['PATH'], relative_path)):
+            continue
+        try:
+            contents.append(readers.read_file(settings['PATH'], relative_path, content_class=Page))
+        except Exception as e:
+            print(f"Could not read {relative_path}: {e}", file=sys.stderr)
+    return contents
+
+
+def print_stats(summary, sources, contents, elapsed):
+    totals = summary['totals']
+    print(
+        f"Citations: {len(sources)} Markdown files, {len(contents)} with citations, "
+        f"{totals['rendered']} rendered, {totals['cached']} cached, {totals['skipped']} skipped, "
+        f"{totals['failed']} failed in {elapsed:.2f}s, peak RSS {format_bytes(totals['peak_rss'])}"
+    )
+    for document in summary['slowest']:
+        print(f"  {document['source_path']}: {document['timings']['total']:.3f}s ({document['status']})")
+    for cache_path, citation_cache in citation_processor._citation_caches.items():
+        stats = citation_cache.stats()
+        print(
+            f"Citation cache {cache_path}: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['evictions']} evictions, {stats['size']} bytes"
+        )
+
+
+def resolve_bundle(name, store):
+    if store is None or os.sep in name or name.endswith('.tar.gz'):
+        return name
+    return store.bundle_path(name)
+
+
+def print_bundle_stats(path, stats):
+    print(f"Citation bundle {path}: " + ', '.join(f"{count} {name}" for name, count in stats.items()))
+
+
+def import_bundles(settings, paths):
+    citation_cache = citation_processor.get_citation_cache(settings)
+    dependency_index = citation_processor.get_dependency_index(settings)
+    try:
+        renderer = citation_processor.get_renderer(settings).version()
+    except (OSError, subprocess.CalledProcessError):
+        renderer = None
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"Citation bundle {path} does not exist; rendering without it", file=sys.stderr)
+            continue
+        try:
+            stats = import_bundle(path, citation_cache, dependency_index, settings['PATH'], renderer)
+        except BundleError as e:
+            print(e, file=sys.stderr)
+            continue
+        print_bundle_stats(path, stats)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pelican-citations',
+        description='Prerender citations into the citation cache without building the site'
+    )
+    parser.add_argument('settings', nargs='?', help='Pelican settings file')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Worker threads (default: CITATION_WORKERS)')
+    parser.add_argument(
+        '--shard', type=parse_shard, default=None,
+        help='Only render shard i of n (1-based), assigned by a hash of the source path'
+    )
+    parser.add_argument('--stats', action='store_true', help='Print render and cache statistics')
+    parser.add_argument(
+        '--store', default=None,
+        help='Directory of shared cache bundles; bundle names without a path are looked up here'
+    )
+    parser.add_argument(
+        '--import', dest='imports', action='append', default=[], metavar='BUNDLE',
+        help='Seed the cache from a bundle before rendering (may be repeated; missing bundles are skipped)'
+    )
+    parser.add_argument('--export', default=None, metavar='BUNDLE', help='Write the cache to a bundle after rendering')
+    parser.add_argument('--no-render', action='store_true', help='Only import and export bundles')
+    parser.add_argument(
+        '--merge', default=None, metavar='BUNDLE',
+        help='Merge the --import bundles into one bundle, without reading settings or rendering'
+    )
+    args = parser.parse_args(argv)
+
+    store = BundleStore(args.store) if args.store else None
+    try:
+        imports = [resolve_bundle(name, store) for name in args.imports]
+        export = resolve_bundle(args.export, store) if args.export else None
+        merge = resolve_bundle(args.merge, store) if args.merge else None
+    except BundleError as e:
+        parser.error(str(e))
+
+    if merge is not None:
+        try:
+            stats = merge_bundles(merge, [path for path in imports if os.path.exists(path)])
+        except BundleError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print_bundle_stats(merge, stats)
+        return 0
+    if args.settings is None:
+        parser.error('the settings file is required unless --merge is given')
+
+    settings = read_settings(args.settings)
+    if not get_setting(settings, 'CITATION_CACHE_PATH', None):
+        print('CITATION_CACHE_PATH is not set in the settings file; there is no cache to warm', file=sys.stderr)
+        return 2
+    if get_setting(settings, 'CITATION_EXECUTION_MODE', 'serial') == 'serial':
+        settings['CITATION_EXECUTION_MODE'] = 'parallel'
+    if args.jobs:
+        settings['CITATION_WORKERS'] = args.jobs
+
+    start = time.perf_counter()
+    citation_processor.initialize_build_context(SimpleNamespace(settings=settings))
+    import_bundles(settings, imports)
+    failed = 0
+    if not args.no_render:
+        sources = find_sources(settings, args.shard)
+        contents = read_contents(settings, sources)
+        generator = SimpleNamespace(settings=settings, articles=contents)
+        citation_processor.process_generator_citations(generator)
+        summary = citation_processor._citation_metrics.summary(base_path=settings['PATH'])
+        failed = summary['totals']['failed']
+        elapsed = time.perf_counter() - start
+        if args.stats:
+            print_stats(summary, sources, contents, elapsed)
+    citation_processor.report_citation_stats(SimpleNamespace(settings=settings))
+    if export is not None:
+        manifest = export_bundle(
+            export,
+            citation_processor.get_citation_cache(settings),
+            citation_processor.get_dependency_index(settings),
+            settings['PATH']
+        )
+        print(f"Citation bundle {export}: exported {len(manifest['entries'])} entries")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,4 @@
+def get_setting(settings, name, default=None):
+    if isinstance(settings, dict):
+        return settings.get(name, default)
+    return getattr(settings, name, default)
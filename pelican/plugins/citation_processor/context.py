@@ -0,0 +1,184 @@
+import logging
+import os
+import re
+import subprocess
+import threading
+
+from .bibliography import BIBTEX_FORMATS, get_bibliography_index, split_bibliography_files
+from .config import get_setting
+from .renderers import get_pandoc_version
+
+
+logger = logging.getLogger(__name__)
+
+PANDOC_VERSION_PATTERN = re.compile(r'^pandoc(?:\.exe)?\s+(?P<version>\d+(?:\.\d+)*)')
+PANDOC_RENDERERS = ('pandoc', 'pandoc-server')
+CITEPROC_MIN_VERSION = (2, 11)
+BATCH_MIN_VERSION = (2, 19, 1)
+DUPLICATES_SHOWN = 10
+
+
+def resolve_file_path(base_path, file_path, settings):
+    if os.path.isabs(file_path):
+        return file_path
+
+    content_path = os.path.join(base_path, file_path)
+    if os.path.exists(content_path):
+        return content_path
+
+    settings_path = os.path.join(settings.get('PATH', ''), file_path)
+    if os.path.exists(settings_path):
+        return settings_path
+
+    return content_path
+
+
+def parse_pandoc_version(version):
+    match = PANDOC_VERSION_PATTERN.match(version or '')
+    if match is None:
+        return None
+    return tuple(int(part) for part in match.group('version').split('.'))
+
+
+def format_version(version):
+    return '.'.join(str(part) for part in version)
+
+
+class BuildContext:
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.probed = False
+        self.pandoc_version = None
+        self.pandoc_error = None
+        self.paths = {}
+        self.pairs = {}
+        self.bibliographies = {}
+        self.errors = {}
+        self.reported = set()
+        self._lock = threading.Lock()
+
+    def needs_pandoc(self):
+        return get_setting(self.settings, 'CITATION_RENDERER', 'pandoc') in PANDOC_RENDERERS
+
+    def probe(self):
+        if self.probed:
+            return
+        self.probed = True
+        if not self.needs_pandoc():
+            return
+        try:
+            version = get_pandoc_version()
+        except OSError:
+            self.pandoc_error = 'Pandoc not found; install Pandoc or put it on PATH'
+            return
+        except subprocess.CalledProcessError as e:
+            self.pandoc_error = f'Pandoc could not be run: {e}'
+            return
+        self.pandoc_version = parse_pandoc_version(version)
+        if self.pandoc_version is not None and self.pandoc_version < CITEPROC_MIN_VERSION:
+            self.pandoc_error = (
+                f'Pandoc {format_version(self.pandoc_version)} does not support --citeproc '
+                f'({format_version(CITEPROC_MIN_VERSION)} or later required)'
+            )
+
+    def supports_batch(self):
+        return self.pandoc_version is None or self.pandoc_version >= BATCH_MIN_VERSION
+
+    def add_error(self, message, source_path=None):
+        with self._lock:
+            source_paths = self.errors.setdefault(message, [])
+            if source_path is not None and source_path not in source_paths:
+                source_paths.append(source_path)
+
+    def resolve_path(self, file_path):
+        with self._lock:
+            if file_path not in self.paths:
+                self.paths[file_path] = resolve_file_path(self.settings.get('PATH', ''), file_path, self.settings)
+            return self.paths[file_path]
+
+    def resolve_bibliography(self, bibliography_file):
+        files = split_bibliography_files(bibliography_file)
+        with self._lock:
+            if files in self.bibliographies:
+                return self.bibliographies[files]
+        paths = tuple(self.resolve_path(file_path) for file_path in files)
+        missing = [path for path in paths if not os.path.exists(path)]
+        unsupported = [path for path in paths if os.path.splitext(path)[1].lower() not in BIBTEX_FORMATS]
+        if not paths:
+            resolved = (None, f'Bibliography file not found: {bibliography_file}')
+        elif missing:
+            resolved = (None, f'Bibliography file not found: {missing[0]}')
+        elif len(paths) == 1:
+            resolved = (paths[0], None)
+        elif unsupported:
+            resolved = (None, f'Bibliography lists support only BibTeX and BibLaTeX files: {unsupported[0]}')
+        else:
+            resolved = (paths, self.index_bibliography(paths))
+        with self._lock:
+            return self.bibliographies.setdefault(files, resolved)
+
+    def index_bibliography(self, paths):
+        try:
+            index = get_bibliography_index(paths, get_setting(self.settings, 'CITATION_CACHE_PATH', None))
+        except (OSError, UnicodeDecodeError) as e:
+            return f'Bibliography files could not be indexed: {e}'
+        if not index.duplicates:
+            return None
+        lines = [
+            f'Duplicate bibliography keys in {", ".join(paths)} ({len(index.duplicates)}); '
+            'the first definition is used:'
+        ]
+        for key, key_paths in sorted(index.duplicates.items())[:DUPLICATES_SHOWN]:
+            lines.append(f'  {key}: {", ".join(key_paths)}')
+        if len(index.duplicates) > DUPLICATES_SHOWN:
+            lines.append('  ...')
+        logger.warning('\n'.join(lines))
+        return None
+
+    def resolve(self, citation_style, bibliography_file):
+        key = (citation_style, split_bibliography_files(bibliography_file))
+        with self._lock:
+            if key in self.pairs:
+                return self.pairs[key]
+        bibliography_path, error = self.resolve_bibliography(bibliography_file)
+        citation_style_path = self.resolve_path(citation_style)
+        if error is not None:
+            resolved = (None, None, error)
+        elif not os.path.exists(citation_style_path):
+            resolved = (None, None, f'Citation style file not found: {citation_style_path}')
+        else:
+            resolved = (citation_style_path, bibliography_path, None)
+        with self._lock:
+            return self.pairs.setdefault(key, resolved)
+
+    def check(self, citation_style, bibliography_file, source_path=None):
+        citation_style_path, bibliography_path, error = self.resolve(citation_style, bibliography_file)
+        if error is None and self.pandoc_error is not None:
+            error = self.pandoc_error
+        if error is not None:
+            self.add_error(error, source_path)
+        return citation_style_path, bibliography_path, error
+
+    def report(self):
+        with self._lock:
+            pending = [(message, source_paths) for message, source_paths in self.errors.items() if message not in self.reported]
+            self.reported.update(message for message, _ in pending)
+        if not pending:
+            return
+        lines = [f'Citation configuration errors ({len(pending)}):']
+        for message, source_paths in pending:
+            if source_paths:
+                shown = ', '.join(source_paths[:3]) + (', ...' if len(source_paths) > 3 else '')
+                lines.append(f'  {message} (used by {len(source_paths)} documents: {shown})')
+            else:
+                lines.append(f'  {message}')
+        logger.error('\n'.join(lines))
+
+    def clear(self):
+        with self._lock:
+            self.paths.clear()
+            self.pairs.clear()
+            self.bibliographies.clear()
+            self.errors.clear()
+            self.reported.clear()
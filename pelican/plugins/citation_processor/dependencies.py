@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class DependencyIndex:
+
+    def __init__(self, path):
+        self.path = path
+        self.invalidated = {}
+        self.changed_entries = {}
+        self.changed_styles = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.articles = data.get('articles', {})
+
+    def record(self, source_path, source_hash, style_path, style_hash, bibliography_path, entry_hashes,
+               cache_key=None, renderer=None):
+        current = {
+            'source': source_hash,
+            'style': style_path,
+            'style_hash': style_hash,
+            'bibliography': list(bibliography_path) if isinstance(bibliography_path, tuple) else bibliography_path,
+            'entries': entry_hashes,
+            'key': cache_key,
+            'renderer': renderer,
+            'recorded': time.time()
+        }
+        with self._lock:
+            previous = self.articles.get(source_path)
+            self.articles[source_path] = current
+        reasons, changed_entries, style_changed = self.compare(previous, current)
+        with self._lock:
+            if reasons:
+                self.invalidated[source_path] = reasons
+            for key in changed_entries:
+                self.changed_entries.setdefault(key, set()).add(source_path)
+            if style_changed:
+                self.changed_styles.setdefault(style_path, set()).add(source_path)
+        return reasons
+
+    def compare(self, previous, current):
+        if previous is None:
+            return ['new article'], [], False
+        reasons = []
+        changed = []
+        style_changed = False
+        if previous.get('source') != current['source']:
+            reasons.append('source changed')
+        if previous.get('style') != current['style']:
+            reasons.append(f"citation style changed to {current['style']}")
+        elif previous.get('style_hash') != current['style_hash']:
+            reasons.append(f"citation style {current['style']} edited")
+            style_changed = True
+        if previous.get('bibliography') != current['bibliography']:
+            reasons.append(f"bibliography changed to {current['bibliography']}")
+        else:
+            previous_entries = previous.get('entries', {})
+            changed = sorted(
+                key for key in set(previous_entries) & set(current['entries'])
+                if previous_entries[key] != current['entries'][key]
+            )
+            if changed:
+                reasons.append(f"bibliography entries changed: {', '.join(changed)}")
+        return reasons, changed, style_changed
+
+    def citations(self):
+        index = {}
+        for source_path, article in self.articles.items():
+            for key in article.get('entries', {}):
+                index.setdefault(key, set()).add(source_path)
+        return {key: sorted(source_paths) for key, source_paths in sorted(index.items())}
+
+    def save(self):
+        with self._lock:
+            data = {
+                'articles': self.articles,
+                'citations': self.citations()
+            }
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
+            self.invalidated = {}
+            self.changed_entries = {}
+            self.changed_styles = {}
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+SYSTEMIC_EXIT_CODES = {
+    6: 'Pandoc rejected its options',
+    24: 'citeproc failed',
+    25: 'the bibliography could not be read',
+    97: 'a Pandoc data file is missing',
+    99: 'the style or bibliography file was not found',
+}
+CITEPROC_ERROR_MARKERS = ('Citeproc', 'CSL')
+FAILURES_SHOWN = 10
+
+
+def first_line(text):
+    for line in (text or '').splitlines():
+        if line.strip():
+            return line.strip()
+    return ''
+
+
+def classify_failure(error):
+    if isinstance(error, FileNotFoundError) and error.filename == 'pandoc':
+        return 'global', f'Pandoc could not be started: {error}'
+    if isinstance(error, OSError):
+        return 'config', str(error)
+    if isinstance(error, subprocess.TimeoutExpired):
+        return 'document', f'timed out after {error.timeout}s'
+    if isinstance(error, subprocess.CalledProcessError):
+        detail = first_line(error.stderr) or f'Pandoc exited with status {error.returncode}'
+        if error.returncode in SYSTEMIC_EXIT_CODES:
+            return 'config', f'{SYSTEMIC_EXIT_CODES[error.returncode]}: {detail}'
+        if any(marker in detail for marker in CITEPROC_ERROR_MARKERS):
+            return 'config', f'the citation style could not be read: {detail}'
+        return 'document', detail
+    return 'document', str(error) or type(error).__name__
+
+
+def is_deterministic(error):
+    return isinstance(error, subprocess.CalledProcessError)
+
+
+def describe_config(config):
+    if config is None:
+        return 'every configuration'
+    citation_style_path, bibliography_path = config
+    if isinstance(bibliography_path, tuple):
+        bibliography_path = ', '.join(bibliography_path)
+    return f'style {citation_style_path} with bibliography {bibliography_path}'
+
+
+class CitationFailures:
+
+    def __init__(self):
+        self.open = {}
+        self.blocked = {}
+        self.failed = {}
+        self.known = {}
+        self._lock = threading.Lock()
+
+    def check(self, config, source_path=None):
+        with self._lock:
+            for key in (None, config):
+                if key in self.open:
+                    if source_path not in self.failed:
+                        self.blocked[key] = self.blocked.get(key, 0) + 1
+                    return self.open[key]
+        return None
+
+    def trip(self, config, message):
+        with self._lock:
+            if config in self.open:
+                return False
+            self.open[config] = message
+        logger.error('Stopped rendering citations with %s: %s', describe_config(config), message)
+        return True
+
+    def record(self, source_path, message, known=False):
+        with self._lock:
+            (self.known if known else self.failed)[source_path] = message
+
+    def report(self):
+        with self._lock:
+            opened = dict(self.open)
+            blocked = dict(self.blocked)
+            failed = sorted(self.failed.items())
+            known = sorted(self.known.items())
+        if not opened and not failed and not known:
+            return
+        lines = [
+            f'Citation failures: {len(failed)} documents failed, {sum(blocked.values())} not attempted '
+            f'after a configuration error, {len(known)} unchanged documents skipped as known failures'
+        ]
+        for config, message in opened.items():
+            lines.append(f'  {describe_config(config)}: {message} ({blocked.get(config, 0)} documents not attempted)')
+        for source_path, message in (failed + known)[:FAILURES_SHOWN]:
+            lines.append(f'  {source_path}: {message}')
+        if len(failed) + len(known) > FAILURES_SHOWN:
+            lines.append('  ...')
+        logger.warning('\n'.join(lines))
+
+    def clear(self):
+        with self._lock:
+            self.open.clear()
+            self.blocked.clear()
+            self.failed.clear()
+            self.known.clear()
+
+
+class NegativeCache:
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.dirty = False
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.failures = data.get('failures', {})
+
+    def get(self, key):
+        with self._lock:
+            failure = self.failures.get(key)
+            if failure is not None:
+                self.hits += 1
+            return failure
+
+    def put(self, key, source_path, error):
+        with self._lock:
+            for previous in [previous for previous, failure in self.failures.items() if failure['source_path'] == source_path]:
+                del self.failures[previous]
+            self.failures[key] = {'source_path': source_path, 'error': error, 'recorded': time.time()}
+            self.dirty = True
+
+    def discard(self, source_path):
+        with self._lock:
+            for key in [key for key, failure in self.failures.items() if failure['source_path'] == source_path]:
+                del self.failures[key]
+                self.dirty = True
+
+    def save(self):
+        with self._lock:
+            stale = [key for key, failure in self.failures.items() if not os.path.exists(failure['source_path'])]
+            for key in stale:
+                del self.failures[key]
+            if not self.dirty and not stale:
+                return
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'failures': self.failures}, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
+            self.dirty = False
@@ -0,0 +1,171 @@
+import json
+import re
+import threading
+
+from .cache import cache_key, file_digest
+from .scan import build_reference_list, parse_reference_list
+
+
+NOTE_STYLE_PATTERN = re.compile(r'<style\b[^>]*\bclass\s*=\s*["\']note["\']')
+POSITION_PATTERN = re.compile(r'\bposition\s*=')
+NUMERIC_PATTERN = re.compile(r'\bvariable\s*=\s*["\']citation-number["\']')
+
+_style_traits = {}
+
+
+def get_style_traits(path):
+    digest = file_digest(path)
+    if digest not in _style_traits:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        _style_traits[digest] = {
+            'note': NOTE_STYLE_PATTERN.search(text) is not None,
+            'position': POSITION_PATTERN.search(text) is not None,
+            'numeric': NUMERIC_PATTERN.search(text) is not None
+        }
+    return _style_traits[digest]
+
+
+def get_cluster_positions(clusters):
+    positions = []
+    seen = set()
+    previous = None
+    for cluster in clusters:
+        items = cluster['items']
+        position = []
+        for item in items:
+            if previous is not None and len(items) == 1 and [i['key'] for i in previous] == [item['key']]:
+                position.append('ibid:' + (previous[0]['locator'] or ''))
+            elif item['key'] in seen:
+                position.append('subsequent')
+            else:
+                position.append('first')
+        seen.update(item['key'] for item in items)
+        previous = items
+        positions.append(position)
+    return positions
+
+
+class CitationMemo:
+
+    def __init__(self):
+        self.clusters = {}
+        self.entries = {}
+        self.orders = {}
+        self.counts = {'cluster_hits': 0, 'cluster_misses': 0, 'entry_hits': 0, 'entry_misses': 0}
+        self._lock = threading.Lock()
+
+    def get_cluster(self, key):
+        with self._lock:
+            return self.clusters.get(key)
+
+    def put_cluster(self, key, html):
+        with self._lock:
+            self.clusters[key] = html
+
+    def get_entries(self, keys):
+        with self._lock:
+            entries = [self.entries.get(key) for key in keys]
+            return None if None in entries else entries
+
+    def put_entry(self, key, html):
+        with self._lock:
+            self.entries[key] = html
+
+    def get_order(self, key):
+        with self._lock:
+            return self.orders.get(key)
+
+    def put_order(self, key, head, keys):
+        with self._lock:
+            self.orders[key] = (head, keys)
+
+    def count(self, name, hits, misses):
+        with self._lock:
+            self.counts[f'{name}_hits'] += hits
+            self.counts[f'{name}_misses'] += misses
+
+    def plan(self, config, clusters, entry_hashes, family_names, positional):
+        keys = list(dict.fromkeys(item['key'] for cluster in clusters for item in cluster['items']))
+
+        def identity(key):
+            entry_hash = entry_hashes.get(key, entry_hashes.get('*', ''))
+            group = [
+                [other, entry_hashes.get(other, entry_hashes.get('*', ''))]
+                for other in keys
+                if other != key and family_names.get(other) == family_names.get(key)
+            ]
+            return [key, entry_hash, group]
+
+        cluster_keys = [
+            cache_key(config, ' '.join(cluster['text'].split()), json.dumps([
+                [item['prefix'], item['suffix'], item['label'], item['locator'], item['suppress_author'],
+                 cluster['in_text'], item_position, identity(item['key'])]
+                for item, item_position in zip(cluster['items'], position)
+            ]))
+            for cluster, position in zip(clusters, get_cluster_positions(clusters))
+        ]
+        rendered = {}
+        pending = {}
+        for index, (cluster, key) in enumerate(zip(clusters, cluster_keys)):
+            html = self.get_cluster(key)
+            if html is None:
+                pending[index] = cluster
+            else:
+                rendered[index] = html
+        if pending and positional:
+            rendered = {}
+            pending = dict(enumerate(clusters))
+        self.count('cluster', len(rendered), len(pending))
+
+        plan = {
+            'cluster_keys': cluster_keys,
+            'entry_keys': {key: cache_key(config, json.dumps(identity(key))) for key in keys},
+            'order_key': cache_key(config, json.dumps(sorted(identity(key) for key in keys))),
+            'rendered': rendered,
+            'pending': pending,
+            'nocite': keys if rendered else [],
+            'trailer': None
+        }
+        if not pending:
+            order = self.get_order(plan['order_key'])
+            if order is not None:
+                entries = self.get_entries([plan['entry_keys'][key] for key in order[1]])
+                if entries is not None:
+                    plan['trailer'] = build_reference_list(order[0], entries)
+                    self.count('entry', len(entries), 0)
+        return plan
+
+    def record(self, plan, rendered, trailer):
+        for index, html in rendered.items():
+            self.put_cluster(plan['cluster_keys'][index], html)
+        references = parse_reference_list(trailer)
+        if references is None:
+            return
+        head, entries = references
+        if any(key not in plan['entry_keys'] for key, _ in entries):
+            return
+        for key, html in entries:
+            self.put_entry(plan['entry_keys'][key], html)
+        self.put_order(plan['order_key'], head, [key for key, _ in entries])
+        self.count('entry', 0, len(entries))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counts)
+        for name in ('cluster', 'entry'):
+            total = stats[f'{name}_hits'] + stats[f'{name}_misses']
+            stats[f'{name}_hit_rate'] = stats[f'{name}_hits'] / total if total else 0.0
+        return stats
+
+    def reset_counts(self):
+        with self._lock:
+            for name in self.counts:
+                self.counts[name] = 0
+
+    def clear(self):
+        with self._lock:
+            self.clusters.clear()
+            self.entries.clear()
+            self.orders.clear()
+        self.reset_counts()
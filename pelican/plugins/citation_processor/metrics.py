@@ -0,0 +1,124 @@
+import contextlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('resolve', 'io', 'scan', 'cache', 'render')
+STATUSES = ('rendered', 'cached', 'warm', 'skipped', 'failed')
+DEFAULT_SLOWEST = 10
+
+
+@contextlib.contextmanager
+def timed(timings, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def format_bytes(size):
+    if size is None:
+        return 'unknown'
+    return f'{size / (1 << 20):.1f} MiB'
+
+
+class CitationMetrics:
+
+    def __init__(self):
+        self.documents = {}
+        self._lock = threading.Lock()
+
+    def record(self, source_path, status, timings, bytes_in=0, bytes_out=0):
+        document = {
+            'status': status,
+            'timings': {stage: round(timings.get(stage, 0.0), 6) for stage in STAGES},
+            'bytes_in': bytes_in,
+            'bytes_out': bytes_out
+        }
+        document['timings']['total'] = round(sum(document['timings'].values()), 6)
+        with self._lock:
+            self.documents[source_path] = document
+        logger.debug(
+            "Citations %s for %s in %.3fs (resolve %.3fs, io %.3fs, scan %.3fs, cache %.3fs, render %.3fs), "
+            "%d bytes in, %d bytes out",
+            status, source_path, document['timings']['total'],
+            *(document['timings'][stage] for stage in STAGES),
+            bytes_in, bytes_out
+        )
+
+    def summary(self, slowest=DEFAULT_SLOWEST, base_path=None):
+        def name(source_path):
+            if base_path and os.path.abspath(source_path).startswith(os.path.abspath(base_path) + os.sep):
+                return os.path.relpath(source_path, base_path)
+            return source_path
+
+        with self._lock:
+            documents = {name(source_path): dict(document) for source_path, document in self.documents.items()}
+        totals = {
+            'documents': len(documents),
+            'bytes_in': sum(document['bytes_in'] for document in documents.values()),
+            'bytes_out': sum(document['bytes_out'] for document in documents.values()),
+            'peak_rss': peak_rss(),
+            'timings': {
+                stage: round(sum(document['timings'][stage] for document in documents.values()), 6)
+                for stage in STAGES + ('total',)
+            }
+        }
+        for status in STATUSES:
+            totals[status] = sum(1 for document in documents.values() if document['status'] == status)
+        ranked = sorted(documents.items(), key=lambda item: item[1]['timings']['total'], reverse=True)
+        return {
+            'totals': totals,
+            'slowest': [dict(document, source_path=source_path) for source_path, document in ranked[:slowest]],
+            'documents': dict(sorted(documents.items()))
+        }
+
+    def report(self, path=None, slowest=DEFAULT_SLOWEST, base_path=None):
+        summary = self.summary(slowest, base_path)
+        totals = summary['totals']
+        logger.info(
+            "Citation metrics: %d documents (%d rendered, %d cached, %d warm, %d skipped, %d failed), "
+            "render %.3fs, resolve %.3fs, io %.3fs, scan %.3fs, cache %.3fs, %d bytes in, %d bytes out, "
+            "peak RSS %s",
+            totals['documents'], *(totals[status] for status in STATUSES),
+            totals['timings']['render'], totals['timings']['resolve'], totals['timings']['io'],
+            totals['timings']['scan'], totals['timings']['cache'],
+            totals['bytes_in'], totals['bytes_out'], format_bytes(totals['peak_rss'])
+        )
+        for document in summary['slowest']:
+            logger.info(
+                "  %s: %.3fs (%s)", document['source_path'], document['timings']['total'], document['status']
+            )
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2, sort_keys=True)
+                f.write('\n')
+            os.replace(temp_path, path)
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self.documents.clear()
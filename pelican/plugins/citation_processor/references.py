@@ -0,0 +1,149 @@
+import os
+import re
+import threading
+
+from pelican.contents import Page
+from pelican.utils import truncate_html_words
+
+from .config import get_setting
+from .memo import get_style_traits
+from .scan import build_reference_list, parse_reference_list
+
+
+REFERENCE_LIST_START = '<div id="refs"'
+LINK_TAG_PATTERN = re.compile(r'</?a\b[^>]*>')
+TAG_PATTERN = re.compile(r'<[^>]+>')
+DEFAULT_REFERENCES_SAVE_AS = 'references/{style}-{bibliography}.html'
+DEFAULT_REFERENCES_TITLE = 'References'
+DEFAULT_STUB_WORDS = 10
+
+
+def file_stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def shares_references(settings, citation_style_path):
+    if not get_setting(settings, 'CITATION_SHARED_REFERENCES', False):
+        return False
+    try:
+        return not get_style_traits(citation_style_path)['numeric']
+    except OSError:
+        return False
+
+
+def get_reference_page(settings, config):
+    citation_style_path, bibliography_path = config
+    bibliography_paths = bibliography_path if isinstance(bibliography_path, tuple) else (bibliography_path,)
+    fields = {
+        'style': file_stem(citation_style_path),
+        'bibliography': '+'.join(file_stem(path) for path in bibliography_paths)
+    }
+    save_as = get_setting(settings, 'CITATION_REFERENCES_SAVE_AS', DEFAULT_REFERENCES_SAVE_AS)
+    url = get_setting(settings, 'CITATION_REFERENCES_URL', None) or save_as
+    return save_as.format(**fields), url.format(**fields)
+
+
+def split_reference_list(html):
+    start = html.rfind(REFERENCE_LIST_START)
+    if start == -1:
+        return None
+    references = parse_reference_list(html[start:])
+    if references is None:
+        return None
+    return html[:start], references
+
+
+def entry_head(entry):
+    return entry[:entry.index('>') + 1]
+
+
+def entry_body(entry):
+    return entry[entry.index('>') + 1:-len('</div>')].strip()
+
+
+def entry_text(entry):
+    return ' '.join(TAG_PATTERN.sub('', entry_body(entry)).split()).casefold()
+
+
+def build_stub(key, entry, save_as, words):
+    text = truncate_html_words(LINK_TAG_PATTERN.sub('', entry_body(entry)), words, '…')
+    return f'{entry_head(entry)}\n<a href="{{filename}}/{save_as}#ref-{key}">{text}</a>\n</div>'
+
+
+def share_reference_list(html, save_as, words=DEFAULT_STUB_WORDS):
+    split = split_reference_list(html)
+    if split is None:
+        return html, None, []
+    body, (head, entries) = split
+    stubs = [build_stub(key, entry, save_as, words) for key, entry in entries]
+    stub_head = head.replace('class="', 'class="citation-stubs ', 1)
+    return body + build_reference_list(stub_head, stubs), head, entries
+
+
+def build_reference_page(head, entries):
+    return build_reference_list(head, sorted(entries.values(), key=entry_text))
+
+
+class SharedReferences:
+
+    def __init__(self):
+        self.documents = {}
+        self.current = set()
+        self._lock = threading.Lock()
+
+    def add(self, source_path, page, config, head, entries):
+        with self._lock:
+            self.documents[source_path] = (page, config, head, entries)
+            self.current.add(source_path)
+
+    def use(self, source_path):
+        with self._lock:
+            if source_path in self.documents:
+                self.current.add(source_path)
+
+    def discard(self, source_path):
+        with self._lock:
+            self.documents.pop(source_path, None)
+            self.current.discard(source_path)
+
+    def pages(self):
+        with self._lock:
+            documents = sorted(
+                (source_path, document) for source_path, document in self.documents.items()
+                if source_path in self.current
+            )
+        pages = {}
+        for _, (page, config, head, entries) in documents:
+            shared = pages.setdefault(page, {'config': config, 'head': head, 'entries': {}})
+            for key, entry in entries:
+                shared['entries'].setdefault(key, entry)
+        return pages
+
+    def reset(self):
+        with self._lock:
+            self.current.clear()
+
+    def clear(self):
+        with self._lock:
+            self.documents.clear()
+            self.current.clear()
+
+
+def build_reference_pages(shared_references, settings, context, render=None):
+    title = get_setting(settings, 'CITATION_REFERENCES_TITLE', DEFAULT_REFERENCES_TITLE)
+    pages = []
+    for (save_as, url), shared in sorted(shared_references.pages().items()):
+        references = render(settings, shared['config'], list(shared['entries'])) if render is not None else None
+        if references is not None:
+            html = build_reference_list(references[0], [entry for _, entry in references[1]])
+        else:
+            html = build_reference_page(shared['head'], shared['entries'])
+        page = Page(
+            html,
+            metadata={'title': title, 'save_as': save_as, 'url': url, 'slug': file_stem(save_as)},
+            settings=settings,
+            context=context
+        )
+        context.setdefault('generated_content', {})[save_as] = page
+        pages.append(page)
+    return pages
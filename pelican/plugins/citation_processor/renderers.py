@@ -0,0 +1,374 @@
+import abc
+import functools
+import html
+import json
+import os
+import subprocess
+import threading
+
+from .bibliography import file_signature, get_entry_hashes, get_family_names
+from .cache import cache_key, file_digest
+from .config import get_setting
+from .memo import CitationMemo, get_style_traits
+from .scan import (
+    build_cluster_document,
+    find_citation_clusters,
+    parse_cluster_document,
+    splice_clusters,
+    strip_metadata_header,
+)
+from .server import PandocServerPool, PandocServerUnavailable
+
+try:
+    import citeproc
+    from citeproc import (
+        Citation,
+        CitationItem,
+        CitationStylesBibliography,
+        CitationStylesStyle,
+        Locator,
+        formatter,
+    )
+    from citeproc.source.bibtex import BibTeX
+    from citeproc.source.json import CiteProcJSON
+except ImportError:
+    citeproc = None
+
+
+PANDOC_ARGS = ['--from', 'markdown', '--to', 'html5', '--citeproc']
+AST_PANDOC_ARGS = ['--from', 'json', '--to', 'html5', '--citeproc']
+PARSE_PANDOC_ARGS = ['--from', 'markdown', '--to', 'json']
+CITEPROC_HTML_TAGS = {'<i>': '<em>', '</i>': '</em>', '<b>': '<strong>', '</b>': '</strong>'}
+
+
+def get_render_scope(settings):
+    return 'citations' if get_setting(settings, 'CITATION_RENDER_SCOPE', 'document') == 'citations' else 'document'
+
+
+def uses_pandoc_ast(settings):
+    return (
+        get_render_scope(settings) == 'document'
+        and bool(get_setting(settings, 'CITATION_AST_CACHE', False))
+        and bool(get_setting(settings, 'CITATION_CACHE_PATH', None))
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_pandoc_version():
+    result = subprocess.run(
+        ['pandoc', '--version'],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout.splitlines()[0].strip()
+
+
+class CitationRenderer(abc.ABC):
+
+    name = None
+    parses_ast = False
+
+    def __init__(self):
+        self.memo = CitationMemo()
+
+    @classmethod
+    def available(cls):
+        return True
+
+    @abc.abstractmethod
+    def version(self):
+        pass
+
+    @abc.abstractmethod
+    def cache_parts(self, settings, job):
+        pass
+
+    @abc.abstractmethod
+    def render(self, settings, job, bibliography_path):
+        pass
+
+    def close(self):
+        pass
+
+
+class PandocRenderer(CitationRenderer):
+
+    name = 'pandoc'
+    parses_ast = True
+
+    def version(self):
+        return get_pandoc_version()
+
+    def cache_parts(self, settings, job):
+        if get_render_scope(settings) == 'citations':
+            return (get_pandoc_version(), *PANDOC_ARGS, 'citations', job['html'])
+        if uses_pandoc_ast(settings):
+            return (get_pandoc_version(), *AST_PANDOC_ARGS)
+        return (get_pandoc_version(), *PANDOC_ARGS, 'body')
+
+    def parse(self, settings, text):
+        result = subprocess.run(
+            ['pandoc', *PARSE_PANDOC_ARGS],
+            input=text,
+            capture_output=True,
+            encoding='utf-8',
+            check=True,
+            timeout=get_setting(settings, 'CITATION_TIMEOUT', None)
+        )
+        return result.stdout
+
+    def plan_memo(self, settings, job):
+        if not get_setting(settings, 'CITATION_CLUSTER_MEMO', True):
+            return None
+        traits = get_style_traits(job['citation_style_path'])
+        if traits['note'] or traits['numeric']:
+            return None
+        keys = [item['key'] for cluster in job['clusters'] for item in cluster['items']]
+        cache_path = get_setting(settings, 'CITATION_CACHE_PATH', None)
+        entry_hashes = get_entry_hashes(job['bibliography_path'], keys, cache_path)
+        config = cache_key(
+            get_pandoc_version(),
+            *PANDOC_ARGS,
+            file_digest(job['citation_style_path']),
+            entry_hashes.get('@string', '')
+        )
+        family_names = get_family_names(job['bibliography_path'], keys, cache_path)
+        return self.memo.plan(config, job['clusters'], entry_hashes, family_names, traits['position'])
+
+    def prepare(self, settings, job):
+        if get_render_scope(settings) != 'citations':
+            return job.get('ast', strip_metadata_header(job['source']))
+        job['clusters'] = find_citation_clusters(job['html'])
+        job['memo'] = self.plan_memo(settings, job) if job['clusters'] else None
+        if job['memo'] is None:
+            return build_cluster_document(dict(enumerate(job['clusters'])))
+        return build_cluster_document(job['memo']['pending'], job['memo']['nocite'])
+
+    def needs_pandoc(self, job):
+        if 'clusters' not in job:
+            return True
+        return bool(job['clusters']) and (job['memo'] is None or job['memo']['trailer'] is None)
+
+    def finish(self, job, output):
+        if 'clusters' not in job:
+            return output
+        if not job['clusters']:
+            return job['html']
+        plan = job['memo']
+        if plan is None:
+            rendered, trailer = parse_cluster_document(output, range(len(job['clusters'])))
+        elif plan['trailer'] is not None:
+            rendered, trailer = plan['rendered'], plan['trailer']
+        else:
+            rendered, trailer = parse_cluster_document(output, plan['pending'])
+            self.memo.record(plan, rendered, trailer)
+            rendered.update(plan['rendered'])
+        return splice_clusters(
+            job['html'], job['clusters'], [rendered[index] for index in range(len(job['clusters']))], trailer
+        )
+
+    def render(self, settings, job, bibliography_path):
+        text = self.prepare(settings, job)
+        if not self.needs_pandoc(job):
+            return self.finish(job, '')
+        job['bytes_in'] = len(text.encode('utf-8'))
+        return self.finish(job, self.convert(settings, job, text, bibliography_path))
+
+    def convert(self, settings, job, text, bibliography_path):
+        pandoc_cmd = [
+            'pandoc',
+            *(AST_PANDOC_ARGS if 'ast' in job else PANDOC_ARGS),
+            '--csl', job['citation_style_path'],
+            '--bibliography', bibliography_path
+        ]
+
+        if get_setting(settings, 'DEBUG', False):
+            print(f"Processing citations with command: {' '.join(pandoc_cmd)}")
+
+        result = subprocess.run(
+            pandoc_cmd,
+            input=text,
+            capture_output=True,
+            encoding='utf-8',
+            check=True,
+            timeout=get_setting(settings, 'CITATION_TIMEOUT', None)
+        )
+        return result.stdout
+
+
+class PandocServerRenderer(PandocRenderer):
+
+    name = 'pandoc-server'
+
+    def __init__(self):
+        super().__init__()
+        self.pool = None
+        self.unavailable = False
+        self._lock = threading.Lock()
+
+    def get_pool(self, settings):
+        with self._lock:
+            if self.pool is None and not self.unavailable:
+                pool = PandocServerPool(
+                    get_setting(settings, 'CITATION_PANDOC_SERVERS', 1),
+                    get_setting(settings, 'CITATION_TIMEOUT', None)
+                )
+                try:
+                    pool.start()
+                    self.pool = pool
+                except (OSError, PandocServerUnavailable) as e:
+                    self.unavailable = True
+                    if get_setting(settings, 'DEBUG', False):
+                        print(f"Pandoc server unavailable, falling back to the pandoc CLI: {e}")
+            return self.pool
+
+    def convert(self, settings, job, text, bibliography_path):
+        pool = self.get_pool(settings)
+        if pool is not None:
+            try:
+                return pool.convert(
+                    text, job['citation_style_path'], bibliography_path, 'json' if 'ast' in job else 'markdown'
+                )
+            except PandocServerUnavailable as e:
+                if get_setting(settings, 'DEBUG', False):
+                    print(f"{e}, falling back to the pandoc CLI")
+        return super().convert(settings, job, text, bibliography_path)
+
+    def close(self):
+        with self._lock:
+            if self.pool is not None:
+                self.pool.close()
+            self.pool = None
+            self.unavailable = False
+
+
+class CiteprocPyRenderer(CitationRenderer):
+
+    name = 'citeproc-py'
+
+    def __init__(self):
+        super().__init__()
+        self.fallback = PandocRenderer()
+        self.fallback.memo = self.memo
+        self._styles = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def available(cls):
+        return citeproc is not None
+
+    def version(self):
+        return f'citeproc-py {citeproc.__version__}'
+
+    def cache_parts(self, settings, job):
+        if self.needs_fallback(find_citation_clusters(job['html'])):
+            return self.fallback.cache_parts(self.fallback_settings(settings), job)
+        return ('citeproc-py', citeproc.__version__, job['html'])
+
+    def needs_fallback(self, clusters):
+        return any(
+            cluster['in_text'] or any(item['suppress_author'] for item in cluster['items'])
+            for cluster in clusters
+        )
+
+    def fallback_settings(self, settings):
+        return dict(settings, CITATION_RENDER_SCOPE='citations')
+
+    def _load(self, memo, path, load):
+        signature = file_signature(path)
+        with self._lock:
+            cached = memo.get(path)
+            if cached is None or cached[0] != signature:
+                cached = (signature, load(path))
+                memo[path] = cached
+            return cached[1]
+
+    def load_style(self, path):
+        return self._load(self._styles, path, lambda path: CitationStylesStyle(path, validate=False))
+
+    def load_source(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.json':
+            def load(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return CiteProcJSON(json.load(f))
+        elif extension in ('.bib', '.bibtex'):
+            def load(path):
+                return BibTeX(path, encoding='utf-8')
+        else:
+            raise ValueError(f"citeproc-py cannot read bibliography format {extension}")
+        return self._load(self._sources, path, load)
+
+    def format(self, text):
+        for tag, replacement in CITEPROC_HTML_TAGS.items():
+            text = text.replace(tag, replacement)
+        return text
+
+    def build_citation(self, cluster):
+        items = []
+        for item in cluster['items']:
+            options = {}
+            if item['prefix']:
+                options['prefix'] = item['prefix'] + ' '
+            if item['suffix']:
+                options['suffix'] = ' ' + item['suffix']
+            if item['locator']:
+                options['locator'] = Locator(item['label'], item['locator'])
+            items.append(CitationItem(item['key'].lower(), **options))
+        return Citation(items)
+
+    def render_bibliography(self, style, bibliography, keys):
+        classes = 'references csl-bib-body'
+        if style.root.bibliography.get('hanging-indent') == 'true':
+            classes += ' hanging-indent'
+        entries = [
+            f'<div id="ref-{html.escape(keys.get(key, key))}" class="csl-entry" role="listitem">\n'
+            f'{self.format(str(entry))}\n</div>'
+            for key, entry in zip(bibliography.keys, bibliography.bibliography())
+        ]
+        return f'<div id="refs" class="{classes}" role="list">\n' + '\n'.join(entries) + '\n</div>\n'
+
+    def render(self, settings, job, bibliography_path):
+        content = job['html']
+        job['bytes_in'] = len(content.encode('utf-8'))
+        clusters = find_citation_clusters(content)
+        if not clusters:
+            return content
+        if self.needs_fallback(clusters):
+            if get_setting(settings, 'DEBUG', False):
+                print("citeproc-py cannot render in-text or suppress-author citations, falling back to Pandoc")
+            return self.fallback.render(self.fallback_settings(settings), job, bibliography_path)
+
+        style = self.load_style(job['citation_style_path'])
+        source = self.load_source(bibliography_path)
+        bibliography = CitationStylesBibliography(style, source, formatter.html)
+        keys = {}
+        citations = []
+        for cluster in clusters:
+            for item in cluster['items']:
+                keys.setdefault(item['key'].lower(), item['key'])
+            citation = self.build_citation(cluster)
+            bibliography.register(citation)
+            citations.append(citation)
+        bibliography.sort()
+
+        def warn(item):
+            if get_setting(settings, 'DEBUG', False):
+                print(f"Citation key not found in bibliography: {keys.get(item.key, item.key)}")
+
+        rendered = []
+        for cluster, citation in zip(clusters, citations):
+            data_cites = ' '.join(item['key'] for item in cluster['items'])
+            rendered.append(
+                f'<span class="citation" data-cites="{html.escape(data_cites)}">'
+                f'{self.format(bibliography.cite(citation, warn))}</span>'
+            )
+        return splice_clusters(content, clusters, rendered, self.render_bibliography(style, bibliography, keys))
+
+
+RENDERERS = {
+    renderer.name: renderer
+    for renderer in (PandocRenderer, PandocServerRenderer, CiteprocPyRenderer)
+}
@@ -0,0 +1,205 @@
+import re
+
+
+FENCED_CODE_PATTERN = re.compile(
+    r'^[ \t]*(?P<fence>`{3,}|~{3,}).*?^[ \t]*(?P=fence)[`~]*[ \t]*$',
+    re.MULTILINE | re.DOTALL
+)
+INLINE_CODE_PATTERN = re.compile(r'(?P<ticks>`+)(?:(?!\n[ \t]*\n).)+?(?P=ticks)', re.DOTALL)
+HTML_COMMENT_PATTERN = re.compile(r'<!--.*?-->', re.DOTALL)
+METADATA_LINE_PATTERN = re.compile(r'^[A-Za-z0-9_-]+:')
+CITATION_KEY = r'(?:\{(?P<braced>[^{}\s]+)\}|(?P<key>\w+(?:[:.#$%&\-+?<>~/]+\w+)*))'
+CITATION_PATTERN = re.compile(r'(?<![\w\\])@' + CITATION_KEY)
+HTML_CITATION_KEY = CITATION_KEY.replace('<>', '')
+HTML_PROTECTED_PATTERN = re.compile(
+    r'<(?P<tag>pre|code|script|style)\b.*?</(?P=tag)>|<[^>]*>',
+    re.DOTALL | re.IGNORECASE
+)
+BRACKETED_CLUSTER_PATTERN = re.compile(r'\[(?P<body>[^\[\]<>]*?@[^\[\]<>]*?)\]')
+CITATION_ITEM_PATTERN = re.compile(
+    r'^(?P<prefix>.*?)(?<![\w\\])(?P<suppress>-?)@' + HTML_CITATION_KEY + r'(?P<suffix>.*)$',
+    re.DOTALL
+)
+IN_TEXT_CITATION_PATTERN = re.compile(
+    r'(?<![\w\\])@' + HTML_CITATION_KEY + r'(?:[ \t]*\[(?P<locator>[^\[\]<>@]*)\])?'
+)
+LOCATOR_PATTERN = re.compile(
+    r'^,?\s*(?:(?P<label>[A-Za-z]+)\.?\s*)?(?P<locator>\d[\w\-–]*(?:\s*[,–-]\s*\d[\w]*)*)(?P<rest>.*)$',
+    re.DOTALL
+)
+CLUSTER_OUTPUT_PATTERN = re.compile(
+    r'<div id="citation-cluster-(?P<index>\d+)">\s*<p>(?P<html>.*?)</p>\s*</div>\n?',
+    re.DOTALL
+)
+REFERENCE_LIST_PATTERN = re.compile(r'(?P<head><div id="refs"[^>]*>\n)(?P<body>.*)</div>\n?', re.DOTALL)
+REFERENCE_ENTRY_PATTERN = re.compile(
+    r'^<div id="ref-(?P<key>[^"]+)"[^>]*>\n.*?^</div>$',
+    re.DOTALL | re.MULTILINE
+)
+LOCATOR_LABELS = {
+    'p': 'page', 'pp': 'page', 'page': 'page', 'pages': 'page',
+    'chap': 'chapter', 'chaps': 'chapter', 'chapter': 'chapter',
+    'sec': 'section', 'secs': 'section', 'section': 'section',
+    'vol': 'volume', 'vols': 'volume', 'volume': 'volume',
+    'fig': 'figure', 'figs': 'figure', 'figure': 'figure',
+    'para': 'paragraph', 'paras': 'paragraph', 'paragraph': 'paragraph',
+    'l': 'line', 'll': 'line', 'line': 'line',
+    'n': 'note', 'nn': 'note', 'note': 'note',
+    'col': 'column', 'cols': 'column', 'column': 'column',
+    'bk': 'book', 'bks': 'book', 'book': 'book',
+    'pt': 'part', 'pts': 'part', 'part': 'part',
+}
+
+
+def strip_code(text):
+    text = FENCED_CODE_PATTERN.sub('', text)
+    text = HTML_COMMENT_PATTERN.sub('', text)
+    return INLINE_CODE_PATTERN.sub('', text)
+
+
+def strip_metadata_header(text):
+    lines = text.split('\n')
+    if not METADATA_LINE_PATTERN.match(lines[0]):
+        return text
+    for index, line in enumerate(lines):
+        if not line.strip():
+            return '\n'.join(lines[index + 1:])
+        if not METADATA_LINE_PATTERN.match(line) and not line.startswith(('    ', '\t')):
+            return text
+    return ''
+
+
+def find_citation_keys(text):
+    if '@' not in text:
+        return []
+    keys = {}
+    for match in CITATION_PATTERN.finditer(strip_code(text)):
+        keys.setdefault(match.group('braced') or match.group('key'), None)
+    return list(keys)
+
+
+def parse_locator(suffix):
+    match = LOCATOR_PATTERN.match(suffix)
+    if match is None:
+        return None, None, suffix
+    label = match.group('label')
+    if label is None:
+        if not suffix.lstrip().startswith(','):
+            return None, None, suffix
+        label = 'page'
+    elif label.lower() in LOCATOR_LABELS:
+        label = LOCATOR_LABELS[label.lower()]
+    else:
+        return None, None, suffix
+    return label, match.group('locator').strip(), match.group('rest')
+
+
+def parse_citation_item(text):
+    match = CITATION_ITEM_PATTERN.match(text)
+    if match is None:
+        return None
+    label, locator, suffix = parse_locator(match.group('suffix'))
+    return {
+        'key': match.group('braced') or match.group('key'),
+        'prefix': match.group('prefix').strip(),
+        'suffix': suffix.strip(),
+        'label': label,
+        'locator': locator,
+        'suppress_author': bool(match.group('suppress'))
+    }
+
+
+def find_citation_clusters(html):
+    protected = [match.span() for match in HTML_PROTECTED_PATTERN.finditer(html)]
+
+    def is_protected(start, end):
+        return any(span_start < end and start < span_end for span_start, span_end in protected)
+
+    clusters = []
+    for match in BRACKETED_CLUSTER_PATTERN.finditer(html):
+        if is_protected(*match.span()):
+            continue
+        items = [parse_citation_item(part) for part in match.group('body').split(';')]
+        if not items or None in items:
+            continue
+        clusters.append({
+            'start': match.start(),
+            'end': match.end(),
+            'text': match.group(0),
+            'items': items,
+            'in_text': False
+        })
+
+    bracketed = [(cluster['start'], cluster['end']) for cluster in clusters]
+    for match in IN_TEXT_CITATION_PATTERN.finditer(html):
+        if is_protected(*match.span()):
+            continue
+        if any(start <= match.start() < end for start, end in bracketed):
+            continue
+        label, locator, suffix = parse_locator(', ' + (match.group('locator') or ''))
+        clusters.append({
+            'start': match.start(),
+            'end': match.end(),
+            'text': match.group(0),
+            'items': [{
+                'key': match.group('braced') or match.group('key'),
+                'prefix': '',
+                'suffix': suffix.strip(', '),
+                'label': label,
+                'locator': locator,
+                'suppress_author': False
+            }],
+            'in_text': True
+        })
+
+    return sorted(clusters, key=lambda cluster: cluster['start'])
+
+
+def build_cluster_document(clusters, nocite=()):
+    header = ''
+    if nocite:
+        header = '---\nnocite: |\n  ' + ', '.join(f'@{{{key}}}' for key in nocite) + '\n---\n\n'
+    return header + ''.join(
+        f'::: {{#citation-cluster-{index}}}\n{cluster["text"]}\n:::\n\n'
+        for index, cluster in clusters.items()
+    )
+
+
+def parse_cluster_document(output, indices):
+    rendered = {}
+    trailer_start = 0
+    for match in CLUSTER_OUTPUT_PATTERN.finditer(output):
+        rendered[int(match.group('index'))] = match.group('html')
+        trailer_start = match.end()
+    if sorted(rendered) != sorted(indices):
+        raise ValueError(f"Expected {len(indices)} citation clusters in output, got {len(rendered)}")
+    return rendered, output[trailer_start:]
+
+
+def parse_reference_list(trailer):
+    match = REFERENCE_LIST_PATTERN.fullmatch(trailer)
+    if match is None:
+        return None
+    entries = [(entry.group('key'), entry.group(0)) for entry in REFERENCE_ENTRY_PATTERN.finditer(match.group('body'))]
+    if build_reference_list(match.group('head'), [html for _, html in entries]) != trailer:
+        return None
+    return match.group('head'), entries
+
+
+def build_reference_list(head, entries):
+    return head + ''.join(html + '\n' for html in entries) + '</div>\n'
+
+
+def splice_clusters(html, clusters, rendered, trailer):
+    parts = []
+    position = 0
+    for cluster, replacement in zip(clusters, rendered):
+        parts.append(html[position:cluster['start']])
+        parts.append(replacement)
+        position = cluster['end']
+    parts.append(html[position:])
+    if trailer:
+        if not html.endswith('\n'):
+            parts.append('\n')
+        parts.append(trailer)
+    return ''.join(parts)
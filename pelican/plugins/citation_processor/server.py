@@ -0,0 +1,147 @@
+import base64
+import http.client
+import json
+import os
+import queue
+import socket
+import subprocess
+import threading
+import time
+
+
+CONNECTIONS_PER_SERVER = 4
+STARTUP_TIMEOUT = 10
+DEFAULT_REQUEST_TIMEOUT = 120
+
+
+class PandocServerUnavailable(Exception):
+    pass
+
+
+class PandocServerError(Exception):
+    pass
+
+
+def find_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class PandocServerPool:
+
+    def __init__(self, size=1, timeout=None):
+        self.size = max(1, size)
+        self.timeout = timeout or DEFAULT_REQUEST_TIMEOUT
+        self.processes = []
+        self.ports = []
+        self._connections = queue.LifoQueue()
+        self._files = {}
+        self._files_lock = threading.Lock()
+
+    def start(self):
+        try:
+            for _ in range(self.size):
+                port = find_free_port()
+                process = subprocess.Popen(
+                    ['pandoc', 'server', '--port', str(port), '--timeout', str(int(self.timeout))],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL
+                )
+                self.processes.append(process)
+                self.ports.append(port)
+            for process, port in zip(self.processes, self.ports):
+                self._wait_until_ready(process, port)
+        except (OSError, PandocServerUnavailable):
+            self.close()
+            raise
+        for _ in range(CONNECTIONS_PER_SERVER):
+            for port in self.ports:
+                self._connections.put(self._connect(port))
+
+    def _connect(self, port):
+        return http.client.HTTPConnection('127.0.0.1', port, timeout=self.timeout)
+
+    def _wait_until_ready(self, process, port):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise PandocServerUnavailable(f"pandoc server exited with status {process.returncode}")
+            connection = self._connect(port)
+            try:
+                connection.request('GET', '/version')
+                response = connection.getresponse()
+                response.read()
+                if response.status == 200:
+                    return
+            except OSError:
+                pass
+            finally:
+                connection.close()
+            time.sleep(0.05)
+        raise PandocServerUnavailable(f"pandoc server on port {port} did not start")
+
+    def _encode_file(self, path):
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._files_lock:
+            cached = self._files.get(path)
+            if cached is None or cached[0] != signature:
+                with open(path, 'rb') as f:
+                    cached = (signature, base64.b64encode(f.read()).decode('ascii'))
+                self._files[path] = cached
+            return cached[1]
+
+    def convert(self, source, citation_style_path, bibliography_path, from_format='markdown'):
+        style_name = 'style' + os.path.splitext(citation_style_path)[1]
+        bibliography_name = 'bibliography' + os.path.splitext(bibliography_path)[1]
+        body = json.dumps({
+            'text': source,
+            'from': from_format,
+            'to': 'html5',
+            'citeproc': True,
+            'csl': style_name,
+            'bibliography': [bibliography_name],
+            'files': {
+                style_name: self._encode_file(citation_style_path),
+                bibliography_name: self._encode_file(bibliography_path)
+            }
+        })
+        connection = self._connections.get()
+        try:
+            connection.request('POST', '/', body=body.encode('utf-8'), headers={
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            })
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            raise PandocServerUnavailable(f"pandoc server request failed: {e}")
+        finally:
+            self._connections.put(connection)
+        if response.status != 200:
+            raise PandocServerError(data.decode('utf-8', 'replace'))
+        result = json.loads(data)
+        if 'error' in result:
+            raise PandocServerError(result['error'])
+        output = result['output']
+        if result.get('base64'):
+            output = base64.b64decode(output).decode('utf-8')
+        if not output.endswith('\n'):
+            output += '\n'
+        return output
+
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.processes = []
+        self.ports = []
@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import UserString
+from functools import partial
+
+from pelican.contents import Content
+
+from .cache import cache_key
+
+
+_loaded_contents = set()
+_loaded_lock = threading.Lock()
+
+
+class SpilledHTML:
+
+    def __init__(self, store, path, size):
+        self.store = store
+        self.path = path
+        self.size = size
+
+    def load(self):
+        return self.store.load(self.path)
+
+
+class SpilledText(UserString):
+
+    def __init__(self, seq):
+        self.spilled = seq if isinstance(seq, SpilledHTML) else None
+        self.text = None if self.spilled is not None else str(seq)
+
+    @property
+    def data(self):
+        if self.spilled is not None:
+            return self.spilled.load()
+        return self.text
+
+
+class SpillStore:
+
+    def __init__(self, path=None, compress=False):
+        self.temporary = not path
+        self.path = tempfile.mkdtemp(prefix='pelican-citations-') if self.temporary else path
+        self.compress = compress
+        self.loads = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def entry_path(self, source_path):
+        key = cache_key(source_path)
+        return os.path.join(self.path, key + ('.html.z' if self.compress else '.html'))
+
+    def put(self, source_path, html):
+        path = self.entry_path(source_path)
+        data = html.encode('utf-8')
+        if self.compress:
+            data = zlib.compress(data)
+        fd, temp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._entries[path] = len(data)
+        return SpilledHTML(self, path, len(data))
+
+    def load(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        with self._lock:
+            self.loads += 1
+        if path.endswith('.z'):
+            data = zlib.decompress(data)
+        return data.decode('utf-8')
+
+    def discard(self, source_path):
+        path = self.entry_path(source_path)
+        with self._lock:
+            self._entries.pop(path, None)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'size': sum(self._entries.values()), 'loads': self.loads}
+
+    def close(self):
+        with self._lock:
+            paths = list(self._entries)
+            self._entries.clear()
+        if self.temporary:
+            shutil.rmtree(self.path, ignore_errors=True)
+            return
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def load_spilled(content, text):
+    with _loaded_lock:
+        _loaded_contents.add(content)
+    if content._content is not text:
+        return str(content._content)
+    return text.data
+
+
+def assign_spilled(content, spilled):
+    if not isinstance(content, Content):
+        content._content = spilled.load()
+        return False
+    content._content = SpilledText(spilled)
+    content._get_content = partial(load_spilled, content, content._content)
+    return True
+
+
+def release_loaded_contents(siteurls=()):
+    with _loaded_lock:
+        contents = list(_loaded_contents)
+        _loaded_contents.clear()
+    for content in contents:
+        for memo in (Content.get_content.cache, Content.get_summary.cache):
+            for siteurl in {content.get_siteurl(), *siteurls}:
+                memo.pop((content, siteurl), None)
+    return len(contents)
@@ -0,0 +1,85 @@
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+NO_SPAN = contextlib.nullcontext()
+
+
+class CitationTrace:
+
+    def __init__(self):
+        self.path = None
+        self.events = []
+        self.threads = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def configure(self, path):
+        path = path or None
+        if path != self.path:
+            self.path = path
+            self.clear()
+
+    def now(self):
+        return time.perf_counter()
+
+    def complete(self, name, source_path, start, end, **args):
+        thread = threading.current_thread()
+        event = {
+            'name': name,
+            'cat': 'citations',
+            'ph': 'X',
+            'ts': round((start - self._origin) * 1e6, 3),
+            'dur': round((end - start) * 1e6, 3),
+            'pid': os.getpid(),
+            'tid': thread.ident,
+            'args': dict(args, source_path=source_path)
+        }
+        with self._lock:
+            self.threads.setdefault(thread.ident, thread.name)
+            self.events.append(event)
+
+    @contextlib.contextmanager
+    def _span(self, name, source_path, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, source_path, start, time.perf_counter(), **args)
+
+    def span(self, name, source_path, **args):
+        if self.path is None:
+            return NO_SPAN
+        return self._span(name, source_path, args)
+
+    def write(self):
+        if self.path is None:
+            return None
+        with self._lock:
+            metadata = [
+                {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': ident, 'args': {'name': name}}
+                for ident, name in self.threads.items()
+            ]
+            events = metadata + sorted(self.events, key=lambda event: event['ts'])
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+            f.write('\n')
+        os.replace(temp_path, self.path)
+        return self.path
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+            self.threads = {}
+            self._origin = time.perf_counter()
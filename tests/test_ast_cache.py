@@ -0,0 +1,109 @@
+"""
+Tests for the two-stage Pandoc AST cache in the Pelican Citation Processor plugin.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.contents import Article
+from pelican.settings import DEFAULT_CONFIG
+from pelican.plugins.citation_processor.citation_processor import process_generator_citations
+from tests.test_utils import patch_pandoc_version, reset_plugin_state, write_files
+
+
+def fake_pandoc(cmd, **kwargs):
+    if cmd[cmd.index('--to') + 1] == 'json':
+        return Mock(returncode=0, stdout=f"AST({kwargs['input']})\n")
+    return Mock(returncode=0, stdout=f"<p>{kwargs['input']}</p>")
+
+
+def identity_pandoc(cmd, **kwargs):
+    if cmd[cmd.index('--to') + 1] == 'json':
+        return Mock(returncode=0, stdout=kwargs['input'])
+    return Mock(returncode=0, stdout=f"<p>{kwargs['input']}</p>")
+
+
+def stages(mock_run):
+    return [call.args[0][call.args[0].index('--to') + 1] for call in mock_run.call_args_list]
+
+
+class TestPandocASTCache(unittest.TestCase):
+    """Test cases for reusing parsed sources when only the style changes."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        patch_pandoc_version(self, ('context', 'renderers'))
+        write_files(self.temp_dir.name, [("refs.bib", "@book{key,}"), ("style.csl", "<style/>")])
+        self.cache_path = os.path.join(self.temp_dir.name, "cache")
+        self.settings = dict(DEFAULT_CONFIG)
+        self.settings.update(
+            PATH=self.temp_dir.name,
+            CITATION_STYLE="style.csl",
+            BIBLIOGRAPHY_FILE="refs.bib",
+            CITATION_CACHE_PATH=self.cache_path,
+            CITATION_AST_CACHE=True,
+            CITATION_WARM_STATE=False
+        )
+        write_files(self.temp_dir.name, [("article.md", "Title: Example\nDate: 2024-01-01\n\nText [@key].")])
+        self.article_generator = Mock(spec=['settings', 'articles'])
+        self.article_generator.settings = self.settings
+
+    def _process(self):
+        article = Article(
+            "<p>original</p>",
+            metadata={'title': "Example"},
+            settings=self.settings,
+            source_path=os.path.join(self.temp_dir.name, "article.md"),
+            context={}
+        )
+        self.article_generator.articles = [article]
+        process_generator_citations(self.article_generator)
+        return article
+
+    @patch('subprocess.run')
+    def test_restyling_reuses_the_parsed_source(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+
+        article = self._process()
+
+        self.assertEqual(stages(mock_run), ['json', 'html5'])
+        self.assertEqual(mock_run.call_args_list[0].kwargs['input'], "Text [@key].")
+        self.assertEqual(article._content, "<p>AST(Text [@key].)</p>")
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_path, "ast"))), 1)
+
+        write_files(self.temp_dir.name, [("style.csl", "<style class=\"note\"/>")])
+        self._process()
+
+        self.assertEqual(stages(mock_run), ['json', 'html5', 'html5'])
+        self.assertIn('json', mock_run.call_args_list[2].args[0])
+
+    @patch('subprocess.run')
+    def test_edited_sources_are_parsed_again(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self._process()
+
+        write_files(self.temp_dir.name, [("article.md", "Title: Example\n\nNew text [@key].")])
+        article = self._process()
+
+        self.assertEqual(stages(mock_run), ['json', 'html5', 'json', 'html5'])
+        self.assertEqual(article._content, "<p>AST(New text [@key].)</p>")
+
+
+    @patch('subprocess.run')
+    def test_ast_and_document_renders_match(self, mock_run):
+        mock_run.side_effect = identity_pandoc
+        ast_html = self._process()._content
+
+        self.settings['CITATION_AST_CACHE'] = False
+        document_html = self._process()._content
+
+        self.assertEqual(document_html, ast_html)
+        self.assertEqual(document_html, "<p>Text [@key].</p>")
+
+
+if __name__ == '__main__':
+    unittest.main()
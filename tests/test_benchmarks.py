@@ -0,0 +1,103 @@
+"""
+Tests for the benchmark corpus generator and fake pandoc executable.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+from benchmarks import fake_pandoc
+from benchmarks.corpus import BIBLIOGRAPHY_PATH, STYLE_PATH, generate_corpus
+from benchmarks.run_benchmarks import install_fake_pandoc, run_benchmarks
+from pelican.plugins.citation_processor import renderers
+
+
+class TestCorpus(unittest.TestCase):
+    """Test cases for generating synthetic content trees."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_generate_corpus_is_reproducible(self):
+        first = generate_corpus(os.path.join(self.temp_dir.name, "a"), articles=3, citations=4, entries=20, seed=1)
+        second = generate_corpus(os.path.join(self.temp_dir.name, "b"), articles=3, citations=4, entries=20, seed=1)
+
+        self.assertEqual([content for _, content in first], [content for _, content in second])
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir.name, "a", STYLE_PATH)))
+        with open(os.path.join(self.temp_dir.name, "a", BIBLIOGRAPHY_PATH), 'r') as f:
+            self.assertEqual(f.read().count("@article{"), 20)
+        with open(first[0][0], 'r') as f:
+            text = f.read()
+        bracketed = re.findall(r"\[@[^\]]*\]", text)
+        self.assertEqual(len(bracketed) + re.sub(r"\[@[^\]]*\]", "", text).count("@ref"), 4)
+
+
+class TestFakePandoc(unittest.TestCase):
+    """Test cases for the fake pandoc executable."""
+
+    def test_render_document_formats_citations_and_references(self):
+        with patch.dict(os.environ, {'FAKE_PANDOC_FAILURE_RATE': "0", 'FAKE_PANDOC_LATENCY': "0"}):
+            output = fake_pandoc.render_document("Title: A\n\nText [@b; @a, p. 3].")
+
+        self.assertIn('<span class="citation" data-cites="b">(b 2020)</span>', output)
+        self.assertEqual(re.findall(r'id="ref-(\w+)"', output), ["a", "b"])
+
+    def test_render_document_keeps_every_paragraph(self):
+        with patch.dict(os.environ, {'FAKE_PANDOC_FAILURE_RATE': "0", 'FAKE_PANDOC_LATENCY': "0"}):
+            for header in ("Title: A\nDate: 2024-01-01\n\n", "---\ntitle: A\n\nabstract: B\n---\n"):
+                output = fake_pandoc.render_document(header + "One [@a].\n\nTwo [@b].\n\nThree [@c].\n")
+
+                with self.subTest(header=header):
+                    self.assertEqual(output.count("<p>"), 3)
+                    self.assertEqual(re.findall(r'id="ref-(\w+)"', output), ["a", "b", "c"])
+
+    def test_failures_are_deterministic(self):
+        with patch.dict(os.environ, {'FAKE_PANDOC_FAILURE_RATE': "0.5", 'FAKE_PANDOC_SEED': "3"}):
+            decisions = [fake_pandoc.should_fail(f"document {i}") for i in range(40)]
+
+            self.assertEqual(decisions, [fake_pandoc.should_fail(f"document {i}") for i in range(40)])
+        self.assertTrue(any(decisions))
+        self.assertFalse(all(decisions))
+
+
+class TestRunBenchmarks(unittest.TestCase):
+    """Test cases for running the benchmark suite with the fake pandoc."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.addCleanup(renderers.get_pandoc_version.cache_clear)
+        renderers.get_pandoc_version.cache_clear()
+        environ = patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def test_modes_agree_on_rendered_and_failed_counts(self):
+        path = install_fake_pandoc(os.path.join(self.temp_dir.name, "bin"), failure_rate=0.2, seed=1)
+        self.assertEqual(
+            subprocess.run([path, "--version"], capture_output=True, text=True).stdout.strip(), fake_pandoc.VERSION
+        )
+        args = argparse.Namespace(
+            articles=10, citations=3, entries=30, seed=1, modes=["serial", "parallel", "batch"], repeat=2,
+            workers=2, renderer="pandoc", scope="document", timeout=None, cache=True, warm=False
+        )
+
+        with patch('builtins.print'):
+            results = run_benchmarks(args, self.temp_dir.name)
+
+        counts = {(result['run'], result['rendered'], result['cached'], result['failed']) for result in results}
+        self.assertEqual(len(counts), 2)
+        first, second = sorted(counts)
+        self.assertEqual(first[1] + first[3], 10)
+        self.assertGreater(first[3], 0)
+        self.assertEqual((second[1], second[2], second[3]), (0, first[1], first[3]))
+
+
+if __name__ == '__main__':
+    unittest.main()
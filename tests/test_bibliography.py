@@ -0,0 +1,258 @@
+"""
+Tests for bibliography indexing and pruning in the Pelican Citation Processor plugin.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor.bibliography import (
+    BibliographyKeyIndex,
+    compile_bibliography,
+    get_bibliography_index,
+    get_entry_hashes,
+    prune_bibliography,
+    split_bibliography_files,
+)
+from pelican.plugins.citation_processor.context import BuildContext
+
+
+BIBLIOGRAPHY = """@string{mitp = {MIT Press}}
+
+@comment{Ignored @book{Commented, title={No}}}
+
+@book{Parent,
+  title = {Collected Works {(Volume 1)}},
+  publisher = mitp,
+  year = {2016}
+}
+
+@incollection{Child,
+  title = {A Chapter},
+  author = {Ada Lovelace},
+  crossref = {Parent}
+}
+
+@article{Other,
+  title = "Unrelated",
+  year = 2017
+}
+
+@misc(Paren,
+  title = {Parenthesised entry}
+)
+"""
+
+
+class TestBibliographyIndex(unittest.TestCase):
+    """Test cases for the BibTeX key index."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "refs.bib")
+        with open(self.path, 'w') as f:
+            f.write(BIBLIOGRAPHY)
+
+    def test_index_finds_entries_and_skips_comments(self):
+        index = get_bibliography_index(self.path)
+
+        self.assertEqual(sorted(index.entries), ["Child", "Other", "Paren", "Parent"])
+        self.assertTrue(index.entry("Paren").endswith(")"))
+        self.assertIn("{(Volume 1)}", index.entry("Parent"))
+
+    def test_resolve_keys_includes_crossref_parents(self):
+        index = get_bibliography_index(self.path)
+
+        self.assertEqual(index.resolve_keys(["Child", "Missing"]), {"Child", "Parent"})
+
+    def test_prune_keeps_string_definitions_in_file_order(self):
+        pruned = get_bibliography_index(self.path).prune(["Child"])
+
+        self.assertTrue(pruned.startswith("@string{mitp = {MIT Press}}"))
+        self.assertLess(pruned.index("@book{Parent"), pruned.index("@incollection{Child"))
+        self.assertNotIn("Other", pruned)
+
+    def test_index_is_rebuilt_only_when_file_changes(self):
+        index = get_bibliography_index(self.path)
+        self.assertIs(get_bibliography_index(self.path), index)
+
+        with open(self.path, 'a') as f:
+            f.write("\n@book{Added, title={New}}\n")
+
+        self.assertIn("Added", get_bibliography_index(self.path).entries)
+
+    def test_prune_bibliography_writes_content_addressed_file(self):
+        cache_path = os.path.join(self.temp_dir.name, "cache")
+
+        first = prune_bibliography(self.path, ["Other"], cache_path)
+        second = prune_bibliography(self.path, ["Other"], cache_path)
+
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith(os.path.join(cache_path, "bibliographies")))
+        self.assertTrue(first.endswith(".bib"))
+        with open(first, 'r') as f:
+            self.assertIn("@article{Other", f.read())
+
+    def test_prune_bibliography_leaves_other_formats_alone(self):
+        self.assertEqual(prune_bibliography("/refs/library.yaml", ["Other"]), "/refs/library.yaml")
+
+
+class TestCompileBibliography(unittest.TestCase):
+    """Test cases for compiling BibTeX bibliographies to CSL-JSON."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "refs.bib")
+        self.cache_path = os.path.join(self.temp_dir.name, "cache")
+        with open(self.path, 'w') as f:
+            f.write(BIBLIOGRAPHY)
+
+    def _fake_pandoc(self, cmd, **kwargs):
+        items = [{"id": "Child", "title": "A Chapter"}, {"id": "Other", "title": "Unrelated"}]
+        return Mock(returncode=0, stdout=json.dumps(items))
+
+    @patch('subprocess.run')
+    def test_compile_bibliography_converts_once(self, mock_run):
+        mock_run.side_effect = self._fake_pandoc
+
+        first = compile_bibliography(self.path, "pandoc 3.1", self.cache_path)
+        second = compile_bibliography(self.path, "pandoc 3.1", self.cache_path)
+
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith(os.path.join(self.cache_path, "csljson")))
+        mock_run.assert_called_once()
+        self.assertEqual(mock_run.call_args.args[0][1:5], ['--from', 'biblatex', '--to', 'csljson'])
+
+    @patch('subprocess.run')
+    def test_compile_bibliography_is_invalidated_by_content(self, mock_run):
+        mock_run.side_effect = self._fake_pandoc
+        first = compile_bibliography(self.path, "pandoc 3.1", self.cache_path)
+
+        with open(self.path, 'a') as f:
+            f.write("\n@book{Added, title={New}}\n")
+
+        self.assertNotEqual(compile_bibliography(self.path, "pandoc 3.1", self.cache_path), first)
+        self.assertEqual(mock_run.call_count, 2)
+
+    @patch('subprocess.run')
+    def test_compiled_bibliography_can_be_pruned(self, mock_run):
+        mock_run.side_effect = self._fake_pandoc
+        compiled = compile_bibliography(self.path, "pandoc 3.1", self.cache_path)
+
+        with open(prune_bibliography(compiled, ["Other", "Missing"], self.cache_path), 'r') as f:
+            self.assertEqual(json.load(f), [{"id": "Other", "title": "Unrelated"}])
+
+    def test_compile_bibliography_leaves_csl_json_alone(self):
+        self.assertEqual(compile_bibliography("/refs/library.json", "pandoc 3.1"), "/refs/library.json")
+
+
+GROUP_BIBLIOGRAPHY = """@string{acm = {ACM}}
+
+@inproceedings{Talk,
+  title = {Ünïcode Talk},
+  author = {Grace Hopper},
+  publisher = acm,
+  crossref = {Parent}
+}
+
+@article{Other,
+  title = "Duplicate",
+  year = 2020
+}
+"""
+
+
+class TestBibliographySet(unittest.TestCase):
+    """Test cases for merged key indexes over several bibliography files."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.cache_path = os.path.join(self.temp_dir.name, "cache")
+        self.paths = (os.path.join(self.temp_dir.name, "refs.bib"), os.path.join(self.temp_dir.name, "group.bib"))
+        for path, text in zip(self.paths, (BIBLIOGRAPHY, GROUP_BIBLIOGRAPHY)):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+
+    def test_split_bibliography_files(self):
+        self.assertEqual(split_bibliography_files("a.bib, b.bib"), ("a.bib", "b.bib"))
+        self.assertEqual(split_bibliography_files(["a.bib", "b.bib"]), ("a.bib", "b.bib"))
+        self.assertEqual(split_bibliography_files("a.bib"), ("a.bib",))
+        self.assertEqual(split_bibliography_files(None), ())
+
+    def test_index_maps_keys_to_files_and_reads_entries_lazily(self):
+        index = get_bibliography_index(self.paths, self.cache_path)
+
+        self.assertEqual(index.entries["Talk"][0], self.paths[1])
+        self.assertEqual(index.entries["Other"][0], self.paths[0])
+        self.assertEqual(index._texts, {})
+        self.assertIn("Ünïcode Talk", index.entry("Talk"))
+        self.assertEqual(index.duplicates, {"Other": list(self.paths)})
+        self.assertEqual(index.family_name("Talk"), "hopper")
+        self.assertEqual(index.resolve_keys(["Talk"]), {"Talk", "Parent"})
+
+    def test_prune_merges_cited_entries_and_definitions(self):
+        pruned = get_bibliography_index(self.paths, self.cache_path).prune(["Talk"])
+
+        self.assertTrue(pruned.startswith("@string{mitp = {MIT Press}}\n\n@string{acm = {ACM}}"))
+        self.assertLess(pruned.index("@book{Parent"), pruned.index("@inproceedings{Talk"))
+        self.assertNotIn("Duplicate", pruned)
+
+        path = prune_bibliography(self.paths, ["Talk"], self.cache_path)
+        self.assertTrue(path.endswith(".bib"))
+        with open(path, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), pruned)
+
+    def test_entry_hashes_follow_the_defining_file(self):
+        hashes = get_entry_hashes(self.paths, ["Talk", "Other"], self.cache_path)
+
+        with open(self.paths[1], 'a', encoding='utf-8') as f:
+            f.write("\n@book{Added, title={New}}\n")
+        changed = get_entry_hashes(self.paths, ["Talk", "Other"], self.cache_path)
+
+        self.assertEqual(hashes, changed)
+        with open(self.paths[1], 'w', encoding='utf-8') as f:
+            f.write(GROUP_BIBLIOGRAPHY.replace("Grace", "G."))
+        self.assertNotEqual(get_entry_hashes(self.paths, ["Talk"], self.cache_path)["Talk"], hashes["Talk"])
+
+    def test_key_index_is_persisted_and_refreshed_per_file(self):
+        get_bibliography_index(self.paths, self.cache_path)
+        key_index = BibliographyKeyIndex(os.path.join(self.cache_path, "bibliography-keys.json"))
+
+        with patch('pelican.plugins.citation_processor.bibliography.scan_bibtex_file') as mock_scan:
+            key_index.scan(self.paths[0])
+            mock_scan.assert_not_called()
+
+            with open(self.paths[1], 'a', encoding='utf-8') as f:
+                f.write("\n@book{Added, title={New}}\n")
+            key_index.scan(self.paths[0])
+            key_index.scan(self.paths[1])
+
+        mock_scan.assert_called_once_with(self.paths[1])
+
+    def test_build_context_reports_duplicates_and_unsupported_lists(self):
+        with open(os.path.join(self.temp_dir.name, "style.csl"), 'w') as f:
+            f.write("")
+        with open(os.path.join(self.temp_dir.name, "refs.json"), 'w') as f:
+            f.write("[]")
+        context = BuildContext({'PATH': self.temp_dir.name, 'CITATION_CACHE_PATH': self.cache_path})
+
+        with self.assertLogs('pelican.plugins.citation_processor.context', level='WARNING') as logs:
+            style_path, bibliography_path, error = context.check("style.csl", "refs.bib, group.bib")
+            context.check("style.csl", ["refs.bib", "group.bib"])
+
+        self.assertIsNone(error)
+        self.assertEqual(bibliography_path, self.paths)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn(f"Other: {self.paths[0]}, {self.paths[1]}", logs.records[0].getMessage())
+        self.assertIn("only BibTeX", context.check("style.csl", "refs.bib, refs.json")[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
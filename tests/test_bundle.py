@@ -0,0 +1,186 @@
+"""
+Tests for portable citation cache bundles in the Pelican Citation Processor plugin.
+"""
+
+import os
+import tarfile
+import tempfile
+import unittest
+from unittest.mock import patch
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.bundle import (
+    BundleError,
+    BundleStore,
+    export_bundle,
+    import_bundle,
+    merge_bundles,
+    read_manifest,
+)
+from pelican.plugins.citation_processor.cache import CitationCache, cache_key
+from pelican.plugins.citation_processor.cli import main
+from pelican.plugins.citation_processor.dependencies import DependencyIndex
+from tests.test_utils import fake_pandoc, patch_pandoc_version, reset_plugin_state, write_files
+
+
+class TestBundles(unittest.TestCase):
+    """Test cases for exporting, importing and merging cache bundles."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.content_path = self._make_content("content")
+
+    def _make_content(self, name):
+        content_path = os.path.join(self.temp_dir.name, name)
+        os.makedirs(content_path)
+        for filename in ("a.md", "b.md", "refs.bib", "style.csl"):
+            with open(os.path.join(content_path, filename), 'w') as f:
+                f.write(filename)
+        return content_path
+
+    def _make_cache(self, name, content_path, articles, renderer="pandoc 3.1.11"):
+        cache_path = os.path.join(self.temp_dir.name, name)
+        citation_cache = CitationCache(cache_path)
+        dependency_index = DependencyIndex(os.path.join(cache_path, 'dependencies.json'))
+        for filename, html in articles.items():
+            key = cache_key(filename, html, renderer)
+            citation_cache.put(key, html)
+            dependency_index.record(
+                os.path.join(content_path, filename), cache_key(filename),
+                os.path.join(content_path, "style.csl"), "style",
+                os.path.join(content_path, "refs.bib"), {'key': "entry"},
+                cache_key=key, renderer=renderer
+            )
+        return citation_cache, dependency_index
+
+    def _bundle(self, name):
+        return os.path.join(self.temp_dir.name, "bundles", name + ".tar.gz")
+
+    def test_export_import_round_trip_between_checkouts(self):
+        citation_cache, dependency_index = self._make_cache("cache", self.content_path, {"a.md": "<p>A</p>"})
+        manifest = export_bundle(self._bundle("main"), citation_cache, dependency_index, self.content_path)
+
+        other_content = self._make_content("checkout")
+        other_cache, other_index = self._make_cache("other-cache", other_content, {})
+        stats = import_bundle(self._bundle("main"), other_cache, other_index, other_content, "pandoc 3.1.11")
+
+        key = manifest['articles']['a.md']['key']
+        self.assertEqual(manifest['pandoc_version'], "pandoc 3.1.11")
+        self.assertEqual(manifest['articles']['a.md']['style'], "style.csl")
+        self.assertEqual(stats, {'imported': 1, 'existing': 0, 'stale': 0, 'invalid': 0})
+        self.assertEqual(other_cache.get(key), "<p>A</p>")
+        record = DependencyIndex(other_index.path).articles[os.path.join(other_content, "a.md")]
+        self.assertEqual(record['bibliography'], os.path.join(other_content, "refs.bib"))
+        self.assertEqual(other_index.record(
+            os.path.join(other_content, "a.md"), cache_key("a.md"),
+            os.path.join(other_content, "style.csl"), "style",
+            os.path.join(other_content, "refs.bib"), {'key': "entry"}
+        ), [])
+
+    def test_import_skips_other_pandoc_versions_and_corrupt_entries(self):
+        citation_cache, dependency_index = self._make_cache("cache", self.content_path, {"a.md": "<p>A</p>"})
+        export_bundle(self._bundle("old"), citation_cache, dependency_index, self.content_path)
+        other_cache, other_index = self._make_cache("other-cache", self.content_path, {})
+
+        stats = import_bundle(self._bundle("old"), other_cache, other_index, self.content_path, "pandoc 3.2")
+
+        self.assertEqual(stats['stale'], 1)
+        self.assertEqual(other_cache.stats()['size'], 0)
+
+        manifest = read_manifest(self._bundle("old"))
+        key = next(iter(manifest['entries']))
+        manifest['entries'][key]['sha256'] = "0" * 64
+        with patch('pelican.plugins.citation_processor.bundle.read_manifest', return_value=manifest):
+            stats = import_bundle(self._bundle("old"), other_cache, other_index, self.content_path)
+
+        self.assertEqual(stats['invalid'], 1)
+        self.assertIsNone(other_cache.get(key))
+
+    def test_merge_deduplicates_and_drops_stale_entries(self):
+        old = self._make_cache("old", self.content_path, {"b.md": "<p>old B</p>"}, renderer="pandoc 3.0")
+        export_bundle(self._bundle("old"), *old, self.content_path)
+        shard_one = self._make_cache("shard-1", self.content_path, {"a.md": "<p>A</p>"})
+        export_bundle(self._bundle("shard-1"), *shard_one, self.content_path)
+        shard_two = self._make_cache("shard-2", self.content_path, {"a.md": "<p>A</p>", "b.md": "<p>B</p>"})
+        export_bundle(self._bundle("shard-2"), *shard_two, self.content_path)
+
+        stats = merge_bundles(self._bundle("main"), [self._bundle(name) for name in ("old", "shard-1", "shard-2")])
+
+        manifest = read_manifest(self._bundle("main"))
+        self.assertEqual(stats, {'bundles': 3, 'entries': 2, 'duplicates': 1, 'stale': 1})
+        self.assertEqual(sorted(manifest['articles']), ["a.md", "b.md"])
+        self.assertEqual(manifest['pandoc_version'], "pandoc 3.1.11")
+        with tarfile.open(self._bundle("main"), 'r:gz') as archive:
+            self.assertEqual(len(archive.getnames()), 3)
+
+    def test_store_resolves_names(self):
+        store = BundleStore(os.path.join(self.temp_dir.name, "bundles"))
+        citation_cache, dependency_index = self._make_cache("cache", self.content_path, {"a.md": "<p>A</p>"})
+
+        self.assertIsNone(store.get("main"))
+        export_bundle(store.bundle_path("main"), citation_cache, dependency_index, self.content_path)
+
+        self.assertEqual(store.names(), ["main"])
+        self.assertEqual(store.get("main"), self._bundle("main"))
+        with self.assertRaises(BundleError):
+            store.bundle_path("../main")
+
+
+class TestBundleCommand(unittest.TestCase):
+    """Test cases for sharing bundles between sharded prerender runs."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        patch_pandoc_version(self, ('context', 'renderers'))
+        self.content_path = os.path.join(self.temp_dir.name, "content")
+        self.store_path = os.path.join(self.temp_dir.name, "store")
+        os.makedirs(self.content_path)
+        files = [("refs.bib", "@book{key,}"), ("style.csl", "<style/>")]
+        files += [(f"a{i}.md", f"Title: A{i}\n\nText {i} [@key].") for i in range(6)]
+        write_files(self.content_path, files)
+
+    def _settings(self, name):
+        path = os.path.join(self.temp_dir.name, name + ".py")
+        with open(path, 'w') as f:
+            f.write(
+                f"PATH = {self.content_path!r}\n"
+                "CITATION_STYLE = 'style.csl'\n"
+                "BIBLIOGRAPHY_FILE = 'refs.bib'\n"
+                "TIMEZONE = 'UTC'\n"
+                f"CITATION_CACHE_PATH = {os.path.join(self.temp_dir.name, name + '-cache')!r}\n"
+            )
+        return path
+
+    def _main(self, *argv):
+        citation_processor.clear_warm_state()
+        return main(list(argv) + ["--store", self.store_path])
+
+    @patch('subprocess.run')
+    def test_shards_merge_into_a_seed_for_the_next_build(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+
+        with patch('builtins.print'):
+            self.assertEqual(self._main(self._settings("shard-1"), "--shard", "1/2", "--export", "shard-1"), 0)
+            self.assertEqual(self._main(self._settings("shard-2"), "--shard", "2/2", "--export", "shard-2"), 0)
+            self.assertEqual(self._main("--import", "shard-1", "--import", "shard-2", "--merge", "main"), 0)
+            rendered = mock_run.call_count
+
+            with open(os.path.join(self.content_path, "a0.md"), 'a') as f:
+                f.write(" Edited.")
+            self.assertEqual(self._main(self._settings("ci"), "--import", "main", "--import", "missing", "--stats"), 0)
+
+        self.assertEqual(rendered, 6)
+        self.assertEqual(mock_run.call_count, 7)
+        self.assertEqual(len(read_manifest(os.path.join(self.store_path, "main.tar.gz"))['entries']), 6)
+
+    def test_merge_without_bundles_fails(self):
+        with patch('builtins.print'):
+            self.assertEqual(self._main("--merge", "main"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
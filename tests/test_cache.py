@@ -0,0 +1,99 @@
+"""
+Tests for the on-disk citation cache in the Pelican Citation Processor plugin.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.cache import CitationCache, cache_key
+from pelican.plugins.citation_processor.citation_processor import process_citations
+from tests.test_utils import make_content, make_settings, reset_plugin_state, write_files
+
+
+class TestCitationCache(unittest.TestCase):
+    """Test cases for the CitationCache store."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_cache_key_depends_on_every_part(self):
+        base = cache_key("source", "bib", "csl", "pandoc 3.1")
+
+        self.assertEqual(base, cache_key("source", "bib", "csl", "pandoc 3.1"))
+        self.assertNotEqual(base, cache_key("source!", "bib", "csl", "pandoc 3.1"))
+        self.assertNotEqual(base, cache_key("source", "bib", "csl", "pandoc 3.2"))
+        self.assertNotEqual(cache_key("ab", "c"), cache_key("a", "bc"))
+
+    def test_cache_get_put_counts_hits_and_misses(self):
+        cache = CitationCache(self.temp_dir.name)
+
+        self.assertIsNone(cache.get("abc123"))
+        cache.put("abc123", "<p>cached</p>")
+
+        self.assertEqual(cache.get("abc123"), "<p>cached</p>")
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_cache_persists_between_instances(self):
+        CitationCache(self.temp_dir.name).put("abc123", "<p>cached</p>")
+
+        cache = CitationCache(self.temp_dir.name)
+
+        self.assertEqual(cache.get("abc123"), "<p>cached</p>")
+        self.assertEqual(cache.stats()['size'], len("<p>cached</p>"))
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = CitationCache(self.temp_dir.name, max_size=25)
+        cache.put("aa01", "x" * 10)
+        os.utime(cache.entry_path("aa01"), (1, 1))
+        cache.put("bb02", "y" * 10)
+        cache.put("cc03", "z" * 10)
+
+        self.assertIsNone(cache.get("aa01"))
+        self.assertEqual(cache.get("cc03"), "z" * 10)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertLessEqual(cache.stats()['size'], 25)
+
+
+class TestProcessCitationsCache(unittest.TestCase):
+    """Test cases for cache lookups in process_citations."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        write_files(self.temp_dir.name, [("refs.bib", "@book{key,}"), ("style.csl", "<style/>")])
+        self.article_generator = Mock()
+        self.settings = make_settings(self.temp_dir.name, CITATION_CACHE_PATH=os.path.join(self.temp_dir.name, "cache"))
+        self.article_generator.settings = self.settings
+        self.content = make_content(self.temp_dir.name, "article.md")
+
+    def _run_pandoc(self, cmd, **kwargs):
+        return Mock(returncode=0, stdout="<p>rendered</p>")
+
+    @patch('pelican.plugins.citation_processor.renderers.get_pandoc_version')
+    @patch('subprocess.run')
+    def test_process_citations_cache_hit_skips_pandoc(self, mock_run, mock_version):
+        mock_version.return_value = "pandoc 3.1"
+        mock_run.side_effect = self._run_pandoc
+
+        self.content._content = "<p>original</p>"
+        process_citations(self.article_generator, self.content)
+        self.content._content = "<p>original</p>"
+        citation_processor._rendered_citations.clear()
+        process_citations(self.article_generator, self.content)
+
+        self.assertEqual(self.content._content, "<p>rendered</p>")
+        mock_run.assert_called_once()
+        cache = citation_processor.get_citation_cache(self.settings)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
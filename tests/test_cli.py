@@ -0,0 +1,104 @@
+"""
+Tests for the pelican-citations command line interface.
+"""
+
+import argparse
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from pelican.plugins.citation_processor.cli import find_sources, main, parse_shard
+from tests.test_utils import fake_pandoc, patch_pandoc_version, reset_plugin_state, write_files
+
+
+class TestShards(unittest.TestCase):
+    """Test cases for splitting the content tree into shards."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        os.makedirs(os.path.join(self.temp_dir.name, "pages"))
+        os.makedirs(os.path.join(self.temp_dir.name, ".hidden"))
+        for name in ["pages/about.md", ".hidden/draft.md", "notes.txt", "post.markdown"] + [f"a{i}.md" for i in range(20)]:
+            with open(os.path.join(self.temp_dir.name, name), 'w') as f:
+                f.write("Text [@key].")
+        self.settings = {'PATH': self.temp_dir.name, 'IGNORE_FILES': ['.*']}
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/3"), (2, 3))
+        for value in ("0/3", "4/3", "1", "a/b"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    def test_find_sources_skips_ignored_and_non_markdown_files(self):
+        sources = find_sources(self.settings)
+
+        self.assertIn(os.path.join("pages", "about.md"), sources)
+        self.assertIn("post.markdown", sources)
+        self.assertNotIn("notes.txt", sources)
+        self.assertFalse(any(source.startswith(".hidden") for source in sources))
+
+    def test_shards_partition_the_sources(self):
+        shards = [find_sources(self.settings, (index, 3)) for index in range(1, 4)]
+
+        self.assertEqual(sorted(sum(shards, [])), sorted(find_sources(self.settings)))
+        self.assertEqual(len(set(sum(shards, []))), len(find_sources(self.settings)))
+        self.assertTrue(all(shards))
+
+
+class TestMain(unittest.TestCase):
+    """Test cases for prerendering a site into the citation cache."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        patch_pandoc_version(self, ('context', 'renderers'))
+        self.content_path = os.path.join(self.temp_dir.name, "content")
+        self.cache_path = os.path.join(self.temp_dir.name, "cache")
+        os.makedirs(self.content_path)
+        write_files(self.content_path, [
+            ("refs.bib", "@book{key,}"),
+            ("style.csl", "<style/>"),
+            ("cited.md", "Title: Cited\n\nText [@key]."),
+            ("plain.md", "Title: Plain\n\nNo citations.")
+        ])
+        self.settings_path = os.path.join(self.temp_dir.name, "pelicanconf.py")
+        self._write_settings(f"CITATION_CACHE_PATH = {self.cache_path!r}\n")
+
+    def _write_settings(self, extra=""):
+        with open(self.settings_path, 'w') as f:
+            f.write(
+                f"PATH = {self.content_path!r}\n"
+                "CITATION_STYLE = 'style.csl'\n"
+                "BIBLIOGRAPHY_FILE = 'refs.bib'\n"
+                "TIMEZONE = 'UTC'\n"
+                + extra
+            )
+
+    @patch('subprocess.run')
+    def test_main_warms_the_cache(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+
+        with patch('builtins.print') as mock_print:
+            self.assertEqual(main([self.settings_path, "--jobs", "2", "--stats"]), 0)
+            self.assertEqual(main([self.settings_path]), 0)
+
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertEqual(mock_run.call_args.kwargs['input'], "Text [@key].")
+        self.assertIn("1 rendered", mock_print.call_args_list[0].args[0])
+        self.assertTrue(os.listdir(self.cache_path))
+
+    def test_main_requires_a_cache_path(self):
+        self._write_settings()
+
+        with patch('builtins.print') as mock_print:
+            self.assertEqual(main([self.settings_path]), 2)
+
+        self.assertIn("CITATION_CACHE_PATH", mock_print.call_args.args[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
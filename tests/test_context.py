@@ -0,0 +1,152 @@
+"""
+Tests for the build context in the Pelican Citation Processor plugin.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.citation_processor import (
+    initialize_build_context,
+    process_generator_citations,
+)
+from pelican.plugins.citation_processor.context import BuildContext, parse_pandoc_version
+from tests.test_utils import fake_pandoc, make_content, make_settings, patch_pandoc_version, reset_plugin_state, write_files
+
+
+LOGGER = 'pelican.plugins.citation_processor.context'
+
+
+class TestBuildContext(unittest.TestCase):
+    """Test cases for resolving and validating citation configuration once per build."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        write_files(self.temp_dir.name, [("refs.bib", ""), ("style.csl", "")])
+        self.settings = {'PATH': self.temp_dir.name, 'CITATION_RENDERER': "pandoc"}
+        self.context = BuildContext(self.settings)
+
+    def test_parse_pandoc_version(self):
+        self.assertEqual(parse_pandoc_version("pandoc 3.1.11\nFeatures: +server"), (3, 1, 11))
+        self.assertEqual(parse_pandoc_version("pandoc.exe 2.9"), (2, 9))
+        self.assertIsNone(parse_pandoc_version("not pandoc"))
+
+    def test_resolve_is_memoized(self):
+        with patch('os.path.exists', wraps=os.path.exists) as mock_exists:
+            first = self.context.check("style.csl", "refs.bib", "a.md")
+            calls = mock_exists.call_count
+            second = self.context.check("style.csl", "refs.bib", "b.md")
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[0], os.path.join(self.temp_dir.name, "style.csl"))
+        self.assertIsNone(first[2])
+        self.assertEqual(mock_exists.call_count, calls)
+
+    def test_errors_are_grouped_and_reported_once(self):
+        self.context.check("style.csl", "missing.bib", "a.md")
+        self.context.check("style.csl", "missing.bib", "b.md")
+        self.context.check("missing.csl", "refs.bib", "c.md")
+
+        with self.assertLogs(LOGGER, level='ERROR') as logs:
+            self.context.report()
+            self.context.report()
+
+        self.assertEqual(len(logs.records), 1)
+        message = logs.records[0].getMessage()
+        self.assertIn("missing.bib (used by 2 documents: a.md, b.md)", message)
+        self.assertIn("Citation style file not found", message)
+
+    @patch('pelican.plugins.citation_processor.context.get_pandoc_version')
+    def test_probe_runs_pandoc_once(self, mock_version):
+        mock_version.return_value = "pandoc 2.10"
+
+        self.context.probe()
+        self.context.probe()
+
+        mock_version.assert_called_once()
+        self.assertIn("does not support --citeproc", self.context.check("style.csl", "refs.bib")[2])
+        self.assertFalse(self.context.supports_batch())
+
+    @patch('pelican.plugins.citation_processor.context.get_pandoc_version')
+    def test_probe_skipped_for_citeproc_py(self, mock_version):
+        self.settings['CITATION_RENDERER'] = "citeproc-py"
+
+        self.context.probe()
+
+        mock_version.assert_not_called()
+
+
+class TestPreflight(unittest.TestCase):
+    """Test cases for reporting configuration errors before rendering."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        self.mock_version, = patch_pandoc_version(self)
+        write_files(self.temp_dir.name, [("refs.bib", ""), ("style.csl", "")])
+        self.settings = make_settings(self.temp_dir.name)
+        self.article_generator = Mock(spec=['settings', 'articles'])
+        self.article_generator.settings = self.settings
+        self.article_generator.articles = [
+            make_content(self.temp_dir.name, "good.md"),
+            make_content(self.temp_dir.name, "bad-bib.md", bibliography_file="missing.bib"),
+            make_content(self.temp_dir.name, "bad-style.md", citation_style="missing.csl"),
+        ]
+
+    @patch('subprocess.run')
+    def test_errors_are_reported_before_rendering(self, mock_run):
+        order = []
+        mock_run.side_effect = lambda cmd, **kwargs: order.append('render') or fake_pandoc(cmd, **kwargs)
+
+        with patch.object(citation_processor.BuildContext, 'report', autospec=True,
+                          side_effect=lambda context: order.append(sorted(context.errors))):
+            process_generator_citations(self.article_generator)
+
+        self.assertEqual(len(order[0]), 2)
+        self.assertEqual(order[1:], ['render'])
+        self.assertEqual(self.article_generator.articles[0]._content, "<p>Text [@key].</p>")
+        self.assertEqual(self.article_generator.articles[1]._content, "<p>original</p>")
+
+    @patch('subprocess.run')
+    def test_missing_pandoc_skips_rendering(self, mock_run):
+        self.mock_version.side_effect = FileNotFoundError("pandoc")
+
+        with self.assertLogs(LOGGER, level='ERROR') as logs:
+            process_generator_citations(self.article_generator)
+
+        mock_run.assert_not_called()
+        self.assertIn("Pandoc not found", logs.records[0].getMessage())
+
+    @patch('subprocess.run')
+    def test_old_pandoc_renders_batch_mode_in_parallel(self, mock_run):
+        self.mock_version.return_value = "pandoc 2.18"
+        self.settings.CITATION_EXECUTION_MODE = "batch"
+        self.settings.CITATION_WORKERS = 2
+        self.article_generator.articles = [make_content(self.temp_dir.name, f"article-{i}.md") for i in range(3)]
+        mock_run.side_effect = fake_pandoc
+
+        with self.assertLogs(LOGGER, level='ERROR') as logs:
+            process_generator_citations(self.article_generator)
+
+        self.assertIn("Batch mode needs Pandoc 2.19.1", logs.records[0].getMessage())
+        self.assertEqual(mock_run.call_count, 3)
+        for call in mock_run.call_args_list:
+            self.assertNotIn('--lua-filter', call.args[0])
+
+    def test_initialize_checks_global_configuration(self):
+        self.settings.BIBLIOGRAPHY_FILE = "missing.bib"
+
+        with self.assertLogs(LOGGER, level='ERROR') as logs:
+            initialize_build_context(Mock(settings=self.settings))
+
+        self.mock_version.assert_called_once()
+        self.assertIn("Bibliography file not found", logs.records[0].getMessage())
+
+
+if __name__ == '__main__':
+    unittest.main()
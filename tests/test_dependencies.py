@@ -0,0 +1,112 @@
+"""
+Tests for the incremental rebuild index in the Pelican Citation Processor plugin.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.citation_processor import process_citations
+from pelican.plugins.citation_processor.dependencies import DependencyIndex
+from tests.test_utils import make_content, make_settings, reset_plugin_state, write_files
+
+
+class TestDependencyIndex(unittest.TestCase):
+    """Test cases for the DependencyIndex store."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "dependencies.json")
+
+    def test_record_reports_new_and_unchanged_articles(self):
+        index = DependencyIndex(self.path)
+
+        self.assertEqual(index.record("a.md", "s1", "style.csl", "c1", "refs.bib", {"A": "1"}), ["new article"])
+        index.save()
+
+        index = DependencyIndex(self.path)
+        self.assertEqual(index.record("a.md", "s1", "style.csl", "c1", "refs.bib", {"A": "1"}), [])
+        self.assertEqual(index.invalidated, {})
+
+    def test_record_reports_changed_entries_and_styles(self):
+        index = DependencyIndex(self.path)
+        index.record("a.md", "s1", "style.csl", "c1", "refs.bib", {"A": "1", "B": "1"})
+        index.record("b.md", "s2", "style.csl", "c1", "refs.bib", {"B": "1"})
+
+        reasons = index.record("a.md", "s1", "style.csl", "c2", "refs.bib", {"A": "2", "B": "1"})
+
+        self.assertEqual(reasons, ["citation style style.csl edited", "bibliography entries changed: A"])
+        self.assertEqual(index.changed_entries, {"A": {"a.md"}})
+        self.assertEqual(index.changed_styles, {"style.csl": {"a.md"}})
+
+    def test_save_persists_citation_key_index(self):
+        index = DependencyIndex(self.path)
+        index.record("a.md", "s1", "style.csl", "c1", "refs.bib", {"A": "1", "B": "1"})
+        index.record("b.md", "s2", "style.csl", "c1", "refs.bib", {"B": "1"})
+
+        index.save()
+
+        self.assertEqual(DependencyIndex(self.path).citations(), {"A": ["a.md"], "B": ["a.md", "b.md"]})
+
+
+class TestIncrementalRebuild(unittest.TestCase):
+    """Test cases for re-rendering only articles whose cited entries changed."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        write_files(self.temp_dir.name, [
+            ("refs.bib", "@book{A, title={First}}\n\n@book{B, title={Second}}\n"),
+            ("style.csl", "<style/>")
+        ])
+        self.settings = make_settings(self.temp_dir.name, CITATION_CACHE_PATH=os.path.join(self.temp_dir.name, "cache"))
+        self.article_generator = Mock()
+        self.article_generator.settings = self.settings
+        self.contents = [
+            make_content(self.temp_dir.name, "a.md", "Cites [@A]."),
+            make_content(self.temp_dir.name, "b.md", "Cites [@B].")
+        ]
+
+    def _build(self):
+        for content in self.contents:
+            content._content = "<p>original</p>"
+            process_citations(self.article_generator, content)
+        citation_processor.report_citation_stats(Mock(settings=self.settings))
+
+    def _run_pandoc(self, cmd, **kwargs):
+        return Mock(returncode=0, stdout="<p>rendered</p>")
+
+    @patch('pelican.plugins.citation_processor.renderers.get_pandoc_version')
+    @patch('subprocess.run')
+    def test_bibliography_edit_rerenders_only_citing_articles(self, mock_run, mock_version):
+        mock_version.return_value = "pandoc 3.1"
+        mock_run.side_effect = self._run_pandoc
+        self._build()
+        self.assertEqual(mock_run.call_count, 2)
+
+        write_files(self.temp_dir.name, [("refs.bib", "@book{A, title={First}}\n\n@book{B, title={Second edition}}\n")])
+        dependency_index = citation_processor.get_dependency_index(self.settings)
+        for content in self.contents:
+            process_citations(self.article_generator, content)
+
+        self.assertEqual(mock_run.call_count, 3)
+        self.assertEqual(
+            dependency_index.invalidated,
+            {self.contents[1].source_path: ["bibliography entries changed: B"]}
+        )
+        self.assertEqual(dependency_index.changed_entries, {"B": {self.contents[1].source_path}})
+
+        with patch('builtins.print') as mock_print:
+            citation_processor.report_citation_dependencies(dependency_index)
+        report = '\n'.join(call.args[0] for call in mock_print.call_args_list)
+        self.assertIn("Citation dependencies: 1 of 2 articles invalidated", report)
+        self.assertIn("Bibliography entry B changed: 1 articles invalidated", report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Tests for the circuit breaker and negative cache in the Pelican Citation Processor plugin.
+"""
+
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.citation_processor import process_generator_citations, report_citation_stats
+from pelican.plugins.citation_processor.failures import NegativeCache, classify_failure
+from tests.test_utils import fake_pandoc, make_content, make_settings, patch_pandoc_version, reset_plugin_state, write_files
+
+
+LOGGER = 'pelican.plugins.citation_processor.failures'
+
+
+def failing_pandoc(returncode, stderr):
+    def run(cmd, **kwargs):
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+    return run
+
+
+class TestClassifyFailure(unittest.TestCase):
+    """Test cases for telling configuration failures from document failures."""
+
+    def test_classify_failure(self):
+        missing = FileNotFoundError(2, "No such file or directory", "pandoc")
+        self.assertEqual(classify_failure(missing)[0], 'global')
+        bibliography = subprocess.CalledProcessError(25, "pandoc", stderr="Error reading bibliography file refs.bib:")
+        self.assertEqual(classify_failure(bibliography), ('config', "the bibliography could not be read: Error reading bibliography file refs.bib:"))
+        style = subprocess.CalledProcessError(4, "pandoc", stderr="CiteprocXMLError: Expected end element")
+        self.assertEqual(classify_failure(style)[0], 'config')
+        document = subprocess.CalledProcessError(64, "pandoc", stderr="\nError parsing YAML metadata")
+        self.assertEqual(classify_failure(document), ('document', "Error parsing YAML metadata"))
+        self.assertEqual(classify_failure(subprocess.TimeoutExpired("pandoc", 5)), ('document', "timed out after 5s"))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for failing fast and skipping known failures."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        patch_pandoc_version(self, ('context', 'renderers'))
+        write_files(self.temp_dir.name, [("refs.bib", "@book{key,}"), ("other.bib", "@book{key,}"), ("style.csl", "<style/>")])
+        self.settings = make_settings(
+            self.temp_dir.name,
+            CITATION_CACHE_PATH=os.path.join(self.temp_dir.name, "cache"),
+            CITATION_NEGATIVE_CACHE=True,
+            CITATION_WORKERS=2,
+            CITATION_WARM_STATE=True
+        )
+        self.article_generator = Mock(spec=['settings', 'articles'])
+        self.article_generator.settings = self.settings
+        self.article_generator.articles = [make_content(self.temp_dir.name, f"article-{i}.md", f"Text {i} [@key].") for i in range(5)]
+
+    def _build(self):
+        with self.assertLogs(LOGGER, level='WARNING') as logs:
+            process_generator_citations(self.article_generator)
+            totals = citation_processor._citation_metrics.summary()['totals']
+            report_citation_stats(Mock(settings=self.settings))
+        return totals, logs.records
+
+    @patch('subprocess.run')
+    def test_configuration_failure_trips_the_breaker(self, mock_run):
+        mock_run.side_effect = failing_pandoc(25, "Error reading bibliography file refs.bib:")
+        self.article_generator.articles.append(make_content(self.temp_dir.name, "local.md", "Text [@key].", "other.bib"))
+
+        totals, records = self._build()
+
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertEqual(totals['failed'], 6)
+        self.assertIn("Stopped rendering citations with style", records[0].getMessage())
+        summary = records[-1].getMessage()
+        self.assertIn("2 documents failed, 4 not attempted", summary)
+        self.assertIn("(4 documents not attempted)", summary)
+
+    @patch('subprocess.run')
+    def test_batch_configuration_failure_is_not_retried_per_article(self, mock_run):
+        mock_run.side_effect = failing_pandoc(4, "CiteprocXMLError: Expected end element")
+        self.settings.CITATION_EXECUTION_MODE = "batch"
+
+        totals, records = self._build()
+
+        mock_run.assert_called_once()
+        self.assertEqual(totals['failed'], 5)
+        summary = records[-1].getMessage()
+        self.assertIn("5 documents failed, 0 not attempted", summary)
+        self.assertIn("(0 documents not attempted)", summary)
+
+    @patch('subprocess.run')
+    def test_document_failures_are_not_retried_until_the_source_changes(self, mock_run):
+        def run(cmd, **kwargs):
+            if "Text 1" in kwargs['input']:
+                raise subprocess.CalledProcessError(64, cmd, stderr="Error parsing YAML metadata")
+            return fake_pandoc(cmd, **kwargs)
+        mock_run.side_effect = run
+        self._build()
+        citation_processor.clear_warm_state()
+        citation_processor._negative_caches.clear()
+
+        totals, records = self._build()
+
+        self.assertEqual(mock_run.call_count, 5)
+        self.assertEqual(totals['failed'], 1)
+        self.assertIn("1 unchanged documents skipped as known failures", records[-1].getMessage())
+        self.assertIn("Error parsing YAML metadata", records[-1].getMessage())
+
+        with open(self.article_generator.articles[1].source_path, 'w') as f:
+            f.write("Fixed [@key].")
+        process_generator_citations(self.article_generator)
+        report_citation_stats(Mock(settings=self.settings))
+
+        self.assertEqual(mock_run.call_count, 6)
+        self.assertEqual(self.article_generator.articles[1]._content, "<p>Fixed [@key].</p>")
+        self.assertEqual(NegativeCache(os.path.join(self.settings.CITATION_CACHE_PATH, "failures.json")).failures, {})
+
+    @patch('subprocess.run')
+    def test_timeouts_are_retried(self, mock_run):
+        mock_run.side_effect = subprocess.TimeoutExpired("pandoc", 5)
+        self._build()
+        citation_processor.clear_warm_state()
+
+        process_generator_citations(self.article_generator)
+
+        self.assertEqual(mock_run.call_count, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,13 +16,16 @@ class TestMarkdownProcessing(unittest.TestCase):
         self.article_generator = Mock()
         self.content = Mock()
         self.settings = Mock()
+        self.settings.CITATION_CACHE_PATH = None
+        self.settings.CITATION_PRUNE_BIBLIOGRAPHY = False
+        self.settings.CITATION_AST_CACHE = False
+        self.settings.CITATION_COMPILE_BIBLIOGRAPHY = False
         self.article_generator.settings = self.settings
 
     @patch('pelican.plugins.citation_processor.citation_processor.resolve_citation_config')
     @patch('os.path.exists')
     @patch('subprocess.run')
-    @patch('tempfile.NamedTemporaryFile')
-    def test_process_citations_success(self, mock_tempfile, mock_run, mock_exists, mock_resolve_config):
+    def test_process_citations_success(self, mock_run, mock_exists, mock_resolve_config):
         self.content._content = "# Test Article\n\nThis is a test with [@citation] reference."
         self.content.source_path = "/content/test.md"
         self.settings.CITATION_STYLE = "style.csl"
@@ -31,25 +34,15 @@ class TestMarkdownProcessing(unittest.TestCase):
         mock_exists.return_value = True
         mock_resolve_config.return_value = {'citation_style': 'style.csl', 'bibliography_file': '_bibliography.bib'}
         
-        mock_input_file = Mock()
-        mock_input_file.name = "/tmp/input.md"
-        mock_input_file.__enter__ = Mock(return_value=mock_input_file)
-        mock_input_file.__exit__ = Mock(return_value=None)
+        mock_run.return_value = Mock(returncode=0, stdout="<h1>Test Article</h1>\n<p>This is a test with <span class=\"citation\">citation</span> reference.</p>")
         
-        mock_output_file = Mock()
-        mock_output_file.name = "/tmp/output.html"
-        mock_output_file.__enter__ = Mock(return_value=mock_output_file)
-        mock_output_file.__exit__ = Mock(return_value=None)
-        
-        mock_tempfile.side_effect = [mock_input_file, mock_output_file]
-        
-        mock_run.return_value = Mock(returncode=0)
-        
-        with patch('builtins.open', mock_open(read_data="<h1>Test Article</h1>\n<p>This is a test with <span class=\"citation\">citation</span> reference.</p>")):
+        with patch('builtins.open', mock_open(read_data="# Test Article\n\nThis is a test with [@citation] reference.")):
             process_citations(self.article_generator, self.content)
         
         self.assertEqual(self.content._content, "<h1>Test Article</h1>\n<p>This is a test with <span class=\"citation\">citation</span> reference.</p>")
         mock_run.assert_called_once()
+        self.assertEqual(mock_run.call_args.kwargs['input'], "# Test Article\n\nThis is a test with [@citation] reference.")
+        self.assertNotIn('--output', mock_run.call_args.args[0])
 
     def test_process_citations_no_content(self):
         self.content._content = None
@@ -60,8 +53,7 @@ class TestMarkdownProcessing(unittest.TestCase):
     @patch('pelican.plugins.citation_processor.citation_processor.resolve_citation_config')
     @patch('os.path.exists')
     @patch('subprocess.run')
-    @patch('tempfile.NamedTemporaryFile')
-    def test_process_citations_pandoc_error(self, mock_tempfile, mock_run, mock_exists, mock_resolve_config):
+    def test_process_citations_pandoc_error(self, mock_run, mock_exists, mock_resolve_config):
         self.content._content = "# Test Article\n\nThis is a test with [@citation] reference."
         self.content.source_path = "/content/test.md"
         self.settings.CITATION_STYLE = "style.csl"
@@ -70,24 +62,15 @@ class TestMarkdownProcessing(unittest.TestCase):
         mock_exists.return_value = True
         mock_resolve_config.return_value = {'citation_style': 'style.csl', 'bibliography_file': '_bibliography.bib'}
         
-        mock_input_file = Mock()
-        mock_input_file.name = "/tmp/input.md"
-        mock_input_file.__enter__ = Mock(return_value=mock_input_file)
-        mock_input_file.__exit__ = Mock(return_value=None)
-        
-        mock_output_file = Mock()
-        mock_output_file.name = "/tmp/output.html"
-        mock_output_file.__enter__ = Mock(return_value=mock_output_file)
-        mock_output_file.__exit__ = Mock(return_value=None)
-        
-        mock_tempfile.side_effect = [mock_input_file, mock_output_file]
-        
         mock_run.side_effect = subprocess.CalledProcessError(1, "pandoc", stderr="Error")
         
-        with patch('builtins.print') as mock_print:
-            process_citations(self.article_generator, self.content)
+        with patch('builtins.open', mock_open(read_data="# Test Article\n\nThis is a test with [@citation] reference.")):
+            with patch('builtins.print') as mock_print:
+                process_citations(self.article_generator, self.content)
         
         mock_print.assert_called()
+        mock_run.assert_called_once()
+        self.assertEqual(self.content._content, "# Test Article\n\nThis is a test with [@citation] reference.")
 
     @patch('pelican.plugins.citation_processor.citation_processor.resolve_citation_config')
     @patch('os.path.exists')
@@ -108,8 +91,7 @@ class TestMarkdownProcessing(unittest.TestCase):
     @patch('pelican.plugins.citation_processor.citation_processor.resolve_citation_config')
     @patch('os.path.exists')
     @patch('subprocess.run')
-    @patch('tempfile.NamedTemporaryFile')
-    def test_process_citations_debug_logging(self, mock_tempfile, mock_run, mock_exists, mock_resolve_config):
+    def test_process_citations_debug_logging(self, mock_run, mock_exists, mock_resolve_config):
         self.content._content = "# Test Article\n\nThis is a test with [@citation] reference."
         self.content.source_path = "/content/test.md"
         self.settings.CITATION_STYLE = "style.csl"
@@ -119,26 +101,30 @@ class TestMarkdownProcessing(unittest.TestCase):
         mock_exists.return_value = True
         mock_resolve_config.return_value = {'citation_style': 'style.csl', 'bibliography_file': '_bibliography.bib'}
         
-        mock_input_file = Mock()
-        mock_input_file.name = "/tmp/input.md"
-        mock_input_file.__enter__ = Mock(return_value=mock_input_file)
-        mock_input_file.__exit__ = Mock(return_value=None)
-        
-        mock_output_file = Mock()
-        mock_output_file.name = "/tmp/output.html"
-        mock_output_file.__enter__ = Mock(return_value=mock_output_file)
-        mock_output_file.__exit__ = Mock(return_value=None)
-        
-        mock_tempfile.side_effect = [mock_input_file, mock_output_file]
+        mock_run.return_value = Mock(returncode=0, stdout="<h1>Test Article</h1>\n<p>Processed content</p>")
         
-        mock_run.return_value = Mock(returncode=0)
-        
-        with patch('builtins.open', mock_open(read_data="<h1>Test Article</h1>\n<p>Processed content</p>")):
+        with patch('builtins.open', mock_open(read_data="# Test Article\n\nThis is a test with [@citation] reference.")):
             with patch('builtins.print') as mock_print:
                 process_citations(self.article_generator, self.content)
         
         mock_print.assert_called()
 
+    @patch('pelican.plugins.citation_processor.citation_processor.resolve_citation_config')
+    @patch('os.path.exists')
+    @patch('subprocess.run')
+    def test_process_citations_skips_source_without_citations(self, mock_run, mock_exists, mock_resolve_config):
+        self.content._content = "<p>Contact me at someone@example.com or \\@handle.</p>"
+        self.content.source_path = "/content/test.md"
+        self.settings.get.return_value = "/content"
+        mock_exists.return_value = True
+        mock_resolve_config.return_value = {'citation_style': 'style.csl', 'bibliography_file': '_bibliography.bib'}
+
+        with patch('builtins.open', mock_open(read_data="Contact me at someone@example.com or \\@handle.\n\n`@code`")):
+            process_citations(self.article_generator, self.content)
+
+        mock_run.assert_not_called()
+        self.assertEqual(self.content._content, "<p>Contact me at someone@example.com or \\@handle.</p>")
+
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+Tests for the site-wide citation cluster memo in the Pelican Citation Processor plugin.
+"""
+
+import os
+import re
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.renderers import PandocRenderer
+from tests.test_utils import reset_plugin_state
+
+
+CLUSTER_PATTERN = re.compile(r'::: \{#citation-cluster-(?P<index>\d+)\}\n(?P<text>.*?)\n:::')
+KEY_PATTERN = re.compile(r'@\{?(?P<key>\w+)')
+
+
+def fake_pandoc(cmd, **kwargs):
+    document = kwargs['input']
+    keys = sorted(set(KEY_PATTERN.findall(document)))
+    output = ''.join(
+        f'<div id="citation-cluster-{match.group("index")}">\n<p>{match.group("text").upper()}</p>\n</div>\n'
+        for match in CLUSTER_PATTERN.finditer(document)
+    )
+    output += '<div id="refs" class="references csl-bib-body" role="list">\n'
+    output += ''.join(f'<div id="ref-{key}" class="csl-entry" role="listitem">\n{key} entry\n</div>\n' for key in keys)
+    return Mock(returncode=0, stdout=output + '</div>\n')
+
+
+def fake_numeric_pandoc(cmd, **kwargs):
+    numbers = {}
+    output = ''
+    for match in CLUSTER_PATTERN.finditer(kwargs['input']):
+        keys = KEY_PATTERN.findall(match.group("text"))
+        cited = ','.join(str(numbers.setdefault(key, len(numbers) + 1)) for key in keys)
+        output += f'<div id="citation-cluster-{match.group("index")}">\n<p>[{cited}]</p>\n</div>\n'
+    return Mock(returncode=0, stdout=output)
+
+
+class TestClusterMemo(unittest.TestCase):
+    """Test cases for reusing rendered citation clusters across articles."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.bibliography_path = self._write("refs.bib", (
+            "@book{a, author = {Smith, Jane}, title = {A}}\n"
+            "@book{b, author = {Jones, Bob}, title = {B}}\n"
+            "@book{c, author = {Smith, John}, title = {C}}\n"
+        ))
+        self.style_path = self._write("style.csl", '<style class="in-text"/>')
+        self.settings = {'DEBUG': False, 'CITATION_RENDER_SCOPE': "citations"}
+        self.renderer = PandocRenderer()
+        version_patcher = patch('pelican.plugins.citation_processor.renderers.get_pandoc_version')
+        version_patcher.start().return_value = "pandoc 3.1"
+        self.addCleanup(version_patcher.stop)
+
+    def _write(self, name, text):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def _render(self, html):
+        job = {
+            'source': "",
+            'html': html,
+            'citation_style_path': self.style_path,
+            'bibliography_path': self.bibliography_path
+        }
+        return self.renderer.render(self.settings, job, self.bibliography_path)
+
+    @patch('subprocess.run')
+    def test_identical_articles_render_once(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+
+        first = self._render("<p>See [@a, p. 12].</p>")
+        second = self._render("<p>Also [@a, p. 12].</p>")
+
+        mock_run.assert_called_once()
+        self.assertEqual(second, first.replace("See", "Also"))
+        stats = self.renderer.memo.stats()
+        self.assertEqual((stats['cluster_hits'], stats['cluster_misses']), (1, 1))
+        self.assertEqual((stats['entry_hits'], stats['entry_misses']), (1, 1))
+        self.assertEqual(stats['cluster_hit_rate'], 0.5)
+
+    @patch('subprocess.run')
+    def test_hit_rates_are_printed_at_the_end_of_the_build(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        reset_plugin_state(self)
+        citation_processor._renderers['pandoc'] = self.renderer
+        self._render("<p>See [@a, p. 12].</p>")
+        self._render("<p>Also [@a, p. 12].</p>")
+
+        with patch('builtins.print') as mock_print:
+            citation_processor.report_citation_stats(Mock(settings={'PATH': "", 'DEBUG': True}))
+
+        mock_print.assert_any_call(
+            "Citation memo (pandoc): 1 of 2 clusters reused (50%), 1 of 2 bibliography entries reused (50%)"
+        )
+
+    @patch('subprocess.run')
+    def test_only_new_clusters_are_sent_to_pandoc(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self._render("<p>See [@a, p. 12].</p>")
+
+        content = self._render("<p>See [@a, p. 12] and [@b].</p>")
+
+        document = mock_run.call_args.kwargs['input']
+        self.assertNotIn("[@a, p. 12]", document)
+        self.assertIn("nocite: |\n  @{a}, @{b}", document)
+        self.assertIn("[@A, P. 12]", content)
+        self.assertIn("[@B]", content)
+        self.assertIn('<div id="ref-a"', content)
+
+    @patch('subprocess.run')
+    def test_possible_ambiguity_changes_the_memo_key(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self._render("<p>See [@a].</p>")
+
+        self._render("<p>See [@a] and [@c].</p>")
+
+        self.assertIn("[@a]", mock_run.call_args.kwargs['input'])
+
+    @patch('subprocess.run')
+    def test_position_dependent_styles_render_whole_documents(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self._write("style.csl", '<style class="in-text"><if position="subsequent"/></style>')
+        self._render("<p>See [@a].</p>")
+
+        self._render("<p>See [@a] and [@b].</p>")
+
+        self.assertIn("[@a]", mock_run.call_args.kwargs['input'])
+
+    @patch('subprocess.run')
+    def test_numeric_styles_number_citations_per_article(self, mock_run):
+        mock_run.side_effect = fake_numeric_pandoc
+        self._write("style.csl", '<style class="in-text"><text variable="citation-number"/></style>')
+
+        first = self._render("<p>See [@a].</p>")
+        second = self._render("<p>See [@b] and [@a].</p>")
+
+        self.assertIn("[1]", first)
+        self.assertIn("[1]", second)
+        self.assertIn("[2]", second)
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertIn("[@b]", mock_run.call_args.kwargs['input'])
+        self.assertIn("[@a]", mock_run.call_args.kwargs['input'])
+
+    @patch('subprocess.run')
+    def test_memo_can_be_disabled(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self.settings['CITATION_CLUSTER_MEMO'] = False
+
+        self._render("<p>See [@a].</p>")
+        self._render("<p>See [@a].</p>")
+
+        self.assertEqual(mock_run.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
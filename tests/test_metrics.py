@@ -0,0 +1,119 @@
+"""
+Tests for citation build metrics in the Pelican Citation Processor plugin.
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.citation_processor import process_citations, report_citation_stats
+from pelican.plugins.citation_processor.metrics import CitationMetrics, timed
+from tests.test_utils import make_content, make_settings, reset_plugin_state, write_files
+
+
+class TestCitationMetrics(unittest.TestCase):
+    """Test cases for collecting and summarizing per-document metrics."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.metrics = CitationMetrics()
+
+    def test_timed_accumulates_stage_time(self):
+        timings = {}
+
+        with timed(timings, 'render'):
+            pass
+        first = timings['render']
+        with timed(timings, 'render'):
+            pass
+
+        self.assertGreaterEqual(timings['render'], first)
+        self.assertEqual(list(timings), ['render'])
+
+    def test_summary_totals_statuses_and_slowest(self):
+        self.metrics.record("/site/content/a.md", "rendered", {'render': 2.0, 'io': 0.5}, 100, 300)
+        self.metrics.record("/site/content/b.md", "cached", {'cache': 0.1}, 0, 250)
+        self.metrics.record("/site/content/c.md", "skipped", {'resolve': 0.01})
+        self.metrics.record("/site/content/d.md", "failed", {'render': 5.0}, 80)
+
+        summary = self.metrics.summary(slowest=2, base_path="/site/content")
+
+        totals = summary['totals']
+        self.assertEqual(totals['documents'], 4)
+        self.assertEqual((totals['rendered'], totals['cached'], totals['skipped'], totals['failed']), (1, 1, 1, 1))
+        self.assertEqual((totals['bytes_in'], totals['bytes_out']), (180, 550))
+        self.assertGreater(totals['peak_rss'], 0)
+        self.assertEqual(totals['timings']['render'], 7.0)
+        self.assertEqual([document['source_path'] for document in summary['slowest']], ["d.md", "a.md"])
+        self.assertEqual(summary['documents']["a.md"]['timings']['total'], 2.5)
+
+    def test_report_writes_json_file(self):
+        self.metrics.record("a.md", "rendered", {'render': 1.0}, 10, 20)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "metrics", "citations.json")
+
+            with self.assertLogs('pelican.plugins.citation_processor.metrics', level='INFO'):
+                self.metrics.report(path)
+
+            with open(path, 'r') as f:
+                report = json.load(f)
+        self.assertEqual(report['totals']['rendered'], 1)
+        self.assertEqual(report['slowest'][0]['source_path'], "a.md")
+
+
+class TestProcessCitationsMetrics(unittest.TestCase):
+    """Test cases for recording metrics while processing content."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        citation_processor._citation_metrics.clear()
+        write_files(self.temp_dir.name, [("refs.bib", "@book{key,}"), ("style.csl", "<style/>")])
+        self.settings = make_settings(
+            self.temp_dir.name, CITATION_METRICS_FILE=os.path.join(self.temp_dir.name, "metrics.json")
+        )
+        self.article_generator = Mock()
+        self.article_generator.settings = self.settings
+
+    def _report(self):
+        report_citation_stats(Mock(settings=self.settings))
+        with open(self.settings.CITATION_METRICS_FILE, 'r') as f:
+            return json.load(f)
+
+    @patch('subprocess.run')
+    def test_process_citations_records_each_outcome(self, mock_run):
+        def run(cmd, **kwargs):
+            if "broken" in kwargs['input']:
+                raise subprocess.CalledProcessError(1, "pandoc", stderr="Error")
+            return Mock(returncode=0, stdout=f"<p>{kwargs['input']}</p>")
+        mock_run.side_effect = run
+
+        for name, text in (("cited.md", "Text [@key]."), ("plain.md", "No citations."), ("broken.md", "broken [@key].")):
+            process_citations(self.article_generator, make_content(self.temp_dir.name, name, text))
+        report = self._report()
+
+        self.assertEqual(report['documents']["cited.md"]['status'], "rendered")
+        self.assertEqual(report['documents']["cited.md"]['bytes_in'], len("Text [@key]."))
+        self.assertEqual(report['documents']["cited.md"]['bytes_out'], len("<p>Text [@key].</p>"))
+        self.assertGreater(report['documents']["cited.md"]['timings']['render'], 0)
+        self.assertEqual(report['documents']["plain.md"]['status'], "skipped")
+        self.assertEqual(report['documents']["broken.md"]['status'], "failed")
+        self.assertEqual(report['totals']['documents'], 3)
+
+    @patch('subprocess.run')
+    def test_report_clears_metrics_for_next_build(self, mock_run):
+        mock_run.return_value = Mock(returncode=0, stdout="<p>rendered</p>")
+        process_citations(self.article_generator, make_content(self.temp_dir.name, "cited.md", "Text [@key]."))
+
+        self._report()
+
+        self.assertEqual(citation_processor._citation_metrics.summary()['totals']['documents'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
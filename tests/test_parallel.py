@@ -0,0 +1,247 @@
+"""
+Tests for parallel citation rendering in the Pelican Citation Processor plugin.
+"""
+
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.citation_processor import (
+    prerender_citations,
+    process_citations,
+    process_generator_citations,
+)
+from tests.test_utils import fake_pandoc, make_content, make_settings, patch_pandoc_version, reset_plugin_state, write_files
+
+
+class ExecutionModeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        patch_pandoc_version(self)
+        write_files(self.temp_dir.name, [("refs.bib", "@book{key,}"), ("style.csl", "<style/>")])
+        self.settings = make_settings(
+            self.temp_dir.name, CITATION_EXECUTION_MODE="parallel", CITATION_WORKERS=4, CITATION_TIMEOUT=5
+        )
+        self.article_generator = Mock()
+        self.article_generator.settings = self.settings
+        self.article_generator.articles = [make_content(self.temp_dir.name, f"article-{i}.md", f"Text {i} [@key].") for i in range(6)]
+        self.article_generator.translations = []
+        self.article_generator.drafts = []
+        self.article_generator.drafts_translations = []
+
+
+class TestParallelRendering(ExecutionModeTestCase):
+    """Test cases for rendering citations on a worker pool."""
+
+    @patch('subprocess.run')
+    def test_parallel_output_matches_serial(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+
+        self.settings.CITATION_EXECUTION_MODE = "serial"
+        prerender_citations(self.article_generator)
+        for content in self.article_generator.articles:
+            process_citations(self.article_generator, content)
+        serial_output = [content._content for content in self.article_generator.articles]
+
+        for content in self.article_generator.articles:
+            content._content = "<p>original</p>"
+        citation_processor._rendered_citations.clear()
+        self.settings.CITATION_EXECUTION_MODE = "parallel"
+        self.settings.CITATION_RENDERER = "pandoc"
+        prerender_citations(self.article_generator)
+        calls_after_prerender = mock_run.call_count
+        for content in self.article_generator.articles:
+            process_citations(self.article_generator, content)
+
+        self.assertEqual([content._content for content in self.article_generator.articles], serial_output)
+        self.assertEqual(mock_run.call_count, calls_after_prerender)
+        self.assertEqual(calls_after_prerender, 12)
+
+    @patch('subprocess.run')
+    def test_parallel_timeout_leaves_content_untouched(self, mock_run):
+        mock_run.side_effect = subprocess.TimeoutExpired("pandoc", 5)
+
+        prerender_citations(self.article_generator)
+        for content in self.article_generator.articles:
+            process_citations(self.article_generator, content)
+
+        self.assertEqual(mock_run.call_count, 6)
+        self.assertEqual(mock_run.call_args.kwargs['timeout'], 5)
+        for content in self.article_generator.articles:
+            self.assertEqual(content._content, "<p>original</p>")
+
+
+class TestBatchRendering(ExecutionModeTestCase):
+    """Test cases for rendering articles in batched Pandoc calls."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        super().setUp()
+        self.settings.CITATION_EXECUTION_MODE = "batch"
+        self.article_generator.articles[0].citation_style = "other.csl"
+        write_files(self.temp_dir.name, [("other.csl", "<style/>")])
+
+    def _fake_pandoc_batch(self, cmd, **kwargs):
+        metadata = dict(cmd[i + 1].split('=', 1) for i, arg in enumerate(cmd) if arg == '--metadata')
+        with open(metadata['citation-batch-input'], 'r') as f:
+            sources = f.read().split(metadata['citation-batch-boundary'])
+        stdout = metadata['citation-batch-boundary'].join(f"<p>{source}</p>" for source in sources)
+        return Mock(returncode=0, stdout=stdout + "\n")
+
+    @patch('subprocess.run')
+    def test_batch_renders_one_pandoc_call_per_configuration(self, mock_run):
+        mock_run.side_effect = lambda cmd, **kwargs: (
+            self._fake_pandoc_batch(cmd, **kwargs) if '--lua-filter' in cmd else fake_pandoc(cmd, **kwargs)
+        )
+
+        prerender_citations(self.article_generator)
+        for content in self.article_generator.articles:
+            process_citations(self.article_generator, content)
+
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertEqual(self.article_generator.articles[0]._content, "<p>Text 0 [@key].</p>")
+        for i, content in enumerate(self.article_generator.articles[1:], start=1):
+            self.assertEqual(content._content, f"<p>Text {i} [@key].</p>\n")
+
+    @patch('subprocess.run')
+    def test_batch_failure_falls_back_to_single_articles(self, mock_run):
+        def run(cmd, **kwargs):
+            if '--lua-filter' in cmd:
+                raise subprocess.CalledProcessError(1, "pandoc", stderr="Error")
+            return fake_pandoc(cmd, **kwargs)
+        mock_run.side_effect = run
+
+        prerender_citations(self.article_generator)
+        for content in self.article_generator.articles:
+            process_citations(self.article_generator, content)
+
+        self.assertEqual(mock_run.call_count, 7)
+        for i, content in enumerate(self.article_generator.articles):
+            self.assertEqual(content._content, f"<p>Text {i} [@key].</p>")
+
+
+class TestGeneratorPipeline(ExecutionModeTestCase):
+    """Test cases for rendering citations once per content at generator-finalized time."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        super().setUp()
+        self.settings.CITATION_EXECUTION_MODE = "serial"
+
+    @patch('subprocess.run')
+    def test_generator_finalized_renders_each_source_once(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+
+        process_generator_citations(self.article_generator)
+        for content in self.article_generator.articles:
+            process_citations(self.article_generator, content)
+
+        self.assertEqual(mock_run.call_count, 6)
+        for i, content in enumerate(self.article_generator.articles):
+            self.assertEqual(content._content, f"<p>Text {i} [@key].</p>")
+
+    @patch('subprocess.run')
+    def test_pages_share_the_pipeline(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        page_generator = Mock(spec=['settings', 'pages', 'hidden_pages'])
+        page_generator.settings = self.settings
+        page_generator.pages = [make_content(self.temp_dir.name, "about.md", "About [@key].")]
+        page_generator.hidden_pages = [page_generator.pages[0]]
+
+        process_generator_citations(page_generator)
+
+        mock_run.assert_called_once()
+        self.assertEqual(page_generator.pages[0]._content, "<p>About [@key].</p>")
+
+    @patch('subprocess.run')
+    def test_edited_source_is_rendered_again(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        content = self.article_generator.articles[0]
+        process_citations(self.article_generator, content)
+
+        with open(content.source_path, 'w') as f:
+            f.write("Edited text [@key] with more words.")
+        process_citations(self.article_generator, content)
+
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertEqual(content._content, "<p>Edited text [@key] with more words.</p>")
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestWarmState(ExecutionModeTestCase):
+    """Test cases for keeping rendered citations across regenerations."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        super().setUp()
+        self.settings.CITATION_EXECUTION_MODE = "serial"
+        self.settings.CITATION_WARM_STATE = True
+
+    def _build(self):
+        for content in self.article_generator.articles:
+            content._content = "<p>original</p>"
+        process_generator_citations(self.article_generator)
+        citation_processor.report_citation_stats(Mock(settings=self.settings))
+
+    @patch('subprocess.run')
+    def test_unchanged_sources_are_not_rendered_again(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self._build()
+
+        self._build()
+
+        self.assertEqual(mock_run.call_count, 6)
+        for i, content in enumerate(self.article_generator.articles):
+            self.assertEqual(content._content, f"<p>Text {i} [@key].</p>")
+
+    @patch('subprocess.run')
+    def test_edited_source_is_the_only_one_rendered_again(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self._build()
+        with open(self.article_generator.articles[2].source_path, 'w') as f:
+            f.write("Edited [@key].")
+
+        self._build()
+
+        self.assertEqual(mock_run.call_count, 7)
+        self.assertEqual(mock_run.call_args.kwargs['input'], "Edited [@key].")
+        self.assertEqual(self.article_generator.articles[2]._content, "<p>Edited [@key].</p>")
+
+    @patch('subprocess.run')
+    def test_bibliography_edit_invalidates_warm_results(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self._build()
+        write_files(self.temp_dir.name, [("refs.bib", "@book{key, title={Changed}}")])
+
+        self._build()
+
+        self.assertEqual(mock_run.call_count, 12)
+
+    @patch('subprocess.run')
+    def test_failures_are_retried_on_the_next_build(self, mock_run):
+        mock_run.side_effect = subprocess.TimeoutExpired("pandoc", 5)
+        self._build()
+        mock_run.side_effect = fake_pandoc
+
+        self._build()
+
+        self.assertEqual(mock_run.call_count, 12)
+        self.assertEqual(self.article_generator.articles[0]._content, "<p>Text 0 [@key].</p>")
+
+    @patch('subprocess.run')
+    def test_disabled_warm_state_renders_every_build(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self.settings.CITATION_WARM_STATE = False
+        self._build()
+
+        self._build()
+
+        self.assertEqual(mock_run.call_count, 12)
@@ -0,0 +1,195 @@
+"""
+Tests for site-wide shared reference pages in the Pelican Citation Processor plugin.
+"""
+
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.contents import Article
+from pelican.settings import DEFAULT_CONFIG
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.citation_processor import process_generator_citations, report_citation_stats
+from pelican.plugins.citation_processor.references import SharedReferences, build_reference_pages, share_reference_list
+from tests.test_utils import patch_pandoc_version, reset_plugin_state, write_files
+
+
+ENTRIES = {
+    'smith': '<strong>Smith J</strong> (2020) <em>A book about citations</em>. Cambridge: <a href="https://example.org">Press</a>.',
+    'adams': '<strong>Adams D</strong> (1979) <em>The hitchhiker’s guide</em>. London: Pan.',
+}
+
+
+def reference_list(keys):
+    entries = ''.join(
+        f'<div id="ref-{key}" class="csl-entry" role="listitem">\n{ENTRIES[key]}\n</div>\n' for key in keys
+    )
+    return '<div id="refs" class="references csl-bib-body hanging-indent"\nrole="list">\n' + entries + '</div>\n'
+
+
+def fake_pandoc(cmd, **kwargs):
+    keys = [key for key in ENTRIES if f'@{key}' in kwargs['input'] or f'@{{{key}}}' in kwargs['input']]
+    links = '; '.join(f'<a href="#ref-{key}" role="doc-biblioref">{key}</a>' for key in keys)
+    return Mock(returncode=0, stdout=f'<p>Text <span class="citation">({links})</span>.</p>\n' + reference_list(keys))
+
+
+class TestShareReferenceList(unittest.TestCase):
+    """Test cases for replacing per-article reference lists with stubs."""
+
+    def test_entries_become_linked_stubs(self):
+        html = '<p>Text.</p>\n' + reference_list(['smith', 'adams'])
+
+        shared, head, entries = share_reference_list(html, "references/style.html", words=5)
+
+        self.assertEqual([key for key, _ in entries], ['smith', 'adams'])
+        self.assertTrue(head.startswith('<div id="refs" class="references'))
+        self.assertIn('<div id="refs" class="citation-stubs references csl-bib-body', shared)
+        self.assertIn(
+            '<div id="ref-smith" class="csl-entry" role="listitem">\n'
+            '<a href="{filename}/references/style.html#ref-smith"><strong>Smith J</strong> (2020) <em>A book …</em></a>\n'
+            '</div>',
+            shared
+        )
+        self.assertNotIn('example.org', shared)
+
+    def test_documents_without_a_reference_list_are_unchanged(self):
+        self.assertEqual(share_reference_list('<p>Text.</p>\n', "references/style.html"), ('<p>Text.</p>\n', None, []))
+
+    def test_pages_hold_each_entry_once_from_current_documents(self):
+        shared_references = SharedReferences()
+        page = ("references/style.html", "references/style.html")
+        config = ("style.csl", "refs.bib")
+        head = '<div id="refs" class="references" role="list">\n'
+        _, _, first = share_reference_list(reference_list(['smith']), page[0])
+        _, _, second = share_reference_list(reference_list(['smith', 'adams']), page[0])
+        shared_references.add("/content/b.md", page, config, head, second)
+        shared_references.add("/content/a.md", page, config, head, first)
+        shared_references.add("/content/old.md", page, config, head, second)
+        shared_references.reset()
+        shared_references.use("/content/a.md")
+        shared_references.use("/content/b.md")
+
+        context = {'generated_content': {}}
+        pages = build_reference_pages(shared_references, dict(DEFAULT_CONFIG), context)
+
+        self.assertEqual(len(pages), 1)
+        self.assertIs(context['generated_content']["references/style.html"], pages[0])
+        self.assertEqual(pages[0].title, "References")
+        self.assertEqual(pages[0].content, head + ''.join(
+            f'<div id="ref-{key}" class="csl-entry" role="listitem">\n{ENTRIES[key]}\n</div>\n' for key in ('adams', 'smith')
+        ) + '</div>\n')
+
+
+class TestSharedReferences(unittest.TestCase):
+    """Test cases for building shared reference pages from rendered articles."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        patch_pandoc_version(self)
+        styles = (("style.csl", '<style class="in-text"/>'), ("numeric.csl", '<text variable="citation-number"/>'))
+        write_files(self.temp_dir.name, (("refs.bib", "@book{smith,}\n@book{adams,}"),) + styles)
+        self.context = {'generated_content': {}, 'localsiteurl': ''}
+        self.settings = dict(DEFAULT_CONFIG)
+        self.settings.update(
+            PATH=self.temp_dir.name,
+            CITATION_STYLE="style.csl",
+            BIBLIOGRAPHY_FILE="refs.bib",
+            CITATION_SHARED_REFERENCES=True
+        )
+        self.article_generator = Mock(spec=['settings', 'articles'])
+        self.article_generator.settings = self.settings
+        self.article_generator.articles = [
+            self._make_article("a.md", "Text [@smith; @adams]."),
+            self._make_article("b.md", "Text [@smith].")
+        ]
+
+    def _make_article(self, name, text):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return Article(
+            "<p>original</p>", metadata={'title': name}, settings=self.settings, source_path=path, context=self.context
+        )
+
+    def _report(self):
+        with self.assertLogs('pelican.plugins.citation_processor.metrics', level='INFO'):
+            report_citation_stats(Mock(settings=self.settings))
+
+    @patch('subprocess.run')
+    def test_articles_link_to_the_shared_page(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+
+        process_generator_citations(self.article_generator)
+        generator = citation_processor.get_references_generator(Mock(settings=self.settings))
+        pages = build_reference_pages(citation_processor._shared_references, self.settings, self.context)
+
+        self.assertIs(generator, citation_processor.CitationReferencesGenerator)
+        self.assertEqual([page.save_as for page in pages], ["references/style-refs.html"])
+        self.assertEqual(pages[0].content.count('class="csl-entry"'), 2)
+        content = self.article_generator.articles[1].content
+        self.assertIn('<a href="#ref-smith" role="doc-biblioref">', content)
+        self.assertIn('<a href="/references/style-refs.html#ref-smith">', content)
+        self.assertNotIn('example.org', content)
+
+    @patch('subprocess.run')
+    def test_shared_page_is_rendered_once_from_every_cited_key(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        process_generator_citations(self.article_generator)
+        mock_run.reset_mock()
+        mock_run.side_effect = lambda cmd, **kwargs: Mock(
+            returncode=0, stdout=reference_list(['adams', 'smith']).replace("(2020)", "(2020a)")
+        )
+
+        generator = citation_processor.CitationReferencesGenerator(
+            self.context, self.settings, self.temp_dir.name, self.temp_dir.name, self.temp_dir.name
+        )
+        generator.generate_context()
+
+        mock_run.assert_called_once()
+        self.assertIn("nocite: |\n  @{adams}, @{smith}", mock_run.call_args.kwargs['input'])
+        self.assertEqual(generator.reference_pages[0].content, reference_list(['adams', 'smith']).replace("(2020)", "(2020a)"))
+
+    @patch('subprocess.run')
+    def test_shared_page_falls_back_to_the_articles_entries(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        process_generator_citations(self.article_generator)
+        mock_run.side_effect = subprocess.CalledProcessError(1, "pandoc", stderr="Error")
+
+        pages = build_reference_pages(
+            citation_processor._shared_references, self.settings, self.context,
+            citation_processor.render_shared_references
+        )
+
+        self.assertEqual(pages[0].content.count('class="csl-entry"'), 2)
+
+    @patch('subprocess.run')
+    def test_warm_rebuild_keeps_entries_of_reused_articles(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self.settings['CITATION_WARM_STATE'] = True
+        process_generator_citations(self.article_generator)
+        self._report()
+
+        self.article_generator.articles = [self._make_article("b.md", "Text [@smith].")]
+        process_generator_citations(self.article_generator)
+        pages = citation_processor._shared_references.pages()
+
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertEqual(list(pages.values())[0]['entries'].keys(), {'smith'})
+
+    @patch('subprocess.run')
+    def test_numeric_styles_keep_their_reference_lists(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self.settings['CITATION_STYLE'] = "numeric.csl"
+
+        process_generator_citations(self.article_generator)
+
+        self.assertEqual(citation_processor._shared_references.pages(), {})
+        self.assertIn('example.org', self.article_generator.articles[0]._content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+"""
+Tests for the citation renderers in the Pelican Citation Processor plugin.
+"""
+
+import html
+import os
+import re
+import shutil
+import subprocess
+import unittest
+from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor import citation_processor, renderers
+from pelican.plugins.citation_processor.renderers import CitationRenderer, CiteprocPyRenderer, PandocRenderer
+
+
+EXAMPLE_CONTENT = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'examples', 'content')
+EXAMPLE_STYLE = os.path.join(EXAMPLE_CONTENT, '_bib_styles', 'cambridge-university-press-author-date-cambridge-a.csl')
+EXAMPLE_BIBLIOGRAPHY = os.path.join(EXAMPLE_CONTENT, '_bibliography.bib')
+CITATION_SPAN_PATTERN = re.compile(r'<span\s+class="citation"\s+data-cites="(?P<keys>[^"]*)">(?P<text>.*?)</span>', re.DOTALL)
+CSL_ENTRY_PATTERN = re.compile(r'<div\s+id="ref-(?P<key>[^"]*)"\s+class="csl-entry"[^>]*>(?P<text>.*?)</div>', re.DOTALL)
+CONFORMANCE_SOURCE = """\
+Deep networks [see @DeepLearning2016, pp. 12-14; @ResNet2016] build on
+earlier work [@PatternRecognition2006, 5] and [@GPT2018; @Attention2017].
+"""
+IN_TEXT_SOURCE = """\
+As @DeepLearning2016 [p. 12] show, residual networks [-@ResNet2016] train
+deeper models than earlier work [@PatternRecognition2006].
+"""
+
+
+def normalize(text):
+    return ' '.join(html.unescape(re.sub(r'<[^>]+>', '', text)).split()).casefold()
+
+
+def extract_citations(content):
+    citations = [(match.group('keys'), normalize(match.group('text'))) for match in CITATION_SPAN_PATTERN.finditer(content)]
+    entries = [(match.group('key'), normalize(match.group('text'))) for match in CSL_ENTRY_PATTERN.finditer(content)]
+    return citations, entries
+
+
+class TestGetRenderer(unittest.TestCase):
+    """Test cases for selecting a citation renderer."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.addCleanup(citation_processor.close_renderers)
+        self.settings = Mock()
+        self.settings.DEBUG = False
+
+    def test_renderers_must_implement_the_interface(self):
+        with self.assertRaises(TypeError):
+            CitationRenderer()
+
+    def test_get_renderer_defaults_to_pandoc(self):
+        self.assertIsInstance(citation_processor.get_renderer({}), PandocRenderer)
+
+    def test_get_renderer_falls_back_for_unknown_names(self):
+        self.settings.CITATION_RENDERER = "latex"
+
+        self.assertEqual(citation_processor.get_renderer(self.settings).name, "pandoc")
+
+    def test_get_renderer_falls_back_when_citeproc_py_is_missing(self):
+        self.settings.CITATION_RENDERER = "citeproc-py"
+
+        with patch.object(renderers, 'citeproc', None):
+            self.assertEqual(citation_processor.get_renderer(self.settings).name, "pandoc")
+
+    def test_get_renderer_reuses_instances(self):
+        self.settings.CITATION_RENDERER = "pandoc-server"
+
+        renderer = citation_processor.get_renderer(self.settings)
+
+        self.assertIs(citation_processor.get_renderer(self.settings), renderer)
+
+
+class TestCitationScope(unittest.TestCase):
+    """Test cases for rendering only the citation clusters with Pandoc."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.settings = {'DEBUG': False, 'CITATION_RENDER_SCOPE': "citations", 'CITATION_CLUSTER_MEMO': False}
+        self.job = {
+            'source': "Title: Article\n\nSee [@key].",
+            'html': "<p>See [@key].</p>",
+            'citation_style_path': "style.csl"
+        }
+
+    @patch('subprocess.run')
+    def test_render_sends_only_clusters_and_splices_result(self, mock_run):
+        mock_run.return_value = Mock(returncode=0, stdout=(
+            '<div id="citation-cluster-0">\n<p><span class="citation" data-cites="key">(Key 2020)</span></p>\n</div>\n'
+            '<div id="refs" class="references csl-bib-body" role="list">refs</div>\n'
+        ))
+
+        content = PandocRenderer().render(self.settings, self.job, "refs.bib")
+
+        self.assertEqual(mock_run.call_args.kwargs['input'], "::: {#citation-cluster-0}\n[@key]\n:::\n\n")
+        self.assertEqual(content, (
+            '<p>See <span class="citation" data-cites="key">(Key 2020)</span>.</p>\n'
+            '<div id="refs" class="references csl-bib-body" role="list">refs</div>\n'
+        ))
+
+    @patch('subprocess.run')
+    def test_render_skips_pandoc_without_clusters_in_html(self, mock_run):
+        self.job['html'] = "<p>See <code>[@key]</code>.</p>"
+
+        self.assertEqual(PandocRenderer().render(self.settings, self.job, "refs.bib"), self.job['html'])
+        mock_run.assert_not_called()
+
+    @patch('pelican.plugins.citation_processor.renderers.get_pandoc_version')
+    def test_cache_parts_depend_on_scope(self, mock_version):
+        mock_version.return_value = "pandoc 3.1"
+        renderer = PandocRenderer()
+
+        self.assertNotEqual(renderer.cache_parts(self.settings, self.job), renderer.cache_parts({}, self.job))
+
+
+@unittest.skipIf(renderers.citeproc is None, "citeproc-py is not installed")
+class TestCiteprocPyRenderer(unittest.TestCase):
+    """Test cases for rendering citations in-process with citeproc-py."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.renderer = CiteprocPyRenderer()
+        self.settings = {'DEBUG': False}
+
+    def _render(self, content):
+        job = {'html': content, 'citation_style_path': EXAMPLE_STYLE}
+        return self.renderer.render(self.settings, job, EXAMPLE_BIBLIOGRAPHY)
+
+    @patch('subprocess.run')
+    def test_render_replaces_clusters_and_appends_bibliography(self, mock_run):
+        content = self._render("<p>See [@DeepLearning2016, p. 3] and [@Attention2017].</p>")
+
+        citations, entries = extract_citations(content)
+        self.assertEqual(citations, [
+            ("DeepLearning2016", "(goodfellow et al. 2016, 3)"),
+            ("Attention2017", "(vaswani et al. 2017)")
+        ])
+        self.assertEqual([key for key, _ in entries], ["DeepLearning2016", "Attention2017"])
+        self.assertIn('<div id="refs" class="references csl-bib-body hanging-indent" role="list">', content)
+        mock_run.assert_not_called()
+
+    @patch('pelican.plugins.citation_processor.renderers.get_pandoc_version')
+    @patch('subprocess.run')
+    def test_in_text_and_suppress_author_citations_fall_back_to_pandoc(self, mock_run, mock_version):
+        mock_version.return_value = "pandoc 3.1"
+        mock_run.return_value = Mock(returncode=0, stdout=(
+            '<div id="citation-cluster-0">\n<p><span class="citation" data-cites="DeepLearning2016">'
+            'Goodfellow et al. (2016)</span></p>\n</div>\n'
+            '<div id="citation-cluster-1">\n<p><span class="citation" data-cites="ResNet2016">(2016)</span></p>\n</div>\n'
+        ))
+        job = {
+            'html': "<p>As @DeepLearning2016 show [-@ResNet2016].</p>",
+            'citation_style_path': EXAMPLE_STYLE,
+            'bibliography_path': EXAMPLE_BIBLIOGRAPHY
+        }
+
+        content = self.renderer.render(self.settings, job, EXAMPLE_BIBLIOGRAPHY)
+
+        citations, _ = extract_citations(content)
+        self.assertEqual(citations, [("DeepLearning2016", "goodfellow et al. (2016)"), ("ResNet2016", "(2016)")])
+        self.assertIn("::: {#citation-cluster-0}\n@DeepLearning2016\n:::", mock_run.call_args.kwargs['input'])
+        self.assertNotEqual(
+            self.renderer.cache_parts(self.settings, job)[0],
+            self.renderer.cache_parts(self.settings, {'html': "<p>[@ResNet2016]</p>"})[0]
+        )
+
+    def test_render_leaves_content_without_clusters_untouched(self):
+        self.assertEqual(self._render("<p>No citations here.</p>"), "<p>No citations here.</p>")
+
+    def test_render_rejects_unsupported_bibliography_formats(self):
+        job = {'html': "<p>[@key]</p>", 'citation_style_path': EXAMPLE_STYLE}
+
+        with self.assertRaises(ValueError):
+            self.renderer.render(self.settings, job, "refs.yaml")
+
+
+@unittest.skipIf(renderers.citeproc is None, "citeproc-py is not installed")
+@unittest.skipIf(shutil.which('pandoc') is None, "pandoc is not installed")
+class TestRendererConformance(unittest.TestCase):
+    """Test cases comparing the citeproc-py renderer with the Pandoc renderer."""
+
+    def _pandoc(self, *args, source):
+        return subprocess.run(
+            ['pandoc', *args], input=source, capture_output=True, encoding='utf-8', check=True
+        ).stdout
+
+    def test_renderers_agree_on_example_content(self):
+        settings = {'DEBUG': False}
+        with open(os.path.join(EXAMPLE_CONTENT, 'sample-article.md'), 'r', encoding='utf-8') as f:
+            sources = {'sample-article.md': f.read(), 'locators': CONFORMANCE_SOURCE, 'in-text': IN_TEXT_SOURCE}
+        for name, source in sources.items():
+            job = {
+                'source': source,
+                'html': self._pandoc('--from', 'markdown-citations', '--to', 'html5', source=source),
+                'citation_style_path': EXAMPLE_STYLE,
+                'bibliography_path': EXAMPLE_BIBLIOGRAPHY
+            }
+
+            pandoc_citations, pandoc_entries = extract_citations(PandocRenderer().render(settings, job, EXAMPLE_BIBLIOGRAPHY))
+            citeproc_citations, citeproc_entries = extract_citations(CiteprocPyRenderer().render(settings, job, EXAMPLE_BIBLIOGRAPHY))
+
+            with self.subTest(article=name):
+                self.assertEqual(citeproc_citations, pandoc_citations)
+                self.assertEqual(citeproc_entries, pandoc_entries)
+
+
+if __name__ == '__main__':
+    unittest.main()
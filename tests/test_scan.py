@@ -0,0 +1,151 @@
+"""
+Tests for the citation pre-scan in the Pelican Citation Processor plugin.
+"""
+
+import unittest
+from pelican.plugins.citation_processor.scan import (
+    build_cluster_document,
+    build_reference_list,
+    find_citation_clusters,
+    find_citation_keys,
+    parse_cluster_document,
+    parse_reference_list,
+    splice_clusters,
+    strip_metadata_header,
+)
+
+
+class TestFindCitationKeys(unittest.TestCase):
+    """Test cases for recognising Pandoc citation syntax."""
+
+    def test_find_citation_keys_bracketed_and_in_text(self):
+        text = "As [@Smith2020; @Jones:2019, p. 4] show, @Doe_2018 [p. 33] agrees."
+
+        self.assertEqual(find_citation_keys(text), ["Smith2020", "Jones:2019", "Doe_2018"])
+
+    def test_find_citation_keys_suppressed_author_and_braced(self):
+        text = "Smith says so [-@Smith2020]. See also @{https://example.com/ref}."
+
+        self.assertEqual(find_citation_keys(text), ["Smith2020", "https://example.com/ref"])
+
+    def test_find_citation_keys_ignores_trailing_punctuation(self):
+        self.assertEqual(find_citation_keys("Shown by @Smith2020."), ["Smith2020"])
+
+    def test_find_citation_keys_ignores_emails_and_escapes(self):
+        text = "Write to someone@example.com or mention \\@handle."
+
+        self.assertEqual(find_citation_keys(text), [])
+
+    def test_find_citation_keys_ignores_code(self):
+        text = "Run `git log @{u}` first.\n\n```\n@decorator\n```\n\n<!-- [@Hidden] -->"
+
+        self.assertEqual(find_citation_keys(text), [])
+
+    def test_find_citation_keys_stops_code_spans_at_paragraph_breaks(self):
+        text = "Use a ` tick.\n\n[@key]\n\nAnd `code`.\n\nSpans `can\nwrap @lines`."
+
+        self.assertEqual(find_citation_keys(text), ["key"])
+
+    def test_find_citation_keys_deduplicates_in_order(self):
+        self.assertEqual(find_citation_keys("[@b] [@a] [@b]"), ["b", "a"])
+
+
+class TestFindCitationClusters(unittest.TestCase):
+    """Test cases for locating citation clusters in rendered HTML."""
+
+    def test_find_citation_clusters_parses_items(self):
+        html = "<p>As [see @Smith2020, p. 3; -@Jones:2019 chap. 2 and more] show.</p>"
+
+        clusters = find_citation_clusters(html)
+
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(html[clusters[0]['start']:clusters[0]['end']], clusters[0]['text'])
+        smith, jones = clusters[0]['items']
+        self.assertEqual((smith['key'], smith['prefix'], smith['label'], smith['locator']), ("Smith2020", "see", "page", "3"))
+        self.assertEqual((jones['key'], jones['label'], jones['locator'], jones['suffix']), ("Jones:2019", "chapter", "2", "and more"))
+        self.assertTrue(jones['suppress_author'])
+
+    def test_find_citation_clusters_in_text_with_locator(self):
+        clusters = find_citation_clusters("<p>@Doe_2018 [p. 33] agrees with @Smith2020.</p>")
+
+        self.assertEqual([cluster['text'] for cluster in clusters], ["@Doe_2018 [p. 33]", "@Smith2020"])
+        self.assertTrue(all(cluster['in_text'] for cluster in clusters))
+        self.assertEqual(clusters[0]['items'][0]['locator'], "33")
+
+    def test_find_citation_clusters_ignores_code_and_attributes(self):
+        html = '<p><a href="https://example.com/@user">x</a> <code>[@Hidden]</code></p><pre>@decorator</pre>'
+
+        self.assertEqual(find_citation_clusters(html), [])
+
+
+class TestSpliceClusters(unittest.TestCase):
+    """Test cases for rendering only the citation clusters of a document."""
+
+    def test_build_cluster_document_wraps_each_cluster(self):
+        clusters = find_citation_clusters("<p>[@a] and @b [p. 2].</p>")
+
+        self.assertEqual(
+            build_cluster_document(dict(enumerate(clusters))),
+            "::: {#citation-cluster-0}\n[@a]\n:::\n\n::: {#citation-cluster-1}\n@b [p. 2]\n:::\n\n"
+        )
+
+    def test_parse_and_splice_cluster_output(self):
+        html = "<p>[@a] and @b [p. 2].</p>\n"
+        clusters = find_citation_clusters(html)
+        output = (
+            '<div id="citation-cluster-0">\n<p><span class="citation" data-cites="a">(A\n2020)</span></p>\n</div>\n'
+            '<div id="citation-cluster-1">\n<p><span class="citation" data-cites="b">B (2019, 2)</span></p>\n</div>\n'
+            '<div id="refs">refs</div>\n'
+        )
+
+        rendered, trailer = parse_cluster_document(output, [0, 1])
+
+        self.assertEqual(trailer, '<div id="refs">refs</div>\n')
+        self.assertEqual(
+            splice_clusters(html, clusters, [rendered[0], rendered[1]], trailer),
+            '<p><span class="citation" data-cites="a">(A\n2020)</span> and '
+            '<span class="citation" data-cites="b">B (2019, 2)</span>.</p>\n<div id="refs">refs</div>\n'
+        )
+
+    def test_parse_cluster_document_rejects_missing_clusters(self):
+        with self.assertRaises(ValueError):
+            parse_cluster_document('<div id="refs"></div>', [0])
+
+    def test_build_cluster_document_with_nocite(self):
+        clusters = find_citation_clusters("<p>[@a] and [@b].</p>")
+
+        self.assertEqual(
+            build_cluster_document({1: clusters[1]}, ["a", "b"]),
+            "---\nnocite: |\n  @{a}, @{b}\n---\n\n::: {#citation-cluster-1}\n[@b]\n:::\n\n"
+        )
+
+    def test_parse_reference_list_round_trips(self):
+        trailer = (
+            '<div id="refs" class="references csl-bib-body"\nrole="list">\n'
+            '<div id="ref-a" class="csl-entry" role="listitem">\nA (2020)\n</div>\n'
+            '<div id="ref-b" class="csl-entry" role="listitem">\n<div class="csl-left-margin">[2] </div>B\n</div>\n'
+            '</div>\n'
+        )
+
+        head, entries = parse_reference_list(trailer)
+
+        self.assertEqual([key for key, _ in entries], ["a", "b"])
+        self.assertEqual(build_reference_list(head, [html for _, html in entries]), trailer)
+        self.assertIsNone(parse_reference_list(trailer + '<section id="footnotes"></section>\n'))
+
+
+class TestStripMetadataHeader(unittest.TestCase):
+    """Test cases for removing the Pelican metadata header before parsing."""
+
+    def test_header_block_is_removed(self):
+        text = "Title: Example\nTags: one,\n    two\n\nText [@key].\n"
+
+        self.assertEqual(strip_metadata_header(text), "Text [@key].\n")
+
+    def test_text_without_a_header_is_unchanged(self):
+        for text in ("Text [@key].\n", "Title: Example\nNot metadata\n\nText.\n"):
+            self.assertEqual(strip_metadata_header(text), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
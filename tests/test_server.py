@@ -0,0 +1,187 @@
+"""
+Tests for the pandoc server backend in the Pelican Citation Processor plugin.
+"""
+
+import base64
+import http.server
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.memo import CitationMemo
+from pelican.plugins.citation_processor.server import PandocServerError, PandocServerPool, PandocServerUnavailable
+from tests.test_utils import make_settings, reset_plugin_state
+
+
+class FakePandocServer(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+    def do_GET(self):
+        self._respond(200, b'3.1')
+
+    def do_POST(self):
+        params = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        FakePandocServer.requests.append((self.client_address, params))
+        if 'fail' in params['text']:
+            self._respond(200, json.dumps({'error': 'Could not parse CSL'}).encode('utf-8'))
+            return
+        files = {name: base64.b64decode(data).decode('utf-8') for name, data in params['files'].items()}
+        output = f"<p>{params['text']}</p><div>{files[params['bibliography'][0]]}</div>"
+        self._respond(200, json.dumps({'output': output, 'base64': False, 'messages': []}).encode('utf-8'))
+
+    def _respond(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPandocServerPool(unittest.TestCase):
+    """Test cases for the pooled pandoc server client."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        FakePandocServer.requests = []
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), FakePandocServer)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.addCleanup(self.httpd.server_close)
+        self.addCleanup(self.httpd.shutdown)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.style_path = os.path.join(self.temp_dir.name, "style.csl")
+        self.bibliography_path = os.path.join(self.temp_dir.name, "refs.bib")
+        for path, text in ((self.style_path, "<style/>"), (self.bibliography_path, "@book{key,}")):
+            with open(path, 'w') as f:
+                f.write(text)
+
+    def _start_pool(self, mock_popen, mock_port):
+        mock_port.return_value = self.httpd.server_address[1]
+        mock_popen.return_value.poll.return_value = None
+        pool = PandocServerPool(1, timeout=5)
+        pool.start()
+        self.addCleanup(pool.close)
+        return pool
+
+    @patch('pelican.plugins.citation_processor.server.find_free_port')
+    @patch('subprocess.Popen')
+    def test_convert_sends_files_and_reuses_connections(self, mock_popen, mock_port):
+        pool = self._start_pool(mock_popen, mock_port)
+
+        first = pool.convert("Text [@key].", self.style_path, self.bibliography_path)
+        pool.convert("More [@key].", self.style_path, self.bibliography_path)
+
+        self.assertEqual(first, "<p>Text [@key].</p><div>@book{key,}</div>\n")
+        params = FakePandocServer.requests[0][1]
+        self.assertTrue(params['citeproc'])
+        self.assertEqual(params['csl'], "style.csl")
+        self.assertEqual(params['bibliography'], ["bibliography.bib"])
+        self.assertEqual(mock_popen.call_args.args[0][:2], ['pandoc', 'server'])
+        self.assertEqual(len({address for address, _ in FakePandocServer.requests}), 1)
+
+    @patch('pelican.plugins.citation_processor.server.find_free_port')
+    @patch('subprocess.Popen')
+    def test_convert_raises_conversion_errors(self, mock_popen, mock_port):
+        pool = self._start_pool(mock_popen, mock_port)
+
+        with self.assertRaises(PandocServerError):
+            pool.convert("fail [@key]", self.style_path, self.bibliography_path)
+
+    @patch('pelican.plugins.citation_processor.server.find_free_port')
+    @patch('subprocess.Popen')
+    def test_close_terminates_servers(self, mock_popen, mock_port):
+        pool = self._start_pool(mock_popen, mock_port)
+
+        pool.close()
+
+        mock_popen.return_value.terminate.assert_called_once()
+        self.assertEqual(pool.processes, [])
+
+    @patch('subprocess.Popen')
+    def test_start_fails_when_server_exits(self, mock_popen):
+        mock_popen.return_value.poll.return_value = 2
+        mock_popen.return_value.returncode = 2
+
+        with self.assertRaises(PandocServerUnavailable):
+            PandocServerPool(1).start()
+
+
+class TestPandocServerFallback(unittest.TestCase):
+    """Test cases for falling back to the pandoc CLI."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.addCleanup(citation_processor.close_renderers)
+        self.settings = make_settings("", CITATION_RENDERER="pandoc-server", CITATION_PANDOC_SERVERS=1)
+        self.job = {
+            'source': "Text [@key].",
+            'citation_keys': ["key"],
+            'citation_style_path': "style.csl",
+            'bibliography_path': "refs.bib"
+        }
+
+    @patch('subprocess.run')
+    @patch('subprocess.Popen')
+    def test_run_pandoc_falls_back_to_cli_when_server_cannot_start(self, mock_popen, mock_run):
+        mock_popen.side_effect = FileNotFoundError("pandoc")
+        mock_run.return_value = Mock(returncode=0, stdout="<p>cli</p>")
+
+        self.assertEqual(citation_processor.render_citations(self.settings, self.job), "<p>cli</p>")
+        self.assertEqual(citation_processor.render_citations(self.settings, self.job), "<p>cli</p>")
+
+        mock_popen.assert_called_once()
+        self.assertEqual(mock_run.call_count, 2)
+
+
+class TestPandocServerShutdown(unittest.TestCase):
+    """Test cases for stopping the pandoc servers at the end of the build."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        reset_plugin_state(self)
+        self.settings = make_settings("", CITATION_RENDERER="pandoc-server", CITATION_WARM_STATE=True)
+        self.renderer = Mock(memo=CitationMemo())
+        citation_processor._renderers['pandoc-server'] = self.renderer
+
+    def test_servers_are_stopped_with_warm_state(self):
+        citation_processor.report_citation_stats(Mock(settings=self.settings))
+
+        self.renderer.close.assert_called_once()
+        self.assertIs(citation_processor._renderers['pandoc-server'], self.renderer)
+
+    def test_warm_state_keeps_the_cluster_memo(self):
+        del citation_processor._renderers['pandoc-server']
+        renderer = citation_processor.get_renderer(self.settings)
+        renderer.memo.put_cluster("cluster", "<span>(Smith 2020)</span>")
+
+        citation_processor.report_citation_stats(Mock(settings=self.settings))
+
+        self.assertIs(citation_processor.get_renderer(self.settings), renderer)
+        self.assertEqual(renderer.memo.get_cluster("cluster"), "<span>(Smith 2020)</span>")
+        self.assertIsNone(renderer.pool)
+
+    def test_persist_keeps_servers_running(self):
+        self.settings.CITATION_PANDOC_SERVER_PERSIST = True
+
+        citation_processor.report_citation_stats(Mock(settings=self.settings))
+
+        self.renderer.close.assert_not_called()
+        self.assertIs(citation_processor._renderers['pandoc-server'], self.renderer)
+
+    def test_warm_state_is_off_by_default(self):
+        citation_processor._rendered_citations["article.md"] = Mock()
+
+        citation_processor.report_citation_stats(Mock(settings={'PATH': ""}))
+
+        self.assertEqual(citation_processor._rendered_citations, {})
+        self.renderer.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
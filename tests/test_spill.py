@@ -0,0 +1,156 @@
+"""
+Tests for spilling rendered citations to disk in the Pelican Citation Processor plugin.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.contents import Article, Content
+from pelican.settings import DEFAULT_CONFIG
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.citation_processor import process_generator_citations, report_citation_stats
+from pelican.plugins.citation_processor.spill import SpillStore
+from tests.test_utils import fake_pandoc, patch_pandoc_version, reset_plugin_state, write_files
+
+
+class TestSpillStore(unittest.TestCase):
+    """Test cases for the disk-backed store of rendered HTML."""
+
+    def test_compressed_round_trip(self):
+        store = SpillStore(compress=True)
+        self.addCleanup(store.close)
+        html = "<p>Rendered citations</p>" * 100
+
+        spilled = store.put("/content/a.md", html)
+
+        self.assertTrue(spilled.path.endswith(".html.z"))
+        self.assertLess(spilled.size, len(html))
+        self.assertEqual(spilled.load(), html)
+        self.assertEqual(store.stats(), {'entries': 1, 'size': spilled.size, 'loads': 1})
+
+        store.discard("/content/a.md")
+
+        self.assertFalse(os.path.exists(spilled.path))
+        self.assertEqual(store.stats()['entries'], 0)
+
+    def test_close_removes_temporary_directory(self):
+        store = SpillStore()
+        store.put("/content/a.md", "<p>A</p>")
+
+        store.close()
+
+        self.assertFalse(os.path.exists(store.path))
+
+
+class TestDiskStorage(unittest.TestCase):
+    """Test cases for loading spilled citations into content objects lazily."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        patch_pandoc_version(self)
+        write_files(self.temp_dir.name, [("refs.bib", "@book{key,}"), ("style.csl", "<style/>")])
+        self.spill_path = os.path.join(self.temp_dir.name, "spill")
+        self.settings = dict(DEFAULT_CONFIG)
+        self.settings.update(
+            PATH=self.temp_dir.name,
+            CITATION_STYLE="style.csl",
+            BIBLIOGRAPHY_FILE="refs.bib",
+            CITATION_STORAGE="disk",
+            CITATION_SPILL_PATH=self.spill_path,
+            CITATION_SPILL_COMPRESS=True,
+            CITATION_EXECUTION_MODE="parallel",
+            CITATION_WORKERS=2
+        )
+        self.article_generator = Mock(spec=['settings', 'articles'])
+        self.article_generator.settings = self.settings
+        self.article_generator.articles = [self._make_article(i) for i in range(3)]
+
+    def _make_article(self, i):
+        path = os.path.join(self.temp_dir.name, f"article-{i}.md")
+        with open(path, 'w') as f:
+            f.write(f"Text {i} [@key].")
+        return Article(
+            "<p>original</p>",
+            metadata={'title': f"Article {i}"},
+            settings=self.settings,
+            source_path=path,
+            context={}
+        )
+
+    def _report(self):
+        totals = citation_processor._citation_metrics.summary()['totals']
+        report_citation_stats(Mock(settings=self.settings))
+        return totals
+
+    @patch('subprocess.run')
+    def test_content_is_loaded_only_when_read(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+
+        process_generator_citations(self.article_generator)
+
+        article = self.article_generator.articles[0]
+        store = citation_processor._spill_stores[self.spill_path]
+        self.assertIs(type(article), Article)
+        self.assertEqual(store.stats()['entries'], 3)
+        self.assertEqual(store.loads, 0)
+        self.assertEqual(article.content, "<p>Text 0 [@key].</p>")
+        self.assertEqual(store.loads, 1)
+        self.assertIn("Text 0", article._content)
+        self.assertEqual(article._content.replace("Text", "Line"), "<p>Line 0 [@key].</p>")
+        self.assertEqual(store.loads, 3)
+        self.assertGreater(self._report()['peak_rss'], 0)
+
+    @patch('subprocess.run')
+    def test_written_content_is_released(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        process_generator_citations(self.article_generator)
+        article = self.article_generator.articles[0]
+        store = citation_processor._spill_stores[self.spill_path]
+        self.assertIn("Text 0", article.summary)
+        key = (article, article.get_siteurl())
+        self.assertIn(key, Content.get_content.cache)
+
+        citation_processor.release_spilled_citations("output/article-0.html", context={'localsiteurl': ""})
+
+        self.assertNotIn(key, Content.get_content.cache)
+        self.assertNotIn(key, Content.get_summary.cache)
+        self.assertEqual(article.content, "<p>Text 0 [@key].</p>")
+        self.assertEqual(store.loads, 2)
+
+        article._content = article._content.replace("Text", "Edited")
+        citation_processor.release_spilled_citations("output/article-0.html", context={'localsiteurl': ""})
+
+        self.assertEqual(article.content, "<p>Edited 0 [@key].</p>")
+        self.assertEqual(store.loads, 3)
+
+        article._content = "<p>replaced</p>"
+        citation_processor.release_spilled_citations("output/article-0.html", context={'localsiteurl': ""})
+
+        self.assertEqual(article.content, "<p>replaced</p>")
+        self.assertEqual(store.loads, 3)
+
+    @patch('subprocess.run')
+    def test_warm_rebuild_reuses_spilled_citations(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+        self.settings['CITATION_WARM_STATE'] = True
+        process_generator_citations(self.article_generator)
+        self._report()
+
+        self.article_generator.articles = [self._make_article(i) for i in range(3)]
+        process_generator_citations(self.article_generator)
+
+        self.assertEqual(mock_run.call_count, 3)
+        self.assertEqual(self.article_generator.articles[2].content, "<p>Text 2 [@key].</p>")
+
+        self.settings['CITATION_WARM_STATE'] = False
+        self._report()
+
+        self.assertEqual(os.listdir(self.spill_path), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
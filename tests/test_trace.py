@@ -0,0 +1,94 @@
+"""
+Tests for trace-event export in the Pelican Citation Processor plugin.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor import citation_processor
+from pelican.plugins.citation_processor.citation_processor import process_generator_citations, report_citation_stats
+from pelican.plugins.citation_processor.trace import NO_SPAN, CitationTrace
+from tests.test_utils import fake_pandoc, make_content, make_settings, patch_pandoc_version, reset_plugin_state, write_files
+
+
+class TestCitationTrace(unittest.TestCase):
+    """Test cases for recording trace events."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.trace = CitationTrace()
+
+    def test_disabled_trace_records_nothing(self):
+        span = self.trace.span('render', "a.md")
+
+        with span:
+            pass
+
+        self.assertIs(span, NO_SPAN)
+        self.assertEqual(self.trace.events, [])
+        self.assertIsNone(self.trace.write())
+
+    def test_write_emits_complete_events_and_thread_names(self):
+        path = os.path.join(self.temp_dir.name, "trace", "citations.json")
+        self.trace.configure(path)
+
+        with self.trace.span('render', "a.md", batch=["a.md"]):
+            pass
+        self.trace.write()
+
+        with open(path, 'r') as f:
+            events = json.load(f)['traceEvents']
+        metadata, event = events
+        self.assertEqual(metadata['ph'], "M")
+        self.assertEqual(metadata['tid'], event['tid'])
+        self.assertEqual((event['name'], event['ph']), ("render", "X"))
+        self.assertEqual(event['args'], {'source_path': "a.md", 'batch': ["a.md"]})
+        self.assertGreaterEqual(event['dur'], 0)
+
+
+class TestPipelineTrace(unittest.TestCase):
+    """Test cases for tracing the citation pipeline."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        reset_plugin_state(self)
+        patch_pandoc_version(self)
+        write_files(self.temp_dir.name, [("refs.bib", "@book{key,}"), ("style.csl", "<style/>")])
+        self.settings = make_settings(
+            self.temp_dir.name,
+            CITATION_EXECUTION_MODE="parallel",
+            CITATION_WORKERS=2,
+            CITATION_TRACE_FILE=os.path.join(self.temp_dir.name, "trace.json")
+        )
+        self.article_generator = Mock(spec=['settings', 'articles'])
+        self.article_generator.settings = self.settings
+        self.article_generator.articles = [make_content(self.temp_dir.name, f"article-{i}.md", f"Text {i} [@key].") for i in range(4)]
+
+    @patch('subprocess.run')
+    def test_trace_has_a_span_per_article_and_stage(self, mock_run):
+        mock_run.side_effect = fake_pandoc
+
+        process_generator_citations(self.article_generator)
+        report_citation_stats(Mock(settings=self.settings))
+
+        with open(self.settings.CITATION_TRACE_FILE, 'r') as f:
+            events = json.load(f)['traceEvents']
+        spans = [event for event in events if event['ph'] == "X"]
+        threads = {event['tid'] for event in events if event['ph'] == "M"}
+        for content in self.article_generator.articles:
+            stages = {event['name'] for event in spans if event['args']['source_path'] == content.source_path}
+            self.assertEqual(stages, {'config', 'paths', 'read', 'scan', 'cache', 'render', 'assign'})
+        self.assertEqual(len([event for event in spans if event['name'] == "queue"]), 4)
+        self.assertEqual({event['tid'] for event in spans}, threads)
+        self.assertGreater(len(threads), 1)
+        self.assertFalse(citation_processor._citation_trace.enabled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,78 @@
+import os
 import unittest
 from unittest.mock import Mock, patch
+from pelican.plugins.citation_processor import citation_processor
 from pelican.plugins.citation_processor.citation_processor import resolve_file_path
 
 
+def write_files(directory, files):
+    for name, text in files:
+        with open(os.path.join(directory, name), 'w') as f:
+            f.write(text)
+
+
+def fake_pandoc(cmd, **kwargs):
+    return Mock(returncode=0, stdout=f"<p>{kwargs['input']}</p>")
+
+
+def reset_plugin_state(test_case):
+    test_case.addCleanup(citation_processor.clear_warm_state)
+    test_case.addCleanup(citation_processor._citation_trace.configure, None)
+    for registry in (
+        citation_processor._citation_metrics,
+        citation_processor._citation_caches,
+        citation_processor._ast_caches,
+        citation_processor._dependency_indexes,
+        citation_processor._negative_caches,
+    ):
+        test_case.addCleanup(registry.clear)
+
+
+def patch_pandoc_version(test_case, modules=('context',), version="pandoc 3.1.11"):
+    mocks = []
+    for module in modules:
+        patcher = patch(f'pelican.plugins.citation_processor.{module}.get_pandoc_version', return_value=version)
+        mocks.append(patcher.start())
+        test_case.addCleanup(patcher.stop)
+    return mocks
+
+
+def make_settings(directory, **overrides):
+    settings = Mock()
+    settings.CITATION_STYLE = "style.csl"
+    settings.BIBLIOGRAPHY_FILE = "refs.bib"
+    settings.CITATION_CACHE_PATH = None
+    settings.CITATION_CACHE_MAX_SIZE = None
+    settings.CITATION_PRUNE_BIBLIOGRAPHY = False
+    settings.CITATION_AST_CACHE = False
+    settings.CITATION_COMPILE_BIBLIOGRAPHY = False
+    settings.CITATION_SHARED_REFERENCES = False
+    settings.CITATION_EXECUTION_MODE = "serial"
+    settings.CITATION_RENDERER = "pandoc"
+    settings.CITATION_RENDER_SCOPE = "document"
+    settings.CITATION_TIMEOUT = None
+    settings.CITATION_METRICS_FILE = None
+    settings.CITATION_METRICS_SLOWEST = 10
+    settings.CITATION_TRACE_FILE = None
+    settings.CITATION_PANDOC_SERVER_PERSIST = False
+    settings.CITATION_WARM_STATE = False
+    settings.DEBUG = False
+    settings.get.return_value = directory
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return settings
+
+
+def make_content(directory, name, text="Text [@key].", bibliography_file=None, citation_style=None):
+    write_files(directory, [(name, text)])
+    content = Mock()
+    content.citation_style = citation_style
+    content.bibliography_file = bibliography_file
+    content.source_path = os.path.join(directory, name)
+    content._content = "<p>original</p>"
+    return content
+
+
 class TestUtils(unittest.TestCase):
 
     def setUp(self):